@@ -0,0 +1,88 @@
+import copy
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidar, obter_local
+from .models import AnoAcademico, Semestre, Subscricao
+
+GRUPO_ACADEMICO = 'academico'
+GRUPO_SUBSCRICAO = 'subscricao'
+
+ESTADOS_ATIVOS = ('ativo', 'teste')
+
+
+def ano_atual():
+    """Ano académico ativo (em cache até um AnoAcademico/Semestre ser gravado)"""
+    return obter_local(GRUPO_ACADEMICO, 'ano_atual', lambda: AnoAcademico.objects.filter(ativo=True).first())
+
+
+def semestre_atual():
+    """Semestre ativo do ano académico ativo"""
+    def calcular():
+        ano = ano_atual()
+        return Semestre.objects.filter(ano_academico=ano, ativo=True).first() if ano else None
+    return obter_local(GRUPO_ACADEMICO, 'semestre_atual', calcular)
+
+
+def subscricao_atual():
+    """Subscrição ativa ou em teste"""
+    return obter_local(
+        GRUPO_SUBSCRICAO, 'subscricao', lambda: Subscricao.objects.filter(estado__in=['ativo', 'teste']).first()
+    )
+
+
+def _calcular_licenca(hoje):
+    subscricao = (
+        Subscricao.objects.filter(estado__in=ESTADOS_ATIVOS, data_expiracao__gte=hoje).order_by('-data_expiracao').first()
+        or Subscricao.objects.order_by('-data_expiracao').first()
+    )
+    if subscricao is None:
+        return None
+    return {
+        'subscricao_id': subscricao.pk,
+        'estado': subscricao.estado,
+        'plano': subscricao.get_plano_display(),
+        'ativo': subscricao.estado in ESTADOS_ATIVOS and subscricao.data_expiracao >= hoje,
+        'data_expiracao': subscricao.data_expiracao,
+        'dias_restantes': max(0, (subscricao.data_expiracao - hoje).days),
+    }
+
+
+# Estado da licença já calculado neste processo: {data: (verificado_em, estado)}
+_licencas = {}
+
+
+def estado_licenca():
+    """Estado da licença do dia (None se o sistema ainda não tem subscrição).
+
+    Calculado uma vez por dia e por versão do grupo 'subscricao'; entre
+    verificações da versão (LICENCA_VERIFICACAO_SEGUNDOS) é só uma leitura
+    de dicionário. A chave inclui a data, por isso a expiração conta a partir
+    da meia-noite mesmo que o comando verificar_subscricoes ainda não tenha corrido.
+    """
+    hoje = date.today()
+    agora = time.monotonic()
+    guardado = _licencas.get(hoje)
+    if guardado is None or agora - guardado[0] >= settings.LICENCA_VERIFICACAO_SEGUNDOS:
+        estado = obter_local(GRUPO_SUBSCRICAO, f'licenca:{hoje.isoformat()}', lambda: _calcular_licenca(hoje))
+        _licencas.clear()
+        _licencas[hoje] = guardado = (agora, estado)
+    return copy.copy(guardado[1])
+
+
+def subscricao_licenca():
+    """Subscrição a que a licença se refere, mesmo que já tenha expirado"""
+    estado = estado_licenca()
+    return Subscricao.objects.filter(pk=estado['subscricao_id']).first() if estado else None
+
+
+def invalidar_academico():
+    invalidar(GRUPO_ACADEMICO)
+
+
+def invalidar_subscricao():
+    invalidar(GRUPO_SUBSCRICAO)
+    transaction.on_commit(_licencas.clear)
@@ -1,9 +1,13 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import (
     ConfiguracaoEscola, Curso, Disciplina, Escola, Inscricao, Professor, 
     Turma, Aluno, Pai, AnoAcademico, PerfilUsuario, Notificacao, Subscricao, 
     PagamentoSubscricao, RecuperacaoSenha, Documento, PrerequisitoDisciplina,
-    HistoricoAcademico, NotaDisciplina
+    HistoricoAcademico, NotaDisciplina, Sequencia, ClassificacaoCurso,
+    InscricaoPendente, EstatisticaAnoCurso, EstatisticaDistribuicao
 )
 
 @admin.register(AnoAcademico)
@@ -22,6 +26,8 @@ class AnoAcademicoAdmin(admin.ModelAdmin):
             ano = queryset.first()
             ano.ativo = True
             ano.save()
+            from .academico import invalidar_academico
+            invalidar_academico()
             self.message_user(request, f"Ano acadêmico {ano} marcado como ativo!")
     marcar_como_ativo.short_description = "Marcar como ano ativo"
 
@@ -53,7 +59,7 @@ class PrerequisitoDisciplinaInline(admin.TabularInline):
 
 @admin.register(Curso)
 class CursoAdmin(admin.ModelAdmin):
-    list_display = ['codigo', 'nome', 'duracao_meses', 'vagas', 'vagas_disponiveis', 'requer_prerequisitos', 'ativo']
+    list_display = ['codigo', 'nome', 'duracao_meses', 'vagas', 'total_inscricoes', 'total_aprovados', 'vagas_disponiveis', 'media_nota_teste', 'requer_prerequisitos', 'ativo']
     list_filter = ['ativo', 'requer_prerequisitos', 'duracao_meses', 'data_criacao']
     search_fields = ['nome', 'codigo', 'descricao']
     readonly_fields = ['data_criacao', 'data_atualizacao']
@@ -77,6 +83,15 @@ class CursoAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).com_estatisticas()
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change and any(formset.has_changed() for formset in formsets):
+            from .elegibilidade import avaliar_curso
+            avaliar_curso(form.instance)
 
 @admin.register(Disciplina)
 class DisciplinaAdmin(admin.ModelAdmin):
@@ -112,6 +127,11 @@ class HistoricoAcademicoAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         return False
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        from .elegibilidade import avaliar_inscricao
+        avaliar_inscricao(form.instance.inscricao)
 
 @admin.register(PrerequisitoDisciplina)
 class PrerequisitoDisciplinaAdmin(admin.ModelAdmin):
@@ -119,6 +139,27 @@ class PrerequisitoDisciplinaAdmin(admin.ModelAdmin):
     list_filter = ['curso', 'obrigatorio']
     search_fields = ['curso__nome', 'disciplina_prerequisito__nome']
     ordering = ['curso', 'ordem']
+    
+    # Os veredictos (Inscricao.habilitado) dos cursos afetados são refeitos a cada alteração
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        from .elegibilidade import avaliar_cursos
+        cursos = {obj.curso_id}
+        if change and 'curso' in form.changed_data:
+            cursos.add(form.initial['curso'])
+        avaliar_cursos(cursos)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        from .elegibilidade import avaliar_cursos
+        avaliar_cursos([obj.curso_id])
+    
+    def delete_queryset(self, request, queryset):
+        from .elegibilidade import avaliar_cursos
+        cursos = set(queryset.values_list('curso', flat=True))
+        super().delete_queryset(request, queryset)
+        avaliar_cursos(cursos)
 
 @admin.register(NotaDisciplina)
 class NotaDisciplinaAdmin(admin.ModelAdmin):
@@ -127,6 +168,25 @@ class NotaDisciplinaAdmin(admin.ModelAdmin):
     search_fields = ['historico__inscricao__nome_completo', 'disciplina__nome']
     readonly_fields = ['historico']
     ordering = ['-ano_conclusao', 'disciplina']
+    
+    # O veredicto da inscrição a que a nota pertence é refeito a cada alteração
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        from .elegibilidade import avaliar_inscricao
+        avaliar_inscricao(obj.historico.inscricao)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        from .elegibilidade import avaliar_inscricao
+        avaliar_inscricao(obj.historico.inscricao)
+    
+    def delete_queryset(self, request, queryset):
+        from .elegibilidade import avaliar_inscricao
+        inscricoes = list(Inscricao.objects.filter(historico_academico__notas_disciplina__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for inscricao in inscricoes:
+            avaliar_inscricao(inscricao)
 
 @admin.register(Escola)
 class EscolaAdmin(admin.ModelAdmin):
@@ -137,10 +197,11 @@ class EscolaAdmin(admin.ModelAdmin):
 
 @admin.register(Inscricao)
 class InscricaoAdmin(admin.ModelAdmin):
-    list_display = ['numero_inscricao', 'nome_completo', 'curso', 'nota_teste', 'aprovado', 'data_inscricao']
-    list_filter = ['curso', 'aprovado', 'data_inscricao']
+    list_display = ['numero_inscricao', 'nome_completo', 'curso', 'nota_teste', 'habilitado', 'aprovado', 'data_inscricao']
+    list_filter = ['curso', 'habilitado', 'aprovado', 'data_inscricao']
+    list_select_related = ['curso']
     search_fields = ['numero_inscricao', 'nome_completo', 'bilhete_identidade', 'email']
-    readonly_fields = ['numero_inscricao', 'data_inscricao', 'data_resultado']
+    readonly_fields = ['numero_inscricao', 'data_inscricao', 'data_resultado', 'habilitado', 'media_prerequisitos']
     fieldsets = (
         ('Informações da Inscrição', {
             'fields': ('numero_inscricao', 'curso', 'data_inscricao')
@@ -152,19 +213,67 @@ class InscricaoAdmin(admin.ModelAdmin):
             'fields': ('telefone', 'email', 'endereco')
         }),
         ('Avaliação', {
-            'fields': ('nota_teste', 'aprovado', 'data_resultado')
+            'fields': ('habilitado', 'media_prerequisitos', 'nota_teste', 'aprovado', 'data_resultado')
         }),
     )
     
-    actions = ['processar_aprovacao']
+    actions = ['avaliar_elegibilidade', 'processar_aprovacao']
+    change_list_template = 'admin/core/inscricao/change_list.html'
+    
+    def get_urls(self):
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='core_inscricao_importar'),
+        ]
+        return urls + super().get_urls()
+    
+    def importar_view(self, request):
+        """Página de upload para importação em massa de inscrições (CSV/XLSX)"""
+        from .importacao import importar_inscricoes
+        
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title='Importar inscrições',
+            cursos=Curso.objects.filter(ativo=True),
+        )
+        if request.method == 'POST':
+            ficheiro = request.FILES.get('ficheiro')
+            curso = Curso.objects.filter(id=request.POST.get('curso') or None, ativo=True).first()
+            if not ficheiro:
+                messages.error(request, 'Selecione um ficheiro CSV ou XLSX.')
+            else:
+                try:
+                    relatorio = importar_inscricoes(ficheiro.file, ficheiro.name, curso_padrao=curso)
+                except ValueError as e:
+                    messages.error(request, str(e))
+                else:
+                    context['relatorio'] = relatorio
+                    context['erros'] = relatorio.erros[:500]
+                    messages.success(request, f'{relatorio.importadas} de {relatorio.total} inscrição(ões) importada(s).')
+        return TemplateResponse(request, 'admin/core/inscricao/importar.html', context)
     
     def processar_aprovacao(self, request, queryset):
-        from .views import processar_aprovacoes_curso
-        cursos = queryset.values_list('curso', flat=True).distinct()
-        for curso_id in cursos:
-            processar_aprovacoes_curso(curso_id)
-        self.message_user(request, "Aprovações processadas com sucesso!")
+        from .aprovacoes import processar_aprovacoes
+        resultado = processar_aprovacoes(queryset.values('curso'))
+        self.message_user(
+            request,
+            f"Aprovações processadas com sucesso! {resultado['aprovados']} aprovada(s), "
+            f"{resultado['retirados']} retirada(s)."
+        )
     processar_aprovacao.short_description = "Processar aprovação automática"
+    
+    def avaliar_elegibilidade(self, request, queryset):
+        from .elegibilidade import avaliar_cursos
+        resultado = avaliar_cursos(queryset.values('curso'))
+        self.message_user(
+            request,
+            f"Pré-requisitos avaliados em {len(resultado)} curso(s): "
+            f"{sum(resultado.values())} veredicto(s) alterado(s)."
+        )
+    avaliar_elegibilidade.short_description = "Avaliar pré-requisitos dos cursos selecionados"
 
 @admin.register(Professor)
 class ProfessorAdmin(admin.ModelAdmin):
@@ -210,14 +319,14 @@ class NotificacaoAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'tipo', 'global_notificacao', 'ativa', 'data_criacao']
     list_filter = ['tipo', 'global_notificacao', 'ativa', 'data_criacao']
     search_fields = ['titulo', 'mensagem']
-    filter_horizontal = ['destinatarios', 'lida_por']
+    filter_horizontal = ['destinatarios']
     readonly_fields = ['data_criacao']
     fieldsets = (
         ('Informações da Notificação', {
             'fields': ('titulo', 'mensagem', 'tipo', 'ativa')
         }),
         ('Destinatários', {
-            'fields': ('global_notificacao', 'destinatarios', 'lida_por')
+            'fields': ('global_notificacao', 'destinatarios')
         }),
         ('Metadata', {
             'fields': ('data_criacao',)
@@ -351,3 +460,68 @@ class DocumentoAdmin(admin.ModelAdmin):
         if not change:
             obj.criado_por = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(Sequencia)
+class SequenciaAdmin(admin.ModelAdmin):
+    list_display = ['prefixo', 'ultimo_valor']
+    readonly_fields = ['prefixo']
+
+@admin.register(ClassificacaoCurso)
+class ClassificacaoCursoAdmin(admin.ModelAdmin):
+    list_display = ['curso', 'vagas', 'nota_minima', 'nota_corte', 'total_aprovados', 'data_atualizacao']
+    list_select_related = ['curso']
+    readonly_fields = ['curso', 'vagas', 'nota_minima', 'nota_corte', 'inscricao_corte', 'total_aprovados', 'data_atualizacao']
+    
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(InscricaoPendente)
+class InscricaoPendenteAdmin(admin.ModelAdmin):
+    list_display = ['recibo', '__str__', 'curso', 'estado', 'inscricao', 'data_submissao', 'data_processamento']
+    list_filter = ['estado', 'curso', 'data_submissao']
+    search_fields = ['recibo', 'bilhete_identidade_normalizado', 'inscricao__numero_inscricao']
+    readonly_fields = ['recibo', 'curso', 'dados', 'estado', 'inscricao', 'motivo_rejeicao', 'data_submissao', 'data_processamento']
+    
+    actions = ['processar_fila']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def processar_fila(self, request, queryset):
+        from .inscricoes import processar_fila
+        resultado = processar_fila()
+        self.message_user(
+            request,
+            f"Fila processada: {resultado['processadas']} inscrição(ões) gravada(s), "
+            f"{resultado['rejeitadas']} rejeitada(s)."
+        )
+    processar_fila.short_description = "Processar agora todas as inscrições pendentes"
+
+class EstatisticaDistribuicaoInline(admin.TabularInline):
+    model = EstatisticaDistribuicao
+    extra = 0
+    fields = ['dimensao', 'valor', 'total']
+    readonly_fields = ['dimensao', 'valor', 'total']
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(EstatisticaAnoCurso)
+class EstatisticaAnoCursoAdmin(admin.ModelAdmin):
+    list_display = ['ano_academico', 'curso', 'total_inscricoes', 'total_aprovados', 'total_reprovados', 'aguardando_nota', 'media_nota', 'desatualizado', 'data_atualizacao']
+    list_filter = ['ano_academico', 'curso', 'desatualizado']
+    list_select_related = ['ano_academico', 'curso']
+    readonly_fields = ['ano_academico', 'curso', 'total_inscricoes', 'total_aprovados', 'total_reprovados', 'aguardando_nota', 'total_com_nota', 'soma_notas', 'total_masculino', 'total_feminino', 'desatualizado', 'data_atualizacao']
+    inlines = [EstatisticaDistribuicaoInline]
+    
+    actions = ['recalcular']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def recalcular(self, request, queryset):
+        from .estatisticas import atualizar_estatisticas
+        total = sum(atualizar_estatisticas(ano=ano, todas=True) for ano in {e.ano_academico for e in queryset})
+        self.message_user(request, f"{total} estatística(s) recalculada(s).")
+    recalcular.short_description = "Recalcular estatísticas dos anos selecionados"
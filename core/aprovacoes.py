@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .contadores import invalidar_contadores
+from .estatisticas import marcar_cursos_desatualizados
+from .models import ClassificacaoCurso, Curso, Inscricao
+
+# Desempate estável: maior nota primeiro, depois a inscrição mais antiga
+ORDEM_CLASSIFICACAO = ('-nota_teste', 'id')
+
+
+def inscricoes_aprovadas(cursos):
+    """Queryset com os ids das inscrições que cabem nas vagas de cada curso.
+
+    Os candidatos sem os pré-requisitos (habilitado=False) não entram.
+    A classificação é feita numa única consulta com ROW_NUMBER() particionado
+    por curso, por isso serve tanto para um curso como para todos de uma vez.
+    """
+    return Inscricao.objects.filter(
+        curso__in=cursos,
+        nota_teste__isnull=False,
+        nota_teste__gte=F('curso__nota_minima'),
+    ).exclude(habilitado=False).annotate(
+        posicao=Window(
+            expression=RowNumber(),
+            partition_by=[F('curso_id')],
+            order_by=[F('nota_teste').desc(), F('id').asc()],
+        )
+    ).filter(posicao__lte=F('curso__vagas')).values('id')
+
+
+def inscricoes_elegiveis(curso):
+    """Inscrições que entram na classificação do curso: com nota, acima da mínima e habilitadas"""
+    return Inscricao.objects.filter(
+        curso=curso,
+        nota_teste__isnull=False,
+        nota_teste__gte=curso.nota_minima,
+    ).exclude(habilitado=False)
+
+
+def _ultimo_aprovado(curso):
+    """Inscrição na última vaga preenchida, com o total de aprovados ('total').
+
+    É um LIMIT 1 OFFSET vagas-1 sobre o índice (curso, nota_teste): a base
+    de dados ainda percorre as primeiras `vagas` entradas (e os empates na
+    nota de corte), mas não classifica o curso todo e só uma linha chega ao
+    Python. O total de aprovados sai da mesma consulta: as vagas, ou todos
+    os elegíveis quando há menos candidatos do que vagas.
+    """
+    if curso.vagas <= 0:
+        return None
+    elegiveis = inscricoes_elegiveis(curso).order_by(*ORDEM_CLASSIFICACAO).values('id', 'nota_teste')
+    ultimo = elegiveis[curso.vagas - 1:curso.vagas].first()
+    if ultimo is not None:
+        return {**ultimo, 'total': curso.vagas}
+    # Menos candidatos elegíveis do que vagas: todos ficam aprovados
+    return elegiveis.reverse().annotate(total=Window(Count('id'))).first()
+
+
+def _filtro_aprovados(corte):
+    """Condição 'está à frente ou na posição de corte' segundo ORDEM_CLASSIFICACAO"""
+    return Q(nota_teste__gt=corte['nota_teste']) | Q(nota_teste=corte['nota_teste'], id__lte=corte['id'])
+
+
+def _guardar_classificacao(curso, corte):
+    ClassificacaoCurso.objects.update_or_create(
+        curso=curso,
+        defaults={
+            'vagas': curso.vagas,
+            'nota_minima': curso.nota_minima,
+            'nota_corte': corte['nota_teste'] if corte else None,
+            'inscricao_corte_id': corte['id'] if corte else None,
+            'total_aprovados': corte['total'] if corte else 0,
+        },
+    )
+
+
+def atualizar_classificacao(curso):
+    """Atualiza a classificação de um curso após a mudança de uma nota ou dos critérios.
+
+    Recalcula só a posição de corte e corrige as inscrições que a atravessaram
+    (normalmente uma ou duas), sem reclassificar o curso inteiro.
+    """
+    curso = Curso.objects.get(pk=curso.pk)
+    with transaction.atomic():
+        corte = _ultimo_aprovado(curso)
+        aprovados = Inscricao.objects.filter(curso=curso, aprovado=True)
+        if corte is None:
+            aprovados.update(aprovado=False)
+        else:
+            aprovados.exclude(
+                _filtro_aprovados(corte) & Q(nota_teste__gte=curso.nota_minima)
+            ).update(aprovado=False)
+            aprovados.filter(habilitado=False).update(aprovado=False)
+            inscricoes_elegiveis(curso).filter(_filtro_aprovados(corte), aprovado=False).update(
+                aprovado=True, data_resultado=timezone.now()
+            )
+        _guardar_classificacao(curso, corte)
+        invalidar_contadores()
+        marcar_cursos_desatualizados([curso.pk])
+
+
+def processar_aprovacoes(cursos):
+    """Aplica o resultado da classificação aos cursos indicados.
+
+    Só são escritas as inscrições cujo estado muda. Devolve um dicionário
+    com o número de inscrições aprovadas e retiradas nesta execução.
+    """
+    cursos = Curso.objects.filter(pk__in=cursos)
+    aprovados = inscricoes_aprovadas(cursos)
+
+    with transaction.atomic():
+        retirados = Inscricao.objects.filter(
+            curso__in=cursos, aprovado=True
+        ).exclude(id__in=aprovados).update(aprovado=False)
+
+        novos = Inscricao.objects.filter(
+            id__in=aprovados, aprovado=False
+        ).update(aprovado=True, data_resultado=timezone.now())
+
+        for curso in cursos:
+            _guardar_classificacao(curso, _ultimo_aprovado(curso))
+        if novos or retirados:
+            invalidar_contadores()
+        marcar_cursos_desatualizados(cursos)
+
+    return {'aprovados': novos, 'retirados': retirados}
+
+
+def processar_aprovacoes_curso(curso_id):
+    """Recalcula as aprovações de um único curso"""
+    return processar_aprovacoes([curso_id])
@@ -0,0 +1,75 @@
+import copy
+import secrets
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+TEMPO_PADRAO = 60 * 60
+
+_AUSENTE = object()
+
+
+def _chave_versao(grupo):
+    return f'versao:{grupo}'
+
+
+def _nova_versao():
+    """Valor que nunca foi usado como versão (nem por outro processo)"""
+    return time.time_ns() * 1000 + secrets.randbelow(1000)
+
+
+def versao(grupo):
+    """Versão atual de um grupo de entradas; muda a cada invalidação"""
+    valor = cache.get(_chave_versao(grupo))
+    if valor is None:
+        # Começa num valor que nunca foi usado, para não reaproveitar entradas antigas
+        cache.add(_chave_versao(grupo), _nova_versao(), None)
+        valor = cache.get(_chave_versao(grupo))
+    return valor
+
+
+def obter(grupo, chave, calcular, tempo=TEMPO_PADRAO):
+    """Devolve o valor em cache ou calcula-o e guarda-o na versão atual do grupo"""
+    chave_completa = f'{grupo}:{versao(grupo)}:{chave}'
+    valor = cache.get(chave_completa, _AUSENTE)
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(chave_completa, valor, tempo)
+    return valor
+
+
+# Cópia local (por processo) dos valores lidos, válida enquanto a versão do grupo não mudar
+_locais = {}
+
+
+def obter_local(grupo, chave, calcular, tempo=TEMPO_PADRAO):
+    """Como obter(), mas guarda também o valor no processo.
+
+    Só a versão do grupo é lida da cache partilhada; o valor é desserializado
+    uma vez por processo e por versão. Cada chamada recebe uma cópia: o valor
+    guardado é partilhado por todos os pedidos e threads do processo e não
+    pode ser alterado por nenhum deles.
+    """
+    atual = versao(grupo)
+    guardado = _locais.get((grupo, chave))
+    if guardado is None or guardado[0] != atual:
+        guardado = (atual, obter(grupo, chave, calcular, tempo))
+        _locais[(grupo, chave)] = guardado
+    return copy.deepcopy(guardado[1])
+
+
+def _renovar(grupo):
+    # Um set() de uma versão nova em vez de incr(): o incr() da FileBasedCache
+    # lê e reescreve o ficheiro sem lock e dois workers podiam gravar a mesma
+    # versão, perdendo uma invalidação. Com versões únicas a última escrita
+    # ganha e qualquer uma delas já é diferente da versão anterior.
+    cache.set(_chave_versao(grupo), _nova_versao(), None)
+
+
+def invalidar(*grupos):
+    """Invalida todas as entradas dos grupos depois do commit da transação em curso.
+
+    As entradas antigas deixam de ser lidas (mudam de versão) e expiram sozinhas.
+    """
+    transaction.on_commit(lambda: [_renovar(grupo) for grupo in grupos])
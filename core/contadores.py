@@ -0,0 +1,36 @@
+from django.db.models import Count, Q
+
+from .cache import invalidar, obter
+from .models import Inscricao
+
+GRUPO_INSCRICOES = 'inscricoes'
+
+VAZIO = {'total_inscricoes': 0, 'total_aprovados': 0, 'total_reprovados': 0, 'aguardando_nota': 0}
+
+
+def _agregados():
+    return {
+        'total_inscricoes': Count('id'),
+        'total_aprovados': Count('id', filter=Q(aprovado=True)),
+        'total_reprovados': Count('id', filter=Q(aprovado=False, nota_teste__isnull=False)),
+        'aguardando_nota': Count('id', filter=Q(nota_teste__isnull=True)),
+    }
+
+
+def _por(campo):
+    linhas = Inscricao.objects.order_by().values(campo).annotate(**_agregados())
+    return {linha.pop(campo): linha for linha in linhas}
+
+
+def contadores_inscricoes():
+    """Totais de inscrições, aprovados, não aprovados e a aguardar nota (uma consulta, em cache)"""
+    return obter(GRUPO_INSCRICOES, 'totais', lambda: Inscricao.objects.aggregate(**_agregados()))
+
+
+def contadores_por_curso():
+    """Os mesmos totais por curso: {curso_id: {...}}"""
+    return obter(GRUPO_INSCRICOES, 'por_curso', lambda: _por('curso'))
+
+
+def invalidar_contadores():
+    invalidar(GRUPO_INSCRICOES)
@@ -1,21 +1,20 @@
-from .models import AnoAcademico, Subscricao
+from django.utils.functional import SimpleLazyObject
+
+from .academico import ano_atual, estado_licenca, semestre_atual
+
+# Os valores só são obtidos (cache/base de dados) se o template os usar
 
 def subscricao_context(request):
     if not request.user.is_authenticated:
         return {}
-    subscricao = Subscricao.objects.filter(estado__in=['ativo', 'teste']).first()
-    return {'subscricao': subscricao}
+    # O estado do dia que o LicencaMiddleware já leu (sem consultas nem cálculos por pedido)
+    return {'licenca': SimpleLazyObject(estado_licenca)}
 
 def global_academic_context(request):
     if not request.user.is_authenticated:
         return {}
     
-    ano_atual = AnoAcademico.objects.filter(ativo=True).first()
-    semestre_atual = None
-    if ano_atual:
-        semestre_atual = ano_atual.semestres.filter(ativo=True).first()
-        
     return {
-        'ano_atual': ano_atual,
-        'semestre_atual': semestre_atual
+        'ano_atual': SimpleLazyObject(ano_atual),
+        'semestre_atual': SimpleLazyObject(semestre_atual)
     }
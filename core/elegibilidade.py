@@ -0,0 +1,98 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Curso, Inscricao, NotaDisciplina, PrerequisitoDisciplina
+
+CENTESIMAS = Decimal('0.01')
+
+
+def carregar_prerequisitos(curso):
+    """Pré-requisitos de um curso numa só consulta, com a disciplina já carregada"""
+    return list(PrerequisitoDisciplina.objects.filter(curso=curso).select_related('disciplina_prerequisito'))
+
+
+def avaliar(prerequisitos, notas):
+    """Veredicto de um candidato a partir das suas notas {disciplina_id: nota}.
+
+    Devolve (habilitado, média, primeiro pré-requisito obrigatório em falta).
+    A média considera as notas de todos os pré-requisitos, obrigatórios ou não.
+    """
+    falha = None
+    soma, quantidade = Decimal('0'), 0
+    for prereq in prerequisitos:
+        nota = notas.get(prereq.disciplina_prerequisito_id)
+        if nota is not None:
+            soma += nota
+            quantidade += 1
+        if prereq.obrigatorio and falha is None and (nota is None or nota < prereq.nota_minima_prerequisito):
+            falha = prereq
+    media = (soma / quantidade).quantize(CENTESIMAS) if quantidade else None
+    return falha is None, media, falha
+
+
+def avaliar_curso(curso, tamanho_lote=1000):
+    """Avalia e grava a elegibilidade de todos os candidatos de um curso.
+
+    Carrega os pré-requisitos e as notas de toda a coorte em duas consultas,
+    calcula os veredictos em memória e só grava as inscrições que mudam.
+    Se algum veredicto mudar, a classificação do curso é recalculada.
+    Devolve o número de inscrições alteradas.
+    """
+    from .aprovacoes import processar_aprovacoes
+
+    prerequisitos = carregar_prerequisitos(curso)
+    disciplinas = [p.disciplina_prerequisito_id for p in prerequisitos]
+
+    notas = defaultdict(dict)
+    if prerequisitos:
+        linhas = NotaDisciplina.objects.filter(
+            historico__inscricao__curso=curso, disciplina_id__in=disciplinas,
+        ).order_by().values_list('historico__inscricao_id', 'disciplina_id', 'nota')
+        for inscricao_id, disciplina_id, nota in linhas:
+            notas[inscricao_id][disciplina_id] = nota
+
+    # Agrupa as inscrições alteradas por veredicto: um UPDATE ... WHERE id IN por grupo
+    alteradas = defaultdict(list)
+    inscricoes = Inscricao.objects.filter(curso=curso).order_by().values_list('id', 'habilitado', 'media_prerequisitos')
+    for inscricao_id, habilitado_atual, media_atual in inscricoes.iterator(chunk_size=tamanho_lote):
+        if prerequisitos:
+            habilitado, media, _ = avaliar(prerequisitos, notas.get(inscricao_id, {}))
+        else:
+            habilitado, media = True, None
+        if (habilitado_atual, media_atual) != (habilitado, media):
+            alteradas[habilitado, media].append(inscricao_id)
+
+    if alteradas:
+        with transaction.atomic():
+            for (habilitado, media), ids in alteradas.items():
+                for inicio in range(0, len(ids), tamanho_lote):
+                    Inscricao.objects.filter(id__in=ids[inicio:inicio + tamanho_lote]).update(
+                        habilitado=habilitado, media_prerequisitos=media
+                    )
+            processar_aprovacoes([curso.pk])
+    return sum(len(ids) for ids in alteradas.values())
+
+
+def avaliar_cursos(cursos):
+    """Avalia vários cursos; devolve {curso: inscrições alteradas}"""
+    return {curso: avaliar_curso(curso) for curso in Curso.objects.filter(pk__in=cursos)}
+
+
+def avaliar_inscricao(inscricao):
+    """Recalcula o veredicto de uma só inscrição (ex.: depois de gravar o histórico)"""
+    from .aprovacoes import atualizar_classificacao
+
+    prerequisitos = carregar_prerequisitos(inscricao.curso_id)
+    if prerequisitos:
+        notas = dict(NotaDisciplina.objects.filter(historico__inscricao=inscricao).values_list('disciplina_id', 'nota'))
+        habilitado, media, _ = avaliar(prerequisitos, notas)
+    else:
+        habilitado, media = True, None
+    if (inscricao.habilitado, inscricao.media_prerequisitos) != (habilitado, media):
+        Inscricao.objects.filter(pk=inscricao.pk).update(habilitado=habilitado, media_prerequisitos=media)
+        inscricao.habilitado, inscricao.media_prerequisitos = habilitado, media
+        if inscricao.nota_teste is not None:
+            atualizar_classificacao(inscricao.curso)
+    return habilitado
@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import AnoAcademico, EstatisticaAnoCurso, EstatisticaDistribuicao, Inscricao
+
+CAMPOS_TOTAIS = [
+    'total_inscricoes', 'total_aprovados', 'total_reprovados', 'aguardando_nota',
+    'total_com_nota', 'soma_notas', 'total_masculino', 'total_feminino',
+]
+
+DIMENSOES = {
+    'provincia': 'escola__provincia',
+    'escola': 'escola__nome',
+}
+
+
+def _anos_abertos():
+    return AnoAcademico.objects.exclude(status='encerrado').values('pk')
+
+
+def marcar_desatualizadas(pares):
+    """Marca como desatualizadas as estatísticas dos pares (ano_academico_id, curso_id).
+
+    A atualização não é incremental: os sinais não aplicam deltas aos totais,
+    só marcam as linhas afetadas, e o comando atualizar_estatisticas (agendado)
+    recalcula-as depois a partir das inscrições. Até lá o dashboard mostra os
+    totais anteriores com a indicação "Em atualização".
+
+    Os anos encerrados estão congelados e não são marcados. Os pares que
+    ainda não têm linha são criados já desatualizados; criar e marcar é um
+    único INSERT ... ON CONFLICT DO UPDATE.
+    """
+    pares = {(ano, curso) for ano, curso in pares if ano and curso}
+    if not pares:
+        return
+    abertos = set(AnoAcademico.objects.filter(pk__in={ano for ano, _ in pares}).exclude(
+        status='encerrado').values_list('pk', flat=True))
+    EstatisticaAnoCurso.objects.bulk_create(
+        [EstatisticaAnoCurso(ano_academico_id=ano, curso_id=curso) for ano, curso in pares if ano in abertos],
+        update_conflicts=True, unique_fields=['ano_academico', 'curso'], update_fields=['desatualizado'],
+    )
+
+
+def marcar_cursos_desatualizados(cursos):
+    """Depois de atualizações em massa num curso: marca os anos abertos desses cursos"""
+    EstatisticaAnoCurso.objects.filter(
+        curso__in=cursos, ano_academico__in=_anos_abertos(), desatualizado=False
+    ).update(desatualizado=True)
+
+
+def _recalcular(estatistica):
+    inscricoes = Inscricao.objects.filter(
+        ano_academico_id=estatistica.ano_academico_id, curso_id=estatistica.curso_id
+    ).order_by()
+    totais = inscricoes.aggregate(
+        total_inscricoes=Count('id'),
+        total_aprovados=Count('id', filter=Q(aprovado=True)),
+        total_reprovados=Count('id', filter=Q(aprovado=False, nota_teste__isnull=False)),
+        aguardando_nota=Count('id', filter=Q(nota_teste__isnull=True)),
+        total_com_nota=Count('nota_teste'),
+        soma_notas=Sum('nota_teste'),
+        total_masculino=Count('id', filter=Q(sexo='M')),
+        total_feminino=Count('id', filter=Q(sexo='F')),
+    )
+    totais['soma_notas'] = totais['soma_notas'] or 0
+    for campo, valor in totais.items():
+        setattr(estatistica, campo, valor)
+    estatistica.desatualizado = False
+    estatistica.save()
+
+    distribuicoes = []
+    for dimensao, campo in DIMENSOES.items():
+        for linha in inscricoes.values(campo).annotate(total=Count('id')):
+            distribuicoes.append(EstatisticaDistribuicao(
+                estatistica=estatistica, dimensao=dimensao, valor=linha[campo] or '', total=linha['total'],
+            ))
+    estatistica.distribuicoes.all().delete()
+    EstatisticaDistribuicao.objects.bulk_create(distribuicoes)
+
+
+def atualizar_estatisticas(ano=None, todas=False):
+    """Recalcula as estatísticas desatualizadas (ou todas, com `todas=True`).
+
+    Cada par ano/curso é recalculado a partir das suas próprias inscrições
+    através do índice (ano_academico, curso). Devolve o número de pares
+    recalculados.
+    """
+    estatisticas = EstatisticaAnoCurso.objects.all()
+    if ano is not None:
+        estatisticas = estatisticas.filter(ano_academico=ano)
+    if not todas:
+        estatisticas = estatisticas.filter(desatualizado=True)
+    total = 0
+    for estatistica in estatisticas:
+        with transaction.atomic():
+            _recalcular(estatistica)
+        total += 1
+    return total
+
+
+def reconstruir_estatisticas(ano=None):
+    """Cria as linhas em falta a partir das inscrições existentes e recalcula tudo"""
+    inscricoes = Inscricao.objects.filter(ano_academico__isnull=False).order_by()
+    if ano is not None:
+        inscricoes = inscricoes.filter(ano_academico=ano)
+    pares = set(inscricoes.values_list('ano_academico_id', 'curso_id').distinct())
+    EstatisticaAnoCurso.objects.bulk_create(
+        [EstatisticaAnoCurso(ano_academico_id=a, curso_id=c) for a, c in pares], ignore_conflicts=True,
+    )
+    return atualizar_estatisticas(ano=ano, todas=True)
+
+
+def estatisticas_por_ano():
+    """Totais por ano académico somados a partir das linhas pré-agregadas.
+
+    Só leitura: as linhas desatualizadas são recalculadas pelo comando
+    atualizar_estatisticas (agendado, por exemplo, a cada minuto) e contadas
+    em `por_atualizar`.
+    """
+    linhas = EstatisticaAnoCurso.objects.order_by('-ano_academico__ano_inicio').values(
+        'ano_academico', 'ano_academico__ano_inicio', 'ano_academico__ano_fim', 'ano_academico__status',
+    ).annotate(
+        por_atualizar=Count('id', filter=Q(desatualizado=True)),
+        **{campo: Sum(campo) for campo in CAMPOS_TOTAIS},
+    )
+    for linha in linhas:
+        linha['media_nota'] = round(linha['soma_notas'] / linha['total_com_nota'], 2) if linha['total_com_nota'] else None
+    return list(linhas)
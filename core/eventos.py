@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Eventos por entregar a um cliente lento; os mais recentes são descartados
+# (as contagens enviadas são absolutas, o próximo evento repõe o estado)
+TAMANHO_FILA = 100
+
+
+class BrokerMemoria:
+    """Distribui eventos aos clientes ligados a este processo.
+
+    Cada ligação (core.views.eventos_stream) tem uma asyncio.Queue no ciclo
+    de eventos onde foi criada; publicar() pode ser chamado de qualquer
+    thread. Para vários processos, EVENTOS_BROKER pode apontar para outra
+    classe com a mesma interface.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ligacoes = {}
+
+    def subscrever(self, usuario_id, staff=False):
+        fila = asyncio.Queue(TAMANHO_FILA)
+        with self._lock:
+            self._ligacoes[fila] = (usuario_id, staff, asyncio.get_running_loop())
+        return fila
+
+    def cancelar(self, fila):
+        with self._lock:
+            self._ligacoes.pop(fila, None)
+
+    def ligados(self, staff=False):
+        """Ids dos utilizadores ligados (só staff, se pedido); None quando o broker não sabe"""
+        with self._lock:
+            return {usuario for usuario, e_staff, _ in self._ligacoes.values() if e_staff or not staff}
+
+    def publicar(self, tipo, dados, usuarios=None, staff=False):
+        """Entrega o evento aos `usuarios` indicados (ou a todos), opcionalmente só a staff"""
+        usuarios = None if usuarios is None else set(usuarios)
+        with self._lock:
+            destinos = [
+                (fila, ciclo) for fila, (usuario, e_staff, ciclo) in self._ligacoes.items()
+                if (usuarios is None or usuario in usuarios) and (e_staff or not staff)
+            ]
+        for fila, ciclo in destinos:
+            try:
+                ciclo.call_soon_threadsafe(_entregar, fila, (tipo, dados))
+            except RuntimeError:
+                # Ciclo de eventos já fechado: a ligação vai ser cancelada
+                pass
+
+
+def _entregar(fila, evento):
+    try:
+        fila.put_nowait(evento)
+    except asyncio.QueueFull:
+        pass
+
+
+_broker = None
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENTOS_BROKER)()
+    return _broker
+
+
+def ligados(staff=False):
+    return broker().ligados(staff)
+
+
+def publicar(tipo, dados, usuarios=None, staff=False):
+    """Publica o evento depois do commit da transação em curso"""
+    transaction.on_commit(lambda: broker().publicar(tipo, dados, usuarios, staff))
@@ -0,0 +1,147 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse
+
+
+class Sobrecarregado(Exception):
+    """A fila do executor está cheia; o pedido deve ser recusado (503)"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Executor sobrecarregado, tente dentro de {retry_after}s')
+        self.retry_after = retry_after
+
+
+class ExecutorLimitado:
+    """ThreadPoolExecutor com um número fixo de threads e uma fila de espera limitada.
+
+    Quando já há `fila_maxima` tarefas à espera de uma thread, submeter()
+    levanta Sobrecarregado em vez de as acumular. Mantém contagens para
+    metricas() (em espera, em execução, concluídas, recusadas e tempos médios).
+    """
+
+    def __init__(self, trabalhadores, fila_maxima, nome='executor'):
+        self.trabalhadores = trabalhadores
+        self.fila_maxima = fila_maxima
+        self._executor = ThreadPoolExecutor(trabalhadores, thread_name_prefix=nome)
+        self._lock = threading.Lock()
+        self._em_espera = 0
+        self._em_execucao = 0
+        self._concluidas = 0
+        self._recusadas = 0
+        self._espera_total = 0.0
+        self._duracao_total = 0.0
+
+    def _duracao_media(self):
+        return self._duracao_total / self._concluidas if self._concluidas else 0.0
+
+    def _retry_after(self):
+        """Segundos até a fila atual esvaziar, pela duração média das tarefas (mínimo 1)"""
+        return max(1, math.ceil(self._duracao_media() * (self._em_espera + 1) / self.trabalhadores))
+
+    def submeter(self, funcao, *args, **kwargs):
+        """Agenda funcao(*args, **kwargs) e devolve o Future (ou levanta Sobrecarregado)"""
+        with self._lock:
+            if self._em_espera >= self.fila_maxima:
+                self._recusadas += 1
+                raise Sobrecarregado(self._retry_after())
+            self._em_espera += 1
+        return self._executor.submit(self._correr, time.monotonic(), funcao, args, kwargs)
+
+    def _correr(self, submetida, funcao, args, kwargs):
+        inicio = time.monotonic()
+        with self._lock:
+            self._em_espera -= 1
+            self._em_execucao += 1
+            self._espera_total += inicio - submetida
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            # Os sinais de fim de pedido não chegam a estas threads
+            close_old_connections()
+            with self._lock:
+                self._em_execucao -= 1
+                self._concluidas += 1
+                self._duracao_total += time.monotonic() - inicio
+
+    async def executar(self, funcao, *args, **kwargs):
+        """Versão async de submeter(): espera pelo resultado sem ocupar o ciclo de eventos"""
+        return await asyncio.wrap_future(self.submeter(funcao, *args, **kwargs))
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'trabalhadores': self.trabalhadores,
+                'fila_maxima': self.fila_maxima,
+                'em_espera': self._em_espera,
+                'em_execucao': self._em_execucao,
+                'concluidas': self._concluidas,
+                'recusadas': self._recusadas,
+                'espera_media_ms': round(self._espera_total / self._concluidas * 1000, 1) if self._concluidas else 0.0,
+                'duracao_media_ms': round(self._duracao_media() * 1000, 1),
+            }
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False)
+
+
+_executor_senhas = None
+_lock_senhas = threading.Lock()
+
+
+def executor_senhas():
+    """Executor partilhado pelas views que calculam hashes de senhas (PBKDF2).
+
+    Dimensionado por SENHAS_EXECUTOR_TRABALHADORES e SENHAS_EXECUTOR_FILA;
+    None quando SENHAS_EXECUTOR_TRABALHADORES=0 (sem executor dedicado).
+    """
+    global _executor_senhas
+    trabalhadores, fila = settings.SENHAS_EXECUTOR_TRABALHADORES, settings.SENHAS_EXECUTOR_FILA
+    if not trabalhadores:
+        return None
+    with _lock_senhas:
+        atual = _executor_senhas
+        if atual is None or (atual.trabalhadores, atual.fila_maxima) != (trabalhadores, fila):
+            _executor_senhas = ExecutorLimitado(trabalhadores, fila, nome='senhas')
+            if atual is not None:
+                atual.encerrar()
+        return _executor_senhas
+
+
+def resposta_ocupado(request, retry_after):
+    """503 barato (sem templates nem base de dados) com o cabeçalho Retry-After"""
+    mensagem = 'O sistema está ocupado. Tente novamente dentro de alguns segundos.'
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        resposta = JsonResponse({'erro': mensagem}, status=503)
+    else:
+        resposta = HttpResponse(mensagem, status=503, content_type='text/plain; charset=utf-8')
+    resposta['Retry-After'] = str(retry_after)
+    return resposta
+
+
+def no_executor_senhas(view):
+    """Transforma uma view síncrona de autenticação numa view async.
+
+    Os POST (onde está o PBKDF2) correm no executor_senhas(), com um número
+    limitado de threads: uma rajada de logins não ocupa as threads que servem
+    as outras páginas e, com a fila cheia, recebe 503 com Retry-After.
+    Os GET só mostram o formulário e seguem o caminho normal (sync_to_async).
+    """
+    @wraps(view)
+    async def envolvida(request, *args, **kwargs):
+        executor = executor_senhas()
+        if request.method != 'POST' or executor is None:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        try:
+            return await executor.executar(view, request, *args, **kwargs)
+        except Sobrecarregado as e:
+            return resposta_ocupado(request, e.retry_after)
+    return envolvida
@@ -0,0 +1,308 @@
+import csv
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .contadores import invalidar_contadores
+from .estatisticas import marcar_desatualizadas
+from .series import contar, somar
+from .academico import ano_atual
+from .models import Curso, Escola, Inscricao
+from .normalizacao import normalizar_bilhete, normalizar_email, normalizar_telefone
+from .sequencias import reservar_numeros
+
+CAMPOS_OBRIGATORIOS = [
+    'nome_completo', 'data_nascimento', 'bilhete_identidade', 'sexo',
+    'endereco', 'telefone', 'email', 'ano_conclusao',
+]
+
+CAMPOS_TEXTO = [
+    'nome_completo', 'local_nascimento', 'nacionalidade', 'bilhete_identidade',
+    'endereco', 'telefone', 'email', 'ano_conclusao', 'certificados_obtidos',
+    'historico_escolar', 'numero_comprovante', 'responsavel_financeiro_nome',
+    'responsavel_financeiro_telefone', 'responsavel_financeiro_relacao',
+    'encarregado_nome', 'encarregado_parentesco', 'encarregado_telefone',
+    'encarregado_email', 'encarregado_profissao', 'encarregado_local_trabalho',
+]
+
+FORMATOS_DATA = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+
+# Tamanho máximo de cada campo de texto (None para TextField); o SQLite não o impõe
+TAMANHOS_MAXIMOS = {campo: Inscricao._meta.get_field(campo).max_length for campo in CAMPOS_TEXTO}
+
+
+class ErroLinha(Exception):
+    pass
+
+
+class ErroCodificacao(ValueError):
+    """Linha do ficheiro que não está em UTF-8; a leitura não pode continuar"""
+
+    def __init__(self, linha):
+        super().__init__(f'Linha {linha}: o ficheiro não está em UTF-8.')
+        self.linha = linha
+
+
+class RelatorioImportacao:
+    """Resultado de uma importação: totais e erros por linha do ficheiro"""
+
+    def __init__(self):
+        self.total = 0
+        self.importadas = 0
+        self.erros = []
+
+    def adicionar_erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+    @property
+    def rejeitadas(self):
+        return len(self.erros)
+
+    def escrever_csv(self, destino):
+        escritor = csv.writer(destino)
+        escritor.writerow(['linha', 'erro'])
+        escritor.writerows(self.erros)
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _chave_coluna(nome):
+    return _texto(nome).lower().replace(' ', '_')
+
+
+def _decodificar(ficheiro):
+    """Decodifica linha a linha, para um erro de codificação apontar a linha em causa"""
+    for numero, linha in enumerate(ficheiro, start=1):
+        try:
+            yield linha.decode('utf-8-sig' if numero == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            raise ErroCodificacao(numero)
+
+
+def _iterar_csv(ficheiro):
+    amostra = ficheiro.read(4096).decode('utf-8-sig', errors='ignore')
+    ficheiro.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(_decodificar(ficheiro), dialeto)
+    cabecalho = [_chave_coluna(c) for c in next(leitor, [])]
+    for numero, valores in enumerate(leitor, start=2):
+        if any(v.strip() for v in valores):
+            yield numero, dict(zip(cabecalho, valores))
+
+
+def _iterar_xlsx(ficheiro, load_workbook):
+    livro = load_workbook(ficheiro, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = [_chave_coluna(c) for c in next(linhas, [])]
+        for numero, valores in enumerate(linhas, start=2):
+            if any(_texto(v) for v in valores):
+                yield numero, dict(zip(cabecalho, valores))
+    finally:
+        livro.close()
+
+
+def iterar_linhas(ficheiro, nome):
+    """Lê um CSV ou XLSX linha a linha, devolvendo (número da linha, dicionário)"""
+    if nome.lower().endswith(('.xlsx', '.xlsm')):
+        # O openpyxl é opcional: sem ele só se aceita CSV
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError('XLSX indisponível: o servidor não tem o pacote "openpyxl". Exporte a folha como CSV.')
+        return _iterar_xlsx(ficheiro, load_workbook)
+    return _iterar_csv(ficheiro)
+
+
+def _converter_data(valor, campo):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ErroLinha(f'Data inválida em "{campo}": {texto}')
+
+
+def _converter_escolha(valor, campo, escolhas, padrao):
+    texto = _texto(valor).upper()
+    if not texto:
+        return padrao
+    for chave, rotulo in escolhas:
+        if texto in (chave.upper(), rotulo.upper()):
+            return chave
+    if texto[0] in dict(escolhas):
+        return texto[0]
+    raise ErroLinha(f'Valor inválido em "{campo}": {_texto(valor)}')
+
+
+class ImportadorInscricoes:
+    """Valida e insere inscrições em lotes, com as regras de inscricao_create"""
+
+    def __init__(self, curso_padrao=None, tamanho_lote=500):
+        self.curso_padrao = curso_padrao
+        self.tamanho_lote = tamanho_lote
+        self.relatorio = RelatorioImportacao()
+        self.cursos = {}
+        for curso in Curso.objects.filter(ativo=True):
+            self.cursos[curso.codigo.upper()] = curso
+            self.cursos[str(curso.id)] = curso
+        self.escolas = {nome.lower(): pk for pk, nome in Escola.objects.values_list('id', 'nome')}
+        self.ids_escolas = set(self.escolas.values())
+        self.vistos = {'bilhete_identidade': set(), 'email': set(), 'telefone': set()}
+        self.ano_academico_id = getattr(ano_atual(), 'pk', None)
+
+    def _resolver_curso(self, dados):
+        codigo = _texto(dados.get('curso') or dados.get('curso_codigo'))
+        if not codigo:
+            if self.curso_padrao is None:
+                raise ErroLinha('Curso não indicado.')
+            return self.curso_padrao
+        curso = self.cursos.get(codigo.upper())
+        if curso is None:
+            raise ErroLinha(f'O curso "{codigo}" não existe ou está indisponível para inscrições.')
+        return curso
+
+    def _resolver_escola(self, dados):
+        escola_id = _texto(dados.get('escola_id'))
+        if escola_id.isdigit() and int(escola_id) in self.ids_escolas:
+            return int(escola_id)
+        return self.escolas.get(_texto(dados.get('escola')).lower())
+
+    def _construir(self, dados):
+        for campo in CAMPOS_OBRIGATORIOS:
+            if not _texto(dados.get(campo)):
+                raise ErroLinha(f'Campo obrigatório em falta: {campo}')
+
+        valores = {campo: _texto(dados.get(campo)) for campo in CAMPOS_TEXTO if _texto(dados.get(campo))}
+        for campo, valor in valores.items():
+            if TAMANHOS_MAXIMOS[campo] and len(valor) > TAMANHOS_MAXIMOS[campo]:
+                raise ErroLinha(f'"{campo}" tem {len(valor)} caracteres (máximo {TAMANHOS_MAXIMOS[campo]}).')
+        try:
+            validate_email(valores['email'])
+        except ValidationError:
+            raise ErroLinha(f'Email inválido: {valores["email"]}')
+
+        inscricao = Inscricao(
+            curso=self._resolver_curso(dados),
+            ano_academico_id=self.ano_academico_id,
+            escola_id=self._resolver_escola(dados),
+            data_nascimento=_converter_data(dados['data_nascimento'], 'data_nascimento'),
+            data_validade_bi=_converter_data(dados['data_validade_bi'], 'data_validade_bi') if _texto(dados.get('data_validade_bi')) else None,
+            sexo=_converter_escolha(dados.get('sexo'), 'sexo', [('M', 'Masculino'), ('F', 'Feminino')], None),
+            estado_civil=_converter_escolha(dados.get('estado_civil'), 'estado_civil', Inscricao.ESTADO_CIVIL_CHOICES, 'S'),
+            turno_preferencial=_converter_escolha(dados.get('turno_preferencial'), 'turno_preferencial', Inscricao.TURNO_CHOICES, 'M'),
+            **valores,
+        )
+        inscricao.atualizar_campos_normalizados()
+
+        chaves = {
+            'bilhete_identidade': inscricao.bilhete_identidade_normalizado,
+            'email': inscricao.email_normalizado,
+            'telefone': inscricao.telefone_normalizado,
+        }
+        for campo, valor in chaves.items():
+            if valor in self.vistos[campo]:
+                raise ErroLinha(f'{campo} repetido no ficheiro: {getattr(inscricao, campo)}')
+        for campo, valor in chaves.items():
+            self.vistos[campo].add(valor)
+        return inscricao
+
+    def _filtrar_existentes(self, lote):
+        """Retira do lote as inscrições cujo BI/email/telefone já existe (uma consulta por lote)"""
+        existentes = Inscricao.objects.filter(
+            Q(bilhete_identidade_normalizado__in=[i.bilhete_identidade_normalizado for _, i in lote]) |
+            Q(email_normalizado__in=[i.email_normalizado for _, i in lote]) |
+            Q(telefone_normalizado__in=[i.telefone_normalizado for _, i in lote])
+        ).order_by().values_list('bilhete_identidade_normalizado', 'email_normalizado', 'telefone_normalizado')
+        bis, emails, telefones = set(), set(), set()
+        for bi, email, telefone in existentes:
+            bis.add(bi)
+            emails.add(email)
+            telefones.add(telefone)
+
+        validos = []
+        for linha, inscricao in lote:
+            mensagens = []
+            if inscricao.bilhete_identidade_normalizado in bis:
+                mensagens.append('Este Bilhete de Identidade já está registrado no sistema.')
+            if inscricao.email_normalizado in emails:
+                mensagens.append('Este email já está sendo usado em outra inscrição.')
+            if inscricao.telefone_normalizado in telefones:
+                mensagens.append('Este telefone já está sendo usado em outra inscrição.')
+            if mensagens:
+                self.relatorio.adicionar_erro(linha, ' '.join(mensagens))
+            else:
+                validos.append((linha, inscricao))
+        return validos
+
+    def _gravar(self, lote):
+        lote = self._filtrar_existentes(lote)
+        if not lote:
+            return
+        for (_, inscricao), numero in zip(lote, reservar_numeros('INS', len(lote))):
+            inscricao.numero_inscricao = numero
+        try:
+            with transaction.atomic():
+                Inscricao.objects.bulk_create([inscricao for _, inscricao in lote])
+                invalidar_contadores()
+                marcar_desatualizadas({(i.ano_academico_id, i.curso_id) for _, i in lote})
+                somar(contar(i for _, i in lote))
+            self.relatorio.importadas += len(lote)
+        except IntegrityError:
+            # Conflito concorrente: grava linha a linha para isolar a(s) culpada(s)
+            for linha, inscricao in lote:
+                try:
+                    with transaction.atomic():
+                        inscricao.save()
+                    self.relatorio.importadas += 1
+                except IntegrityError as e:
+                    self.relatorio.adicionar_erro(linha, f'Erro ao gravar: {e}')
+
+    def importar(self, linhas):
+        lote = []
+        linhas = iter(linhas)
+        while True:
+            try:
+                numero, dados = next(linhas)
+            except StopIteration:
+                break
+            except ErroCodificacao as e:
+                # As linhas anteriores são gravadas; o resto do ficheiro não se consegue ler
+                self.relatorio.total += 1
+                self.relatorio.adicionar_erro(e.linha, 'O ficheiro não está em UTF-8 a partir desta linha; a importação parou aqui.')
+                break
+            self.relatorio.total += 1
+            try:
+                lote.append((numero, self._construir(dados)))
+            except ErroLinha as e:
+                self.relatorio.adicionar_erro(numero, str(e))
+            if len(lote) >= self.tamanho_lote:
+                self._gravar(lote)
+                lote = []
+        if lote:
+            self._gravar(lote)
+        self.relatorio.erros.sort()
+        return self.relatorio
+
+
+def importar_inscricoes(ficheiro, nome, curso_padrao=None, tamanho_lote=500):
+    """Importa inscrições de um ficheiro CSV/XLSX sem o carregar todo em memória"""
+    importador = ImportadorInscricoes(curso_padrao=curso_padrao, tamanho_lote=tamanho_lote)
+    return importador.importar(iterar_linhas(ficheiro, nome))
@@ -0,0 +1,203 @@
+import uuid
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .models import Curso, Escola, HistoricoAcademico, Inscricao, InscricaoPendente, NotaDisciplina
+from .normalizacao import normalizar_bilhete
+from .sequencias import proximo_numero
+
+CAMPOS_OBRIGATORIOS = [
+    'nome_completo', 'data_nascimento', 'local_nascimento', 'nacionalidade',
+    'bilhete_identidade', 'sexo', 'endereco', 'telefone', 'email', 'ano_conclusao',
+]
+
+MENSAGENS_DUPLICADO = {
+    'bilhete_identidade': 'Este Bilhete de Identidade já está registrado no sistema!',
+    'email': 'Este email já está sendo usado em outra inscrição!',
+    'telefone': 'Este telefone já está sendo usado em outra inscrição!',
+}
+
+CARACTERES_RECIBO = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+def dados_formulario(post):
+    """Cópia serializável (JSON) dos campos submetidos no formulário de inscrição"""
+    return {campo: valor for campo, valor in post.items() if campo != 'csrfmiddlewaretoken'}
+
+
+def validar_inscricao(dados):
+    """Validações feitas antes de aceitar a inscrição; devolve a mensagem de erro ou None"""
+    for campo in CAMPOS_OBRIGATORIOS:
+        if not (dados.get(campo) or '').strip():
+            return f'O campo "{campo}" é obrigatório.'
+    try:
+        date.fromisoformat(dados['data_nascimento'])
+        if dados.get('data_validade_bi'):
+            date.fromisoformat(dados['data_validade_bi'])
+    except ValueError:
+        return 'Data inválida. Use o formato AAAA-MM-DD.'
+    duplicados = Inscricao.campos_duplicados(
+        bilhete_identidade=dados.get('bilhete_identidade'),
+        email=dados.get('email'),
+        telefone=dados.get('telefone'),
+    )
+    if duplicados:
+        return ' '.join(MENSAGENS_DUPLICADO[campo] for campo in duplicados)
+    return None
+
+
+def criar_inscricao(curso, dados):
+    """Grava a inscrição, o histórico académico e as notas dos pré-requisitos.
+
+    Tudo numa só transação: a inscrição, os agregados mantidos pelos sinais
+    (estatísticas, série diária) e as notas são gravados juntos (ou nada é
+    gravado), com um único bloqueio de escrita. O número é atribuído antes,
+    fora da transação, para poder vir do bloco já reservado pelo processo
+    (sequencias.proximo_numero).
+    """
+    numero = proximo_numero('INS')
+    with transaction.atomic():
+        escola = None
+        if dados.get('escola_id'):
+            escola = Escola.objects.filter(id=dados['escola_id']).first() if str(dados['escola_id']).isdigit() else None
+
+        inscricao = Inscricao(
+            numero_inscricao=numero,
+            curso=curso,
+            # 1. Informações Pessoais
+            nome_completo=dados['nome_completo'],
+            data_nascimento=dados['data_nascimento'],
+            local_nascimento=dados['local_nascimento'],
+            nacionalidade=dados['nacionalidade'],
+            bilhete_identidade=dados['bilhete_identidade'],
+            data_validade_bi=dados.get('data_validade_bi') or None,
+            sexo=dados['sexo'],
+            estado_civil=dados.get('estado_civil', 'S'),
+            endereco=dados['endereco'],
+            telefone=dados['telefone'],
+            email=dados['email'],
+            # 2. Informações Académicas
+            escola=escola,
+            ano_conclusao=dados['ano_conclusao'],
+            certificados_obtidos=dados.get('certificados_obtidos', ''),
+            historico_escolar=dados.get('historico_escolar', ''),
+            turno_preferencial=dados.get('turno_preferencial', 'M'),
+            # 3. Informações Financeiras
+            numero_comprovante=dados.get('numero_comprovante', ''),
+            responsavel_financeiro_nome=dados.get('responsavel_financeiro_nome', ''),
+            responsavel_financeiro_telefone=dados.get('responsavel_financeiro_telefone', ''),
+            responsavel_financeiro_relacao=dados.get('responsavel_financeiro_relacao', ''),
+            # 4. Encarregado de Educação
+            encarregado_nome=dados.get('encarregado_nome', ''),
+            encarregado_parentesco=dados.get('encarregado_parentesco', ''),
+            encarregado_telefone=dados.get('encarregado_telefone', ''),
+            encarregado_email=dados.get('encarregado_email', ''),
+            encarregado_profissao=dados.get('encarregado_profissao', ''),
+            encarregado_local_trabalho=dados.get('encarregado_local_trabalho', ''),
+        )
+        inscricao.save()
+
+        # Criar histórico académico e salvar notas se curso requer pré-requisitos
+        if curso.requer_prerequisitos:
+            historico, created = HistoricoAcademico.objects.get_or_create(inscricao=inscricao)
+
+            for prereq in curso.prerequisitos.all():
+                nota_str = dados.get(f'nota_{prereq.disciplina_prerequisito_id}')
+                if nota_str:
+                    try:
+                        nota = float(nota_str)
+                        ano = int(dados.get(f'ano_{prereq.disciplina_prerequisito_id}', 2024))
+                        NotaDisciplina.objects.update_or_create(
+                            historico=historico,
+                            disciplina=prereq.disciplina_prerequisito,
+                            defaults={'nota': nota, 'ano_conclusao': ano}
+                        )
+                    except (ValueError, TypeError):
+                        pass
+
+        if curso.prerequisitos.exists():
+            from .elegibilidade import avaliar_inscricao
+            avaliar_inscricao(inscricao)
+
+        return inscricao
+
+
+def enfileirar_inscricao(curso, dados):
+    """Aceita a submissão na fila e devolve o registo com o recibo provisório.
+
+    Uma segunda submissão com o mesmo BI ainda pendente (ex.: duplo clique)
+    devolve o recibo já emitido em vez de criar outro.
+    """
+    bilhete = normalizar_bilhete(dados.get('bilhete_identidade'))
+    existente = InscricaoPendente.objects.filter(
+        bilhete_identidade_normalizado=bilhete, curso=curso, estado='pendente'
+    ).first()
+    if existente:
+        return existente
+    while True:
+        recibo = f"REC-{get_random_string(8, CARACTERES_RECIBO)}"
+        try:
+            with transaction.atomic():
+                return InscricaoPendente.objects.create(
+                    recibo=recibo, curso=curso, dados=dados, bilhete_identidade_normalizado=bilhete,
+                )
+        except IntegrityError:
+            # Recibo já emitido (colisão improvável): gera outro
+            continue
+
+
+def _processar_pendente(pendente, cursos):
+    curso = cursos.get(pendente.curso_id)
+    if curso is None:
+        curso = cursos[pendente.curso_id] = Curso.objects.get(pk=pendente.curso_id)
+    if not curso.ativo:
+        raise ValidationError(f'O curso "{curso.nome}" deixou de aceitar inscrições.')
+    erro = validar_inscricao(pendente.dados)
+    if erro:
+        raise ValidationError(erro)
+    # criar_inscricao() abre um savepoint: uma rejeição não desfaz o resto do lote
+    return criar_inscricao(curso, pendente.dados)
+
+
+def processar_fila(tamanho_lote=100):
+    """Grava as inscrições em fila, um lote de cada vez.
+
+    Cada lote corre numa única transação: é reclamado com um UPDATE
+    condicional (estado='pendente' → 'processando', com uma reserva própria)
+    e cada submissão é gravada num savepoint dentro dela, por isso uma
+    submissão inválida é rejeitada com o motivo sem afetar as restantes.
+    O UPDATE condicional serializa vários processadores em simultâneo
+    (cron e um processamento manual) também em SQLite, onde
+    select_for_update() não faz nada: cada submissão só é reclamada por um.
+    Devolve {'processadas': n, 'rejeitadas': n}.
+    """
+    resultado = {'processadas': 0, 'rejeitadas': 0}
+    cursos = {}
+    while True:
+        with transaction.atomic():
+            reserva = uuid.uuid4().hex
+            seguintes = InscricaoPendente.objects.filter(estado='pendente').order_by('id').values('id')[:tamanho_lote]
+            reclamadas = InscricaoPendente.objects.filter(id__in=seguintes, estado='pendente').update(
+                estado='processando', reserva=reserva,
+            )
+            if not reclamadas:
+                break
+            lote = list(InscricaoPendente.objects.filter(estado='processando', reserva=reserva).order_by('id'))
+            for pendente in lote:
+                try:
+                    pendente.inscricao = _processar_pendente(pendente, cursos)
+                    pendente.estado = 'processada'
+                    resultado['processadas'] += 1
+                except (ValidationError, IntegrityError, ValueError, KeyError) as e:
+                    pendente.estado = 'rejeitada'
+                    pendente.motivo_rejeicao = '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+                    resultado['rejeitadas'] += 1
+                pendente.data_processamento = timezone.now()
+            InscricaoPendente.objects.bulk_update(
+                lote, ['estado', 'inscricao', 'motivo_rejeicao', 'data_processamento']
+            )
+    return resultado
@@ -0,0 +1,198 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least
+from django.http import HttpResponse, JsonResponse
+from django.utils.module_loading import import_string
+
+from .models import BaldePedidos
+
+PERIODOS = {'s': 1, 'm': 60, 'h': 60 * 60}
+MAXIMO_CHAVES = 10000
+# Baldes guardados na base de dados sem uso há mais de um dia são apagados
+LIMPEZA_SEGUNDOS = 24 * 60 * 60
+LIMPEZA_A_CADA = 1000
+
+
+def _ler_taxa(taxa):
+    """'5/m', '20/10m', '100/h' → (capacidade, fichas repostas por segundo)"""
+    encontrado = re.fullmatch(r'(\d+)/(\d*)([smh])', taxa)
+    if not encontrado:
+        raise ValueError(f'Taxa inválida: {taxa!r} (use, por exemplo, "5/m" ou "20/10m")')
+    capacidade, multiplo, unidade = encontrado.groups()
+    periodo = int(multiplo or 1) * PERIODOS[unidade]
+    return int(capacidade), int(capacidade) / periodo
+
+
+def _consumir(estado, capacidade, reposicao, agora):
+    """Balde de fichas: devolve (novo estado, segundos a esperar; 0 se o pedido passa)"""
+    fichas, atualizado = estado if estado else (capacidade, agora)
+    fichas = min(capacidade, fichas + max(0.0, agora - atualizado) * reposicao)
+    if fichas >= 1:
+        return (fichas - 1, agora), 0
+    return (fichas, agora), (1 - fichas) / reposicao
+
+
+class ArmazemMemoria:
+    """Baldes na memória do processo (cada worker conta à parte). Guarda até MAXIMO_CHAVES baldes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baldes = OrderedDict()
+
+    def consumir(self, chave, capacidade, reposicao):
+        with self._lock:
+            estado, espera = _consumir(self._baldes.pop(chave, None), capacidade, reposicao, time.monotonic())
+            self._baldes[chave] = estado
+            if len(self._baldes) > MAXIMO_CHAVES:
+                self._baldes.popitem(last=False)
+        return espera
+
+    def limpar(self):
+        with self._lock:
+            self._baldes.clear()
+
+
+class ArmazemCache:
+    """Baldes na cache do Django (LIMITES_PEDIDOS_CACHE), partilhados pelos processos que a partilham.
+
+    A leitura e a escrita não são atómicas: sob concorrência alguns pedidos
+    podem passar a mais, o que chega para travar abusos.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.LIMITES_PEDIDOS_CACHE]
+
+    def consumir(self, chave, capacidade, reposicao):
+        chave = f'limite:{chave}'
+        estado, espera = _consumir(self.cache.get(chave), capacidade, reposicao, time.time())
+        # Depois de cheio outra vez o balde pode ser esquecido
+        self.cache.set(chave, estado, math.ceil(capacidade / reposicao))
+        return espera
+
+    def limpar(self):
+        pass
+
+
+class ArmazemBaseDados:
+    """Baldes na tabela BaldePedidos, partilhados por todos os workers.
+
+    Repor e gastar a ficha é um único UPDATE condicional (WHERE fichas
+    disponíveis >= 1), atómico também em SQLite, onde select_for_update()
+    não bloqueia nada: dois workers nunca gastam a mesma ficha. Os pedidos
+    recusados só leem o balde.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._consumos = 0
+
+    def consumir(self, chave, capacidade, reposicao):
+        agora = time.time()
+        disponiveis = Least(
+            Value(float(capacidade)),
+            F('fichas') + Greatest(Value(agora) - F('atualizado'), Value(0.0)) * Value(reposicao),
+            output_field=FloatField(),
+        )
+        baldes = BaldePedidos.objects.filter(pk=chave)
+        espera = 0
+        if not baldes.alias(disponiveis=disponiveis).filter(disponiveis__gte=1).update(
+                fichas=disponiveis - 1, atualizado=agora):
+            estado = baldes.values_list('fichas', 'atualizado').first()
+            if estado is None:
+                try:
+                    with transaction.atomic():
+                        BaldePedidos.objects.create(chave=chave, fichas=capacidade - 1, atualizado=agora)
+                except IntegrityError:
+                    # Outro worker criou o balde entretanto: volta a tentar gastar uma ficha
+                    return self.consumir(chave, capacidade, reposicao)
+            else:
+                espera = _consumir(estado, capacidade, reposicao, agora)[1]
+        with self._lock:
+            self._consumos += 1
+            limpar = self._consumos % LIMPEZA_A_CADA == 0
+        if limpar:
+            BaldePedidos.objects.filter(atualizado__lt=agora - LIMPEZA_SEGUNDOS).delete()
+        return espera
+
+    def limpar(self):
+        BaldePedidos.objects.all().delete()
+
+
+_armazem = (None, None)
+
+
+def armazem():
+    """Instância (por processo) da classe indicada em LIMITES_PEDIDOS_ARMAZEM"""
+    global _armazem
+    caminho, instancia = _armazem
+    if caminho != settings.LIMITES_PEDIDOS_ARMAZEM:
+        caminho = settings.LIMITES_PEDIDOS_ARMAZEM
+        instancia = import_string(caminho)()
+        _armazem = (caminho, instancia)
+    return instancia
+
+
+class Limite:
+    """Um balde por valor de `chave`: 'ip', 'POST:<campo>', 'GET:<campo>' ou 'sessao:<chave>'"""
+
+    def __init__(self, taxa, chave='ip', metodos=('POST',)):
+        self.taxa = taxa
+        self.capacidade, self.reposicao = _ler_taxa(taxa)
+        self.chave = chave
+        self.metodos = metodos
+
+    def valor(self, request):
+        if self.chave == 'ip':
+            return endereco_ip(request)
+        origem, _, nome = self.chave.partition(':')
+        if origem == 'sessao':
+            valor = request.session.get(nome)
+        else:
+            valor = getattr(request, origem).get(nome)
+        if valor in (None, ''):
+            return None
+        # Os identificadores (utilizador, email...) não ficam guardados em claro
+        return hashlib.sha256(str(valor).strip().lower().encode()).hexdigest()[:16]
+
+
+def limitar(taxa, chave='ip', metodos=('POST',)):
+    """Declara um limite de pedidos numa view (aplicado pelo LimitePedidosMiddleware).
+
+    Pode ser repetido para combinar limites, por exemplo por IP e por
+    utilizador. metodos=None aplica o limite a todos os métodos.
+    """
+    limite = Limite(taxa, chave, metodos)
+
+    def decorador(view):
+        view.limites_pedidos = getattr(view, 'limites_pedidos', ()) + (limite,)
+        return view
+    return decorador
+
+
+def endereco_ip(request):
+    cabecalho = settings.LIMITES_PEDIDOS_CABECALHO_IP
+    if cabecalho and request.META.get(cabecalho):
+        # O último endereço é o acrescentado pelo nosso proxy; os anteriores vêm do cliente
+        return request.META[cabecalho].split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def resposta_limitada(request, espera):
+    """429 barato (sem sessão, templates nem base de dados) com o cabeçalho Retry-After"""
+    mensagem = 'Demasiados pedidos. Aguarde um pouco antes de tentar novamente.'
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        resposta = JsonResponse({'erro': mensagem}, status=429)
+    else:
+        resposta = HttpResponse(mensagem, status=429, content_type='text/plain; charset=utf-8')
+    resposta['Retry-After'] = str(max(1, math.ceil(espera)))
+    return resposta
+
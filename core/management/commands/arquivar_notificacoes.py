@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.notificacoes import apagar_arquivadas, arquivar_antigas
+
+
+class Command(BaseCommand):
+    help = ('Arquiva as entregas de notificações mais antigas do que o prazo de retenção '
+            '(NOTIFICACOES_RETENCAO_DIAS) e, opcionalmente, apaga as arquivadas há muito tempo')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.NOTIFICACOES_RETENCAO_DIAS,
+                            help=f'Arquiva as entregas com mais de N dias (padrão: {settings.NOTIFICACOES_RETENCAO_DIAS})')
+        parser.add_argument('--apagar', type=int, metavar='DIAS',
+                            help='Apaga também as entregas arquivadas com mais de DIAS dias')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Entregas tratadas por transação (padrão: 500)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        arquivadas = arquivar_antigas(options['dias'], tamanho_lote=options['lote'])
+        apagadas = apagar_arquivadas(options['apagar'], tamanho_lote=options['lote']) if options['apagar'] is not None else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{arquivadas} entrega(s) arquivada(s), {apagadas} apagada(s) em {time.monotonic() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.estatisticas import atualizar_estatisticas, reconstruir_estatisticas
+from core.models import AnoAcademico
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas pré-agregadas por ano académico e curso (agendar periodicamente: o dashboard só as lê)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', metavar='AAAA/AAAA',
+                            help='Ano académico a processar (ex.: 2024/2025); por omissão, todos')
+        parser.add_argument('--reconstruir', action='store_true',
+                            help='Recalcula tudo a partir das inscrições, incluindo anos encerrados')
+
+    def handle(self, *args, **options):
+        ano = None
+        if options['ano']:
+            try:
+                inicio, fim = (int(parte) for parte in options['ano'].split('/'))
+                ano = AnoAcademico.objects.get(ano_inicio=inicio, ano_fim=fim)
+            except (ValueError, AnoAcademico.DoesNotExist):
+                raise CommandError(f'Ano académico "{options["ano"]}" não encontrado.')
+
+        if options['reconstruir']:
+            total = reconstruir_estatisticas(ano=ano)
+        else:
+            total = atualizar_estatisticas(ano=ano)
+        self.stdout.write(self.style.SUCCESS(f'{total} estatística(s) ano/curso recalculada(s).'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.elegibilidade import avaliar_curso
+from core.models import Curso
+
+
+class Command(BaseCommand):
+    help = 'Avalia em lote os pré-requisitos dos candidatos e grava o veredicto de elegibilidade'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', action='append', dest='cursos', metavar='CODIGO',
+                            help='Código do curso a avaliar (pode ser repetido)')
+        parser.add_argument('--incluir-inativos', action='store_true',
+                            help='Avalia também os cursos inativos')
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.all()
+        if not options['incluir_inativos']:
+            cursos = cursos.filter(ativo=True)
+        if options['cursos']:
+            cursos = cursos.filter(codigo__in=options['cursos'])
+            encontrados = set(cursos.values_list('codigo', flat=True))
+            em_falta = sorted(set(options['cursos']) - encontrados)
+            if em_falta:
+                raise CommandError(f'Curso(s) não encontrado(s): {", ".join(em_falta)}')
+
+        inicio = time.monotonic()
+        total = 0
+        for curso in cursos:
+            alteradas = avaliar_curso(curso)
+            total += alteradas
+            self.stdout.write(f'{curso.codigo}: {alteradas} veredicto(s) alterado(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} inscrição(ões) reavaliada(s) em {time.monotonic() - inicio:.1f}s.'
+        ))
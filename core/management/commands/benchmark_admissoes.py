@@ -0,0 +1,272 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.aprovacoes import processar_aprovacoes
+from core.elegibilidade import avaliar_curso
+from core.models import (
+    Curso, Disciplina, Escola, HistoricoAcademico, Inscricao, NotaDisciplina, PrerequisitoDisciplina,
+)
+from core.sequencias import reservar_numeros
+
+CENARIOS = ['inscricao_create', 'inscricao_create_pico', 'inscricao_buscar', 'inscricao_consulta', 'gerar_pdf_confirmacao']
+
+
+def percentil(amostras, p):
+    if len(amostras) < 2:
+        return amostras[0] if amostras else 0.0
+    return statistics.quantiles(amostras, n=100, method='inclusive')[p - 1]
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Mede latência (p50/p95/p99), consultas por pedido e débito das views de admissão '
+            'numa base de dados de teste com dados sintéticos')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inscricoes', type=int, default=100000,
+                            help='Inscrições sintéticas a gerar (padrão: 100000)')
+        parser.add_argument('--cursos', type=int, default=8, help='Cursos a gerar (padrão: 8)')
+        parser.add_argument('--escolas', type=int, default=200, help='Escolas a gerar (padrão: 200)')
+        parser.add_argument('--pedidos', type=int, default=300,
+                            help='Pedidos medidos por cenário (padrão: 300)')
+        parser.add_argument('--cenario', action='append', dest='cenarios', choices=CENARIOS,
+                            help='Cenário a medir (pode ser repetido; padrão: todos)')
+        parser.add_argument('--semente', type=int, default=2024,
+                            help='Semente dos dados aleatórios, para resultados reprodutíveis')
+        parser.add_argument('--saida', metavar='JSON', help='Grava os resultados neste ficheiro JSON')
+        parser.add_argument('--comparar', metavar='JSON',
+                            help='Compara com um resultado gravado anteriormente com --saida')
+
+    def handle(self, *args, **options):
+        self.aleatorio = random.Random(options['semente'])
+        referencia = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as ficheiro:
+                    referencia = json.load(ficheiro)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Não foi possível ler {options["comparar"]}: {e}')
+
+        # Nunca toca na base de dados real: cria (e no fim destrói) a base de teste.
+        # Dentro do runner de testes a base já é a de teste e não é recriada
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            base_propria = False
+        else:
+            base_propria = True
+            nome_original = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Caches em memória, só deste comando: na cache em ficheiros do projeto
+        # ficariam o ano académico e as sessões da base de teste, lidos depois
+        # pelo servidor. Todos os pedidos vêm do mesmo IP, por isso os limites
+        # de pedidos (core.limites) ficam de fora da medição.
+        caches_benchmark = {
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}'}
+            for alias in settings.CACHES
+        }
+        try:
+            with override_settings(CACHES=caches_benchmark, LIMITES_PEDIDOS_ATIVOS=False):
+                try:
+                    geracao = self.gerar_dados(options)
+                    cenarios = {}
+                    for nome in options['cenarios'] or CENARIOS:
+                        cenarios[nome] = getattr(self, f'medir_{nome}')(options['pedidos'])
+                        self.mostrar(nome, cenarios[nome], referencia)
+                finally:
+                    for alias in caches_benchmark:
+                        caches[alias].clear()
+        finally:
+            if base_propria:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+                teardown_test_environment()
+
+        resultado = {
+            'commit': commit_atual(),
+            'data': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'base_dados': connection.vendor,
+            'parametros': {chave: options[chave] for chave in ('inscricoes', 'cursos', 'escolas', 'pedidos', 'semente')},
+            'geracao': geracao,
+            'cenarios': cenarios,
+        }
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as ficheiro:
+                json.dump(resultado, ficheiro, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'Resultados gravados em {options["saida"]}'))
+
+    # Dados sintéticos
+
+    def gerar_dados(self, options):
+        inicio = time.monotonic()
+        aleatorio = self.aleatorio
+        self.escolas = Escola.objects.bulk_create([
+            Escola(nome=f'Escola Sintética {i}', municipio='Luanda', provincia='Luanda')
+            for i in range(options['escolas'])
+        ])
+        self.cursos = Curso.objects.bulk_create([
+            Curso(codigo=f'BENCH{i}', nome=f'Curso Sintético {i}', vagas=max(1, options['inscricoes'] // (options['cursos'] * 4)),
+                  nota_minima=Decimal('10.00'), requer_prerequisitos=True)
+            for i in range(options['cursos'])
+        ])
+        self.prerequisitos = {}
+        for curso in self.cursos:
+            disciplinas = Disciplina.objects.bulk_create([
+                Disciplina(curso=curso, nome=f'Disciplina {j}', codigo=f'{curso.codigo}-D{j}') for j in range(4)
+            ])
+            PrerequisitoDisciplina.objects.bulk_create([
+                PrerequisitoDisciplina(curso=curso, disciplina_prerequisito=d, nota_minima_prerequisito=Decimal('10.00'),
+                                       obrigatorio=j < 2, ordem=j)
+                for j, d in enumerate(disciplinas)
+            ])
+            self.prerequisitos[curso.pk] = [d.pk for d in disciplinas]
+
+        linhas = len(self.escolas) + len(self.cursos) * 9
+        lote = 2000
+        for base in range(0, options['inscricoes'], lote):
+            quantidade = min(lote, options['inscricoes'] - base)
+            numeros = reservar_numeros('INS', quantidade)
+            inscricoes = []
+            for i, numero in zip(range(base, base + quantidade), numeros):
+                inscricao = Inscricao(
+                    numero_inscricao=numero,
+                    curso=aleatorio.choice(self.cursos),
+                    escola=aleatorio.choice(self.escolas),
+                    nome_completo=f'Candidato Sintético {i}',
+                    data_nascimento='2005-01-01',
+                    local_nascimento='Luanda',
+                    bilhete_identidade=f'{i:09d}LA{i % 100:03d}',
+                    sexo=aleatorio.choice('MF'),
+                    endereco='Luanda',
+                    telefone=f'9{i:08d}',
+                    email=f'candidato{i}@bench.ao',
+                    ano_conclusao='2024',
+                    nota_teste=Decimal(aleatorio.randint(0, 2000)) / 100 if aleatorio.random() < 0.8 else None,
+                )
+                inscricao.atualizar_campos_normalizados()
+                inscricoes.append(inscricao)
+            Inscricao.objects.bulk_create(inscricoes)
+            historicos = HistoricoAcademico.objects.bulk_create([HistoricoAcademico(inscricao=i) for i in inscricoes])
+            notas = [
+                NotaDisciplina(historico=historico, disciplina_id=disciplina, ano_conclusao=2024,
+                               nota=Decimal(aleatorio.randint(600, 2000)) / 100)
+                for historico, inscricao in zip(historicos, inscricoes)
+                for disciplina in self.prerequisitos[inscricao.curso_id]
+            ]
+            NotaDisciplina.objects.bulk_create(notas, batch_size=5000)
+            linhas += len(inscricoes) + len(historicos) + len(notas)
+
+        for curso in self.cursos:
+            avaliar_curso(curso)
+        processar_aprovacoes([curso.pk for curso in self.cursos])
+        duracao = time.monotonic() - inicio
+        self.numeros = list(Inscricao.objects.values_list('numero_inscricao', flat=True))
+        self.proximo_candidato = options['inscricoes']
+        self.stdout.write(f'Dados gerados: {linhas} linhas em {duracao:.1f}s ({linhas / duracao:.0f} linhas/s)')
+        return {'linhas': linhas, 'segundos': round(duracao, 3), 'linhas_por_segundo': round(linhas / duracao, 1)}
+
+    def dados_candidato(self, curso):
+        i = self.proximo_candidato
+        self.proximo_candidato += 1
+        dados = {
+            'nome_completo': f'Candidato Novo {i}', 'data_nascimento': '2005-06-01', 'local_nascimento': 'Luanda',
+            'nacionalidade': 'Angolana', 'bilhete_identidade': f'{i:09d}LA{i % 100:03d}', 'sexo': 'F',
+            'estado_civil': 'S', 'endereco': 'Luanda', 'telefone': f'9{i:08d}', 'email': f'candidato{i}@bench.ao',
+            'escola_id': str(self.aleatorio.choice(self.escolas).pk), 'ano_conclusao': '2024',
+            'turno_preferencial': 'M',
+        }
+        for disciplina in self.prerequisitos[curso.pk]:
+            dados[f'nota_{disciplina}'] = str(self.aleatorio.randint(8, 20))
+            dados[f'ano_{disciplina}'] = '2024'
+        return dados
+
+    # Medição
+
+    def medir(self, pedidos, pedido, estado_esperado=200):
+        """Executa `pedido(cliente)` várias vezes e resume latência e consultas"""
+        cliente = Client()
+        latencias, consultas = [], []
+        inicio_total = time.perf_counter()
+        for _ in range(pedidos):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resposta = pedido(cliente)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != estado_esperado:
+                raise CommandError(f'Resposta inesperada {resposta.status_code} durante a medição.')
+            consultas.append(len(capturadas))
+        duracao = time.perf_counter() - inicio_total
+        return {
+            'pedidos': pedidos,
+            'p50_ms': round(percentil(latencias, 50), 3),
+            'p95_ms': round(percentil(latencias, 95), 3),
+            'p99_ms': round(percentil(latencias, 99), 3),
+            'media_ms': round(statistics.fmean(latencias), 3),
+            'consultas_por_pedido': round(statistics.fmean(consultas), 2),
+            'consultas_max': max(consultas),
+            'pedidos_por_segundo': round(pedidos / duracao, 1),
+        }
+
+    def medir_inscricao_create(self, pedidos):
+        def pedido(cliente):
+            curso = self.aleatorio.choice(self.cursos)
+            return cliente.post(f'/inscricao/{curso.pk}/', self.dados_candidato(curso))
+        return self.medir(pedidos, pedido, estado_esperado=302)
+
+    def medir_inscricao_create_pico(self, pedidos):
+        with override_settings(INSCRICOES_MODO_PICO=True):
+            return self.medir_inscricao_create(pedidos)
+
+    def medir_inscricao_buscar(self, pedidos):
+        return self.medir(pedidos, lambda cliente: cliente.post(
+            '/inscricao/buscar/', {'numero_inscricao': self.aleatorio.choice(self.numeros)}), estado_esperado=302)
+
+    def medir_inscricao_consulta(self, pedidos):
+        return self.medir(pedidos, lambda cliente: cliente.get(
+            f'/inscricao/consulta/{self.aleatorio.choice(self.numeros)}/'))
+
+    def medir_gerar_pdf_confirmacao(self, pedidos):
+        return self.medir(pedidos, lambda cliente: cliente.get(
+            f'/inscricao/pdf/{self.aleatorio.choice(self.numeros)}/'))
+
+    # Relatório
+
+    def mostrar(self, nome, metricas, referencia):
+        self.stdout.write(
+            f'{nome:<24} p50 {metricas["p50_ms"]:8.2f}ms  p95 {metricas["p95_ms"]:8.2f}ms  '
+            f'p99 {metricas["p99_ms"]:8.2f}ms  {metricas["consultas_por_pedido"]:6.1f} consultas/pedido  '
+            f'{metricas["pedidos_por_segundo"]:8.1f} pedidos/s'
+        )
+        anterior = (referencia or {}).get('cenarios', {}).get(nome)
+        if not anterior:
+            return
+        diferencas = []
+        for chave in ('p50_ms', 'p95_ms', 'p99_ms', 'consultas_por_pedido'):
+            if anterior.get(chave):
+                variacao = (metricas[chave] - anterior[chave]) / anterior[chave] * 100
+                diferencas.append(f'{chave} {variacao:+.1f}%')
+        estilo = self.style.ERROR if metricas['p95_ms'] > anterior.get('p95_ms', 0) * 1.1 else self.style.SUCCESS
+        origem = referencia.get('commit') or referencia.get('data', 'referência')
+        self.stdout.write(estilo(f'{"":<24} vs {origem}: {", ".join(diferencas)}'))
@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.models import ImpressaoSenha
+
+
+class Command(BaseCommand):
+    help = ('Mostra quantas contas já têm impressão de senha. As que faltam são preenchidas '
+            'no próximo login (core.senhas.ImpressaoSenhaBackend), porque só aí a senha é conhecida')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repor', action='store_true',
+                            help='Apaga todas as impressões (depois de mudar SENHAS_PIMENTA); '
+                                 'voltam a ser criadas à medida que os utilizadores entram')
+
+    def handle(self, *args, **options):
+        if options['repor']:
+            apagadas, _ = ImpressaoSenha.objects.all().delete()
+            self.stdout.write(f'{apagadas} impressão(ões) apagada(s).')
+
+        total = User.objects.count()
+        com_impressao = ImpressaoSenha.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'{com_impressao} de {total} conta(s) com impressão de senha; '
+            f'{total - com_impressao} por preencher no próximo login.'
+        ))
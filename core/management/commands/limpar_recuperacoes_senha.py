@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RecuperacaoSenha
+
+
+class Command(BaseCommand):
+    help = ('Apaga os pedidos de recuperação de senha expirados ou já usados, em lotes pela data de '
+            'expiração (indexada). Para correr periodicamente (cron), por exemplo a cada hora')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Registos apagados por consulta')
+
+    def handle(self, *args, **options):
+        # Os usados também ficam expirados (RecuperacaoSenha.marcar_como_usado)
+        antigas = RecuperacaoSenha.objects.filter(data_expiracao__lt=timezone.now()).order_by('data_expiracao')
+        total = 0
+        while True:
+            lote = list(antigas.values_list('pk', flat=True)[:options['lote']])
+            if not lote:
+                break
+            total += RecuperacaoSenha.objects.filter(pk__in=lote).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'{total} pedido(s) de recuperação de senha apagado(s).'))
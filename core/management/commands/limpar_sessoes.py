@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Apaga as sessões expiradas da base de dados em lotes pela data de expiração (indexada), '
+            'sem bloquear a tabela como o clearsessions. Para correr periodicamente (cron), por exemplo de hora a hora')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Sessões apagadas por consulta')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write('As sessões estão em cookies assinados: não há nada a limpar.')
+            return
+
+        expiradas = Session.objects.filter(expire_date__lt=timezone.now()).order_by('expire_date')
+        total = 0
+        while True:
+            lote = list(expiradas.values_list('pk', flat=True)[:options['lote']])
+            if not lote:
+                break
+            total += Session.objects.filter(pk__in=lote).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'{total} sessão(ões) expirada(s) apagada(s).'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.aprovacoes import processar_aprovacoes
+from core.models import Curso
+
+
+class Command(BaseCommand):
+    help = 'Classifica as inscrições e aplica as aprovações de todos os cursos ativos numa só passagem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', action='append', dest='cursos', metavar='CODIGO',
+                            help='Código do curso a processar (pode ser repetido)')
+        parser.add_argument('--incluir-inativos', action='store_true',
+                            help='Processa também os cursos inativos')
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.all()
+        if not options['incluir_inativos']:
+            cursos = cursos.filter(ativo=True)
+        if options['cursos']:
+            cursos = cursos.filter(codigo__in=options['cursos'])
+            encontrados = set(cursos.values_list('codigo', flat=True))
+            em_falta = sorted(set(options['cursos']) - encontrados)
+            if em_falta:
+                raise CommandError(f'Curso(s) não encontrado(s): {", ".join(em_falta)}')
+
+        resultado = processar_aprovacoes(cursos)
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["aprovados"]} inscrição(ões) aprovada(s), '
+            f'{resultado["retirados"]} aprovação(ões) retirada(s).'
+        ))
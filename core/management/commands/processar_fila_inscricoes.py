@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.inscricoes import processar_fila
+
+
+class Command(BaseCommand):
+    help = 'Grava em lotes as inscrições recebidas no modo de pico (INSCRICOES_MODO_PICO)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100,
+                            help='Número de submissões gravadas por transação (padrão: 100)')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Continua a vigiar a fila até ser interrompido (Ctrl+C)')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera entre passagens no modo contínuo (padrão: 2)')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                resultado = processar_fila(tamanho_lote=options['lote'])
+                if resultado['processadas'] or resultado['rejeitadas'] or not options['continuo']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{resultado["processadas"]} inscrição(ões) gravada(s), '
+                        f'{resultado["rejeitadas"]} rejeitada(s).'
+                    ))
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
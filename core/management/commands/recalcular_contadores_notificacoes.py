@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notificacoes import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula de raiz os contadores de notificações por ler de todos os utilizadores'
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        total = recalcular_contadores()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} contador(es) recalculado(s) em {time.monotonic() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.academico import ESTADOS_ATIVOS, invalidar_subscricao
+from core.models import Subscricao
+
+
+class Command(BaseCommand):
+    help = ('Atualiza o estado das subscrições: marca como expiradas as que passaram a data de expiração '
+            'e reativa as expiradas que foram renovadas. Para correr uma vez por dia (cron), logo após a meia-noite')
+
+    def handle(self, *args, **options):
+        hoje = date.today()
+        with transaction.atomic():
+            expiradas = Subscricao.objects.filter(
+                estado__in=ESTADOS_ATIVOS, data_expiracao__lt=hoje
+            ).update(estado='expirado')
+            renovadas = Subscricao.objects.filter(
+                estado='expirado', data_expiracao__gte=hoje
+            ).update(estado='ativo')
+            # update() não envia post_save: o estado da licença em cache é invalidado aqui
+            invalidar_subscricao()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{expiradas} subscrição(ões) expirada(s), {renovadas} renovada(s).'
+        ))
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.deprecation import MiddlewareMixin
+
+from . import limites
+from .academico import estado_licenca
+
+# Páginas acessíveis mesmo com a licença expirada (para poder renovar ou sair)
+URLS_LIVRES = frozenset([
+    'login', 'logout', 'registro', 'renovar_subscricao', 'pagamento_subscricao',
+    'esqueci_senha', 'validar_otp', 'redefinir_senha_email',
+])
+
+
+class LicencaMiddleware(MiddlewareMixin):
+    """Envia os utilizadores autenticados para a renovação quando a licença expirou.
+
+    O estado vem pré-calculado de core.academico.estado_licenca(), por isso
+    o custo por pedido é uma leitura de dicionário. Sem nenhuma subscrição
+    registada a licença não é aplicada. Suporta ASGI (MiddlewareMixin), para
+    não obrigar as views async a correr numa thread.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefixos_livres = tuple(p for p in (settings.STATIC_URL, settings.MEDIA_URL) if p)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not request.user.is_authenticated:
+            return None
+        rota = request.resolver_match
+        if rota.url_name in URLS_LIVRES or 'admin' in rota.namespaces or request.path.startswith(self.prefixos_livres):
+            return None
+        licenca = estado_licenca()
+        if licenca is None or licenca['ativo']:
+            return None
+        mensagem = 'A subscrição da escola expirou. Renove-a para continuar a usar o sistema.'
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'erro': mensagem}, status=403)
+        messages.warning(request, mensagem)
+        return redirect('renovar_subscricao')
+
+
+class LimitePedidosMiddleware(MiddlewareMixin):
+    """Aplica os limites declarados com @limitar, antes de a view (e os outros middlewares) correrem.
+
+    As views sem limites custam um getattr. Os baldes ficam no armazém de
+    LIMITES_PEDIDOS_ARMAZEM: memória do processo, cache ou base de dados.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        declarados = getattr(view_func, 'limites_pedidos', None)
+        if not declarados or not settings.LIMITES_PEDIDOS_ATIVOS:
+            return None
+        espera = 0
+        for indice, limite in enumerate(declarados):
+            if limite.metodos is not None and request.method not in limite.metodos:
+                continue
+            valor = limite.valor(request)
+            if not valor:
+                continue
+            chave = f'{view_func.__name__}:{indice}:{valor}'
+            espera = max(espera, limites.armazem().consumir(chave, limite.capacidade, limite.reposicao))
+        if espera:
+            return limites.resposta_limitada(request, espera)
+        return None
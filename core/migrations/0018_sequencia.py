@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_inscricao_curso_nota_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefixo', models.CharField(max_length=10, unique=True, verbose_name='Prefixo')),
+                ('ultimo_valor', models.PositiveBigIntegerField(default=0, verbose_name='Último Valor Atribuído')),
+            ],
+            options={
+                'verbose_name': 'Sequência',
+                'verbose_name_plural': 'Sequências',
+                'ordering': ['prefixo'],
+            },
+        ),
+    ]
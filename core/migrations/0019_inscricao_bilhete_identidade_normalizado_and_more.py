@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:10
+
+import re
+
+from django.db import migrations, models
+
+
+# Cópia de core.normalizacao tal como estava nesta migração: a migração não pode
+# depender do código atual, que pode mudar (ou deixar de existir) mais tarde
+def normalizar_bilhete(valor):
+    return re.sub(r'[\s\-.]', '', valor or '').upper()
+
+
+def normalizar_email(valor):
+    return (valor or '').strip().lower()
+
+
+def normalizar_telefone(valor):
+    digitos = re.sub(r'\D', '', valor or '')
+    if digitos.startswith('00'):
+        digitos = digitos[2:]
+    if digitos.startswith('244') and len(digitos) > 9:
+        digitos = digitos[3:]
+    return digitos
+
+
+def preencher_campos_normalizados(apps, schema_editor):
+    Inscricao = apps.get_model('core', 'Inscricao')
+    lote = []
+    for inscricao in Inscricao.objects.only('bilhete_identidade', 'email', 'telefone').iterator(chunk_size=2000):
+        inscricao.bilhete_identidade_normalizado = normalizar_bilhete(inscricao.bilhete_identidade)
+        inscricao.email_normalizado = normalizar_email(inscricao.email)
+        inscricao.telefone_normalizado = normalizar_telefone(inscricao.telefone)
+        lote.append(inscricao)
+        if len(lote) >= 2000:
+            Inscricao.objects.bulk_update(lote, ['bilhete_identidade_normalizado', 'email_normalizado', 'telefone_normalizado'])
+            lote = []
+    if lote:
+        Inscricao.objects.bulk_update(lote, ['bilhete_identidade_normalizado', 'email_normalizado', 'telefone_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_sequencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscricao',
+            name='bilhete_identidade_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='inscricao',
+            name='email_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='inscricao',
+            name='telefone_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(preencher_campos_normalizados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_inscricao_bilhete_identidade_normalizado_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificacaoCurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vagas', models.PositiveIntegerField(default=0, verbose_name='Vagas')),
+                ('nota_minima', models.DecimalField(decimal_places=2, default=10.0, max_digits=4, verbose_name='Nota Mínima')),
+                ('nota_corte', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='Nota de Corte')),
+                ('total_aprovados', models.PositiveIntegerField(default=0, verbose_name='Total de Aprovados')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+            ],
+            options={
+                'verbose_name': 'Classificação do Curso',
+                'verbose_name_plural': 'Classificações dos Cursos',
+                'ordering': ['curso'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inscricao',
+            index=models.Index(fields=['curso', 'aprovado'], name='inscricao_curso_aprovado_idx'),
+        ),
+        migrations.AddField(
+            model_name='classificacaocurso',
+            name='curso',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='classificacao', to='core.curso', verbose_name='Curso'),
+        ),
+        migrations.AddField(
+            model_name='classificacaocurso',
+            name='inscricao_corte',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.inscricao', verbose_name='Último Aprovado'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_classificacaocurso_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscricao',
+            name='habilitado',
+            field=models.BooleanField(blank=True, editable=False, null=True, verbose_name='Habilitado (Pré-requisitos)'),
+        ),
+        migrations.AddField(
+            model_name='inscricao',
+            name='media_prerequisitos',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=4, null=True, verbose_name='Média dos Pré-requisitos'),
+        ),
+    ]
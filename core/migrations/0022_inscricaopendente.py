@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_inscricao_habilitado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InscricaoPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recibo', models.CharField(max_length=20, unique=True, verbose_name='Recibo Provisório')),
+                ('dados', models.JSONField(verbose_name='Dados do Formulário')),
+                ('bilhete_identidade_normalizado', models.CharField(db_index=True, editable=False, max_length=50)),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('processada', 'Processada'), ('rejeitada', 'Rejeitada')], default='pendente', max_length=20, verbose_name='Estado')),
+                ('motivo_rejeicao', models.TextField(blank=True, verbose_name='Motivo da Rejeição')),
+                ('data_submissao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Submissão')),
+                ('data_processamento', models.DateTimeField(blank=True, null=True, verbose_name='Data de Processamento')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inscricoes_pendentes', to='core.curso', verbose_name='Curso')),
+                ('inscricao', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pendente', to='core.inscricao', verbose_name='Inscrição')),
+            ],
+            options={
+                'verbose_name': 'Inscrição Pendente',
+                'verbose_name_plural': 'Inscrições Pendentes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='pendente_estado_idx')],
+            },
+        ),
+    ]
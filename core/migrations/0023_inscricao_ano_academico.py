@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_inscricaopendente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscricao',
+            name='ano_academico',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inscricoes', to='core.anoacademico', verbose_name='Ano Académico'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_inscricao_ano_academico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaAnoCurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_inscricoes', models.PositiveIntegerField(default=0, verbose_name='Inscrições')),
+                ('total_aprovados', models.PositiveIntegerField(default=0, verbose_name='Aprovados')),
+                ('total_reprovados', models.PositiveIntegerField(default=0, verbose_name='Não Aprovados')),
+                ('aguardando_nota', models.PositiveIntegerField(default=0, verbose_name='Aguardando Nota')),
+                ('total_com_nota', models.PositiveIntegerField(default=0, verbose_name='Com Nota')),
+                ('soma_notas', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Soma das Notas')),
+                ('total_masculino', models.PositiveIntegerField(default=0, verbose_name='Masculino')),
+                ('total_feminino', models.PositiveIntegerField(default=0, verbose_name='Feminino')),
+                ('desatualizado', models.BooleanField(db_index=True, default=True, verbose_name='Desatualizado')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+            ],
+            options={
+                'verbose_name': 'Estatística por Ano e Curso',
+                'verbose_name_plural': 'Estatísticas por Ano e Curso',
+                'ordering': ['-ano_academico__ano_inicio', 'curso'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstatisticaDistribuicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('provincia', 'Província'), ('escola', 'Escola de Origem')], max_length=20, verbose_name='Dimensão')),
+                ('valor', models.CharField(blank=True, max_length=300, verbose_name='Valor')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Distribuição de Inscrições',
+                'verbose_name_plural': 'Distribuições de Inscrições',
+                'ordering': ['estatistica', 'dimensao', '-total'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inscricao',
+            index=models.Index(fields=['ano_academico', 'curso'], name='inscricao_ano_curso_idx'),
+        ),
+        migrations.AddField(
+            model_name='estatisticaanocurso',
+            name='ano_academico',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas', to='core.anoacademico', verbose_name='Ano Académico'),
+        ),
+        migrations.AddField(
+            model_name='estatisticaanocurso',
+            name='curso',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas', to='core.curso', verbose_name='Curso'),
+        ),
+        migrations.AddField(
+            model_name='estatisticadistribuicao',
+            name='estatistica',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distribuicoes', to='core.estatisticaanocurso', verbose_name='Estatística'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='estatisticaanocurso',
+            unique_together={('ano_academico', 'curso')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='estatisticadistribuicao',
+            unique_together={('estatistica', 'dimensao', 'valor')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_estatisticaanocurso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InscricoesPorDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('turno', models.CharField(choices=[('M', 'Manhã'), ('T', 'Tarde'), ('N', 'Noite')], max_length=1, verbose_name='Turno')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inscricoes_por_dia', to='core.curso', verbose_name='Curso')),
+            ],
+            options={
+                'verbose_name': 'Inscrições por Dia',
+                'verbose_name_plural': 'Inscrições por Dia',
+                'ordering': ['data', 'curso', 'turno'],
+                'unique_together': {('data', 'curso', 'turno')},
+            },
+        ),
+    ]
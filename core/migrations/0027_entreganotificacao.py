@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def materializar_entregas(apps, schema_editor):
+    """Uma entrega por destinatário (todos os utilizadores, nas globais), lida se estava em lida_por"""
+    Notificacao = apps.get_model('core', 'Notificacao')
+    EntregaNotificacao = apps.get_model('core', 'EntregaNotificacao')
+    ContadorNotificacoes = apps.get_model('core', 'ContadorNotificacoes')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    todos = list(User.objects.values_list('pk', flat=True))
+    lote = []
+    for notificacao in Notificacao.objects.iterator(chunk_size=500):
+        publico = todos if notificacao.global_notificacao else notificacao.destinatarios.values_list('pk', flat=True)
+        lidas = set(notificacao.lida_por.values_list('pk', flat=True))
+        for usuario in publico:
+            lote.append(EntregaNotificacao(
+                notificacao_id=notificacao.pk, user_id=usuario, data_criacao=notificacao.data_criacao,
+                lida=usuario in lidas, arquivada=not notificacao.ativa,
+            ))
+        if len(lote) >= 2000:
+            EntregaNotificacao.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        EntregaNotificacao.objects.bulk_create(lote)
+    # Voltam a ser calculados, a partir das entregas, na primeira leitura
+    ContadorNotificacoes.objects.all().delete()
+
+
+def repor_lida_por(apps, schema_editor):
+    EntregaNotificacao = apps.get_model('core', 'EntregaNotificacao')
+    Notificacao = apps.get_model('core', 'Notificacao')
+    Leitura = Notificacao.lida_por.through
+    Leitura.objects.bulk_create(
+        [Leitura(notificacao_id=n, user_id=u) for n, u in EntregaNotificacao.objects.filter(lida=True).values_list('notificacao', 'user')],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_contadornotificacoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntregaNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_criacao', models.DateTimeField(verbose_name='Data de Criação')),
+                ('lida', models.BooleanField(default=False, verbose_name='Lida')),
+                ('arquivada', models.BooleanField(default=False, verbose_name='Arquivada')),
+                ('notificacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entregas', to='core.notificacao', verbose_name='Notificação')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entregas_notificacoes', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Entrega de Notificação',
+                'verbose_name_plural': 'Entregas de Notificações',
+                'ordering': ['-data_criacao', '-id'],
+                'indexes': [models.Index(fields=['user', 'arquivada', 'data_criacao', 'id'], name='entrega_caixa_idx')],
+                'unique_together': {('notificacao', 'user')},
+            },
+        ),
+        migrations.RunPython(materializar_entregas, repor_lida_por),
+        migrations.RemoveField(
+            model_name='notificacao',
+            name='lida_por',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0027_entreganotificacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpressaoSenha',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='impressao_senha', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('impressao', models.CharField(db_index=True, max_length=64, verbose_name='Impressão')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Impressão de Senha',
+                'verbose_name_plural': 'Impressões de Senhas',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_impressaosenha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BaldePedidos',
+            fields=[
+                ('chave', models.CharField(max_length=120, primary_key=True, serialize=False, verbose_name='Chave')),
+                ('fichas', models.FloatField(verbose_name='Fichas')),
+                ('atualizado', models.FloatField(db_index=True, verbose_name='Atualizado (timestamp)')),
+            ],
+            options={
+                'verbose_name': 'Balde de Pedidos',
+                'verbose_name_plural': 'Baldes de Pedidos',
+            },
+        ),
+    ]
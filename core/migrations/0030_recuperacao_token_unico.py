@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+def tokens_vazios_para_nulo(apps, schema_editor):
+    """As recuperações por telefone tinham token='': passam a NULL, que não conta para o UNIQUE"""
+    RecuperacaoSenha = apps.get_model('core', 'RecuperacaoSenha')
+    RecuperacaoSenha.objects.filter(token='').update(token=None)
+
+
+def tokens_nulos_para_vazio(apps, schema_editor):
+    RecuperacaoSenha = apps.get_model('core', 'RecuperacaoSenha')
+    RecuperacaoSenha.objects.filter(token__isnull=True).update(token='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_baldepedidos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recuperacaosenha',
+            name='data_expiracao',
+            field=models.DateTimeField(db_index=True, verbose_name='Data de Expiração'),
+        ),
+        migrations.AlterField(
+            model_name='recuperacaosenha',
+            name='token',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Token de Recuperação'),
+        ),
+        migrations.RunPython(tokens_vazios_para_nulo, tokens_nulos_para_vazio),
+        migrations.AlterField(
+            model_name='recuperacaosenha',
+            name='token',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Token de Recuperação'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_recuperacao_token_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscricaopendente',
+            name='reserva',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='inscricaopendente',
+            name='estado',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Em Processamento'), ('processada', 'Processada'), ('rejeitada', 'Rejeitada')], default='pendente', max_length=20, verbose_name='Estado'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations
+from django.db.models import Max, Min
+
+
+def preencher_ano_academico(apps, schema_editor):
+    """Associa as inscrições existentes ao ano académico da data de inscrição.
+
+    Primeiro pelo período dos semestres de cada ano; as restantes ficam no ano
+    que começa no ano civil da inscrição (as candidaturas antecedem o início
+    das aulas). Sem ano correspondente, ficam sem ano académico.
+    """
+    AnoAcademico = apps.get_model('core', 'AnoAcademico')
+    Inscricao = apps.get_model('core', 'Inscricao')
+    sem_ano = Inscricao.objects.filter(ano_academico__isnull=True)
+    anos = AnoAcademico.objects.annotate(inicio=Min('semestres__data_inicio'), fim=Max('semestres__data_fim'))
+    for ano in anos:
+        if ano.inicio and ano.fim:
+            sem_ano.filter(data_inscricao__date__range=(ano.inicio, ano.fim)).update(ano_academico=ano)
+    for ano in anos:
+        sem_ano.filter(data_inscricao__year=ano.ano_inicio).update(ano_academico=ano)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_inscricaopendente_reserva'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_ano_academico, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from .normalizacao import normalizar_bilhete, normalizar_email, normalizar_telefone
 
 class AnoAcademico(models.Model):
     STATUS_CHOICES = [
@@ -78,6 +80,33 @@ class ConfiguracaoEscola(models.Model):
             raise ValueError('Só pode existir uma configuração de escola')
         return super().save(*args, **kwargs)
 
+class Sequencia(models.Model):
+    """Contador atómico usado para gerar números sequenciais (INS-000001, ALU-000001)"""
+    prefixo = models.CharField(max_length=10, unique=True, verbose_name="Prefixo")
+    ultimo_valor = models.PositiveBigIntegerField(default=0, verbose_name="Último Valor Atribuído")
+    
+    class Meta:
+        verbose_name = "Sequência"
+        verbose_name_plural = "Sequências"
+        ordering = ['prefixo']
+    
+    def __str__(self):
+        return f"{self.prefixo}: {self.ultimo_valor}"
+
+class CursoQuerySet(models.QuerySet):
+    def com_estatisticas(self):
+        """Anota inscrições, aprovados, vagas livres e média da nota do teste numa só consulta agrupada"""
+        return self.annotate(
+            num_inscricoes=models.Count('inscricoes'),
+            num_aprovados=models.Count('inscricoes', filter=models.Q(inscricoes__aprovado=True)),
+            media_nota=models.Avg('inscricoes__nota_teste'),
+        ).annotate(
+            vagas_livres=Greatest(
+                models.ExpressionWrapper(models.F('vagas') - models.F('num_aprovados'), output_field=models.IntegerField()),
+                models.Value(0),
+            ),
+        )
+
 class Curso(models.Model):
     DURACAO_CHOICES = [
         (3, '3 meses'),
@@ -110,6 +139,8 @@ class Curso(models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True)
     data_atualizacao = models.DateTimeField(auto_now=True)
     
+    objects = CursoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Curso"
         verbose_name_plural = "Cursos"
@@ -118,12 +149,47 @@ class Curso(models.Model):
     def __str__(self):
         return f"{self.codigo} - {self.nome}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores carregados, para saber se a classificação precisa de ser refeita
+        instancia._criterios_originais = (instancia.__dict__.get('vagas'), instancia.__dict__.get('nota_minima'))
+        return instancia
+    
+    def criterios_alterados(self):
+        """Indica se vagas ou nota mínima mudaram desde que o curso foi carregado"""
+        originais = getattr(self, '_criterios_originais', None)
+        return originais is not None and originais != (self.vagas, self.nota_minima)
+    
+    # Os métodos abaixo usam as anotações de Curso.objects.com_estatisticas() quando existem
     def vagas_disponiveis(self):
+        if hasattr(self, 'vagas_livres'):
+            return self.vagas_livres
         aprovados = self.inscricoes.filter(aprovado=True).count()
         return max(0, self.vagas - aprovados)
+    vagas_disponiveis.short_description = "Vagas Disponíveis"
+    vagas_disponiveis.admin_order_field = 'vagas_livres'
     
     def total_inscricoes(self):
+        if hasattr(self, 'num_inscricoes'):
+            return self.num_inscricoes
         return self.inscricoes.count()
+    total_inscricoes.short_description = "Inscrições"
+    total_inscricoes.admin_order_field = 'num_inscricoes'
+    
+    def total_aprovados(self):
+        if hasattr(self, 'num_aprovados'):
+            return self.num_aprovados
+        return self.inscricoes.filter(aprovado=True).count()
+    total_aprovados.short_description = "Aprovados"
+    total_aprovados.admin_order_field = 'num_aprovados'
+    
+    def media_nota_teste(self):
+        if hasattr(self, 'media_nota'):
+            return self.media_nota
+        return self.inscricoes.aggregate(media=models.Avg('nota_teste'))['media']
+    media_nota_teste.short_description = "Média do Teste"
+    media_nota_teste.admin_order_field = 'media_nota'
     
     def get_duracao_display_full(self):
         return f"{self.get_duracao_meses_display()}"
@@ -203,8 +269,12 @@ class Inscricao(models.Model):
         ('V', 'Viúvo(a)'),
     ]
     
+    # Campos que entram nos contadores e nas estatísticas pré-agregadas
+    CAMPOS_ESTATISTICA = ('ano_academico_id', 'curso_id', 'nota_teste', 'aprovado', 'sexo', 'escola_id')
+    
     numero_inscricao = models.CharField(max_length=20, unique=True, blank=True, verbose_name="Número de Inscrição")
     curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='inscricoes', verbose_name="Curso")
+    ano_academico = models.ForeignKey(AnoAcademico, on_delete=models.SET_NULL, null=True, blank=True, related_name='inscricoes', verbose_name="Ano Académico")
     
     # 1. Informações Pessoais
     nome_completo = models.CharField(max_length=200, verbose_name="Nome Completo")
@@ -254,24 +324,107 @@ class Inscricao(models.Model):
     data_inscricao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Inscrição")
     data_resultado = models.DateTimeField(null=True, blank=True, verbose_name="Data do Resultado")
     
+    # Veredicto dos pré-requisitos, gravado em lote por core.elegibilidade (None = por avaliar)
+    habilitado = models.BooleanField(null=True, blank=True, editable=False, verbose_name="Habilitado (Pré-requisitos)")
+    media_prerequisitos = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, editable=False, verbose_name="Média dos Pré-requisitos")
+    
+    # Chaves normalizadas para deteção de duplicados (mantidas em save())
+    bilhete_identidade_normalizado = models.CharField(max_length=50, blank=True, editable=False, db_index=True)
+    email_normalizado = models.CharField(max_length=254, blank=True, editable=False, db_index=True)
+    telefone_normalizado = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    
     class Meta:
         verbose_name = "Inscrição"
         verbose_name_plural = "Inscrições"
         ordering = ['-data_inscricao']
+        indexes = [
+            models.Index(fields=['curso', 'nota_teste'], name='inscricao_curso_nota_idx'),
+            models.Index(fields=['curso', 'aprovado'], name='inscricao_curso_aprovado_idx'),
+            models.Index(fields=['ano_academico', 'curso'], name='inscricao_ano_curso_idx'),
+        ]
     
     def __str__(self):
         return f"{self.numero_inscricao} - {self.nome_completo}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._classificacao_original = (instancia.__dict__.get('curso_id'), instancia.__dict__.get('nota_teste'))
+        instancia._estatistica_original = instancia.campos_estatistica()
+        instancia._serie_original = (instancia.__dict__.get('curso_id'), instancia.__dict__.get('turno_preferencial'))
+        return instancia
+    
+    def campos_estatistica(self):
+        """Valores de CAMPOS_ESTATISTICA (os campos adiados e não carregados contam como None)"""
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_ESTATISTICA)
+    
+    def classificacao_alterada(self):
+        """Indica se a nota ou o curso mudaram desde que a inscrição foi carregada"""
+        curso_original, nota_original = getattr(self, '_classificacao_original', (None, None))
+        if self.nota_teste is None and nota_original is None:
+            return False
+        return (curso_original, nota_original) != (self.curso_id, self.nota_teste)
+    
+    def posicao_classificacao(self):
+        """Posição do candidato no seu curso (1 = melhor nota), por contagem no índice (curso, nota).
+        
+        Segue as regras da classificação (aprovacoes.inscricoes_elegiveis): fora dela
+        (sem nota, abaixo da nota mínima ou sem os pré-requisitos) não há posição.
+        """
+        from .aprovacoes import inscricoes_elegiveis
+        if self.nota_teste is None or self.nota_teste < self.curso.nota_minima or self.habilitado is False:
+            return None
+        return inscricoes_elegiveis(self.curso).filter(
+            models.Q(nota_teste__gt=self.nota_teste) | models.Q(nota_teste=self.nota_teste, id__lt=self.id),
+        ).count() + 1
+    
     def save(self, *args, **kwargs):
         if not self.numero_inscricao:
-            ultimo = Inscricao.objects.order_by('-id').first()
-            if ultimo:
-                numero = int(ultimo.numero_inscricao.split('-')[1]) + 1
-            else:
-                numero = 1
-            self.numero_inscricao = f"INS-{numero:06d}"
+            from .sequencias import proximo_numero
+            self.numero_inscricao = proximo_numero('INS')
+        if self.pk is None and self.ano_academico_id is None:
+            from .academico import ano_atual
+            ano = ano_atual()
+            self.ano_academico_id = ano.pk if ano else None
+        self.atualizar_campos_normalizados()
         super().save(*args, **kwargs)
     
+    def atualizar_campos_normalizados(self):
+        """Sincroniza as colunas normalizadas (também usado antes de bulk_create)"""
+        self.bilhete_identidade_normalizado = normalizar_bilhete(self.bilhete_identidade)
+        self.email_normalizado = normalizar_email(self.email)
+        self.telefone_normalizado = normalizar_telefone(self.telefone)
+    
+    @classmethod
+    def campos_duplicados(cls, bilhete_identidade=None, email=None, telefone=None, excluir_pk=None):
+        """Devolve os campos de identidade já usados noutra inscrição, numa única consulta.
+        
+        A ordem do resultado segue a ordem dos argumentos: BI, email, telefone.
+        """
+        chaves = {
+            'bilhete_identidade': ('bilhete_identidade_normalizado', normalizar_bilhete(bilhete_identidade)),
+            'email': ('email_normalizado', normalizar_email(email)),
+            'telefone': ('telefone_normalizado', normalizar_telefone(telefone)),
+        }
+        chaves = {campo: par for campo, par in chaves.items() if par[1]}
+        if not chaves:
+            return []
+        
+        filtro = models.Q()
+        for coluna, valor in chaves.values():
+            filtro |= models.Q(**{coluna: valor})
+        encontrados = cls.objects.filter(filtro)
+        if excluir_pk:
+            encontrados = encontrados.exclude(pk=excluir_pk)
+        
+        colunas = [coluna for coluna, _ in chaves.values()]
+        duplicados = set()
+        for linha in encontrados.order_by().values_list(*colunas):
+            for campo, valor in zip(chaves, linha):
+                if valor == chaves[campo][1]:
+                    duplicados.add(campo)
+        return [campo for campo in chaves if campo in duplicados]
+    
     def calcular_idade(self):
         """Calcula a idade do estudante"""
         from datetime import date
@@ -297,6 +450,129 @@ class Inscricao(models.Model):
             return self.data_validade_bi < date.today()
         return False
 
+class ClassificacaoCurso(models.Model):
+    """Resumo materializado da classificação de um curso (nota de corte e vagas preenchidas)"""
+    curso = models.OneToOneField(Curso, on_delete=models.CASCADE, related_name='classificacao', verbose_name="Curso")
+    vagas = models.PositiveIntegerField(default=0, verbose_name="Vagas")
+    nota_minima = models.DecimalField(max_digits=4, decimal_places=2, default=10.00, verbose_name="Nota Mínima")
+    nota_corte = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="Nota de Corte")
+    inscricao_corte = models.ForeignKey(Inscricao, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Último Aprovado")
+    total_aprovados = models.PositiveIntegerField(default=0, verbose_name="Total de Aprovados")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
+    
+    class Meta:
+        verbose_name = "Classificação do Curso"
+        verbose_name_plural = "Classificações dos Cursos"
+        ordering = ['curso']
+    
+    def __str__(self):
+        return f"{self.curso.nome} - corte {self.nota_corte if self.nota_corte is not None else '—'}"
+    
+    def vagas_livres(self):
+        return max(0, self.vagas - self.total_aprovados)
+
+class EstatisticaAnoCurso(models.Model):
+    """Totais pré-agregados das inscrições de um curso num ano académico.
+    
+    Não são mantidos incrementalmente: cada alteração marca a linha como
+    desatualizada e o comando atualizar_estatisticas recalcula-a (ver core.estatisticas).
+    """
+    ano_academico = models.ForeignKey(AnoAcademico, on_delete=models.CASCADE, related_name='estatisticas', verbose_name="Ano Académico")
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='estatisticas', verbose_name="Curso")
+    total_inscricoes = models.PositiveIntegerField(default=0, verbose_name="Inscrições")
+    total_aprovados = models.PositiveIntegerField(default=0, verbose_name="Aprovados")
+    total_reprovados = models.PositiveIntegerField(default=0, verbose_name="Não Aprovados")
+    aguardando_nota = models.PositiveIntegerField(default=0, verbose_name="Aguardando Nota")
+    total_com_nota = models.PositiveIntegerField(default=0, verbose_name="Com Nota")
+    soma_notas = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Soma das Notas")
+    total_masculino = models.PositiveIntegerField(default=0, verbose_name="Masculino")
+    total_feminino = models.PositiveIntegerField(default=0, verbose_name="Feminino")
+    desatualizado = models.BooleanField(default=True, db_index=True, verbose_name="Desatualizado")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
+    
+    class Meta:
+        verbose_name = "Estatística por Ano e Curso"
+        verbose_name_plural = "Estatísticas por Ano e Curso"
+        unique_together = ['ano_academico', 'curso']
+        ordering = ['-ano_academico__ano_inicio', 'curso']
+    
+    def __str__(self):
+        return f"{self.ano_academico} - {self.curso.nome}"
+    
+    def media_nota(self):
+        if not self.total_com_nota:
+            return None
+        return round(self.soma_notas / self.total_com_nota, 2)
+
+class EstatisticaDistribuicao(models.Model):
+    """Distribuição das inscrições de uma EstatisticaAnoCurso por província ou escola de origem"""
+    DIMENSAO_CHOICES = [
+        ('provincia', 'Província'),
+        ('escola', 'Escola de Origem'),
+    ]
+    
+    estatistica = models.ForeignKey(EstatisticaAnoCurso, on_delete=models.CASCADE, related_name='distribuicoes', verbose_name="Estatística")
+    dimensao = models.CharField(max_length=20, choices=DIMENSAO_CHOICES, verbose_name="Dimensão")
+    valor = models.CharField(max_length=300, blank=True, verbose_name="Valor")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+    
+    class Meta:
+        verbose_name = "Distribuição de Inscrições"
+        verbose_name_plural = "Distribuições de Inscrições"
+        unique_together = ['estatistica', 'dimensao', 'valor']
+        ordering = ['estatistica', 'dimensao', '-total']
+    
+    def __str__(self):
+        return f"{self.estatistica} - {self.get_dimensao_display()}: {self.valor or '—'} ({self.total})"
+
+class InscricoesPorDia(models.Model):
+    """Número de inscrições por dia, curso e turno preferencial (mantido em core.series)"""
+    data = models.DateField(verbose_name="Data")
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='inscricoes_por_dia', verbose_name="Curso")
+    turno = models.CharField(max_length=1, choices=Inscricao.TURNO_CHOICES, verbose_name="Turno")
+    total = models.IntegerField(default=0, verbose_name="Total")
+    
+    class Meta:
+        verbose_name = "Inscrições por Dia"
+        verbose_name_plural = "Inscrições por Dia"
+        unique_together = ['data', 'curso', 'turno']
+        ordering = ['data', 'curso', 'turno']
+    
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.curso.nome} ({self.get_turno_display()}): {self.total}"
+
+class InscricaoPendente(models.Model):
+    """Submissão do formulário público em fila, gravada como Inscricao pelo processar_fila_inscricoes"""
+    ESTADO_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Em Processamento'),
+        ('processada', 'Processada'),
+        ('rejeitada', 'Rejeitada'),
+    ]
+    
+    recibo = models.CharField(max_length=20, unique=True, verbose_name="Recibo Provisório")
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='inscricoes_pendentes', verbose_name="Curso")
+    dados = models.JSONField(verbose_name="Dados do Formulário")
+    bilhete_identidade_normalizado = models.CharField(max_length=50, editable=False, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendente', verbose_name="Estado")
+    inscricao = models.OneToOneField(Inscricao, on_delete=models.SET_NULL, null=True, blank=True, related_name='pendente', verbose_name="Inscrição")
+    motivo_rejeicao = models.TextField(blank=True, verbose_name="Motivo da Rejeição")
+    # Identifica o lote de processar_fila() que reclamou a submissão
+    reserva = models.CharField(max_length=32, blank=True, editable=False)
+    data_submissao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Submissão")
+    data_processamento = models.DateTimeField(null=True, blank=True, verbose_name="Data de Processamento")
+    
+    class Meta:
+        verbose_name = "Inscrição Pendente"
+        verbose_name_plural = "Inscrições Pendentes"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='pendente_estado_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recibo} - {self.dados.get('nome_completo', '')} ({self.get_estado_display()})"
+
 class HistoricoAcademico(models.Model):
     """Histórico académico do aluno - notas em disciplinas anteriores"""
     inscricao = models.OneToOneField(Inscricao, on_delete=models.CASCADE, related_name='historico_academico', verbose_name="Inscrição")
@@ -313,21 +589,23 @@ class HistoricoAcademico(models.Model):
     
     def esta_habilitado_para_curso(self, curso):
         """Verifica se aluno está habilitado para o curso baseado em pré-requisitos"""
-        if not curso.prerequisitos.exists():
+        from .elegibilidade import avaliar, carregar_prerequisitos
+        prerequisitos = carregar_prerequisitos(curso)
+        if not prerequisitos:
             return True, "✓ Sem pré-requisitos"
         
-        media = self.calcular_media_prerequisitos(curso)
-        for prereq in curso.prerequisitos.filter(obrigatorio=True):
-            nota = self.notas_disciplina.filter(disciplina=prereq.disciplina_prerequisito).first()
-            if not nota or nota.nota < prereq.nota_minima_prerequisito:
-                return False, f"Nota insuficiente em {prereq.disciplina_prerequisito.nome} (mínima: {prereq.nota_minima_prerequisito})"
-        
-        return True, f"✓ Habilitado (Média: {media:.2f})" if media else (True, "✓ Habilitado")
+        notas = dict(self.notas_disciplina.values_list('disciplina_id', 'nota'))
+        habilitado, media, falha = avaliar(prerequisitos, notas)
+        if not habilitado:
+            return False, f"Nota insuficiente em {falha.disciplina_prerequisito.nome} (mínima: {falha.nota_minima_prerequisito})"
+        return (True, f"✓ Habilitado (Média: {media:.2f})") if media else (True, "✓ Habilitado")
     
     def calcular_media_prerequisitos(self, curso):
         """Calcula a média de pré-requisitos"""
-        notas = [float(n.nota) for n in self.notas_disciplina.filter(disciplina__in=[p.disciplina_prerequisito for p in curso.prerequisitos.all()]) if n.nota]
-        return sum(notas) / len(notas) if notas else None
+        from .elegibilidade import avaliar, carregar_prerequisitos
+        notas = dict(self.notas_disciplina.values_list('disciplina_id', 'nota'))
+        media = avaliar(carregar_prerequisitos(curso), notas)[1]
+        return float(media) if media is not None else None
 
 class NotaDisciplina(models.Model):
     """Nota do aluno em uma disciplina anterior"""
@@ -403,12 +681,8 @@ class Aluno(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.numero_estudante:
-            ultimo = Aluno.objects.order_by('-id').first()
-            if ultimo and ultimo.numero_estudante:
-                numero = int(ultimo.numero_estudante.split('-')[1]) + 1
-            else:
-                numero = 1
-            self.numero_estudante = f"ALU-{numero:06d}"
+            from .sequencias import proximo_numero
+            self.numero_estudante = proximo_numero('ALU')
         super().save(*args, **kwargs)
 
 class Pai(models.Model):
@@ -487,12 +761,6 @@ class Notificacao(models.Model):
         verbose_name="Destinatários",
         blank=True
     )
-    lida_por = models.ManyToManyField(
-        User,
-        related_name='notificacoes_lidas',
-        verbose_name="Lida por",
-        blank=True
-    )
     global_notificacao = models.BooleanField(
         default=False,
         verbose_name="Notificação Global",
@@ -508,11 +776,58 @@ class Notificacao(models.Model):
     def __str__(self):
         return f"{self.titulo} - {self.get_tipo_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores carregados, para acertar os contadores de não lidas (core.notificacoes) ao gravar
+        instancia._publicacao_original = (instancia.__dict__.get('ativa'), instancia.__dict__.get('global_notificacao'))
+        return instancia
+    
     def marcar_como_lida(self, usuario):
-        self.lida_por.add(usuario)
+        from .notificacoes import marcar_lidas
+        marcar_lidas(usuario, self.entregas.filter(user=usuario))
     
     def esta_lida(self, usuario):
-        return self.lida_por.filter(id=usuario.id).exists()
+        return self.entregas.filter(user=usuario, lida=True).exists()
+
+class EntregaNotificacao(models.Model):
+    """Entrada da caixa de notificações de um utilizador, criada quando a notificação é publicada (core.notificacoes)"""
+    notificacao = models.ForeignKey(Notificacao, on_delete=models.CASCADE, related_name='entregas', verbose_name="Notificação")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entregas_notificacoes', verbose_name="Usuário")
+    # Cópia da data da notificação, para a caixa de entrada ler só o índice do utilizador
+    data_criacao = models.DateTimeField(verbose_name="Data de Criação")
+    lida = models.BooleanField(default=False, verbose_name="Lida")
+    arquivada = models.BooleanField(default=False, verbose_name="Arquivada")
+    
+    class Meta:
+        verbose_name = "Entrega de Notificação"
+        verbose_name_plural = "Entregas de Notificações"
+        unique_together = ['notificacao', 'user']
+        ordering = ['-data_criacao', '-id']
+        indexes = [
+            models.Index(fields=['user', 'arquivada', 'data_criacao', 'id'], name='entrega_caixa_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.notificacao.titulo} → {self.user.username}"
+
+class ContadorNotificacoes(models.Model):
+    """Número de entregas por ler e não arquivadas de cada utilizador (mantido em core.notificacoes)"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contador_notificacoes',
+        verbose_name="Usuário"
+    )
+    nao_lidas = models.PositiveIntegerField(default=0, verbose_name="Não Lidas")
+    
+    class Meta:
+        verbose_name = "Contador de Notificações"
+        verbose_name_plural = "Contadores de Notificações"
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.nao_lidas}"
 
 class Subscricao(models.Model):
     PLANO_CHOICES = [
@@ -652,6 +967,38 @@ class PagamentoSubscricao(models.Model):
     def __str__(self):
         return f"Pagamento {self.id} - {self.subscricao.nome_escola} - {self.get_status_display()}"
 
+class ImpressaoSenha(models.Model):
+    """Impressão HMAC (com pimenta) da senha atual de cada utilizador, para detetar reutilização (core.senhas)"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='impressao_senha',
+        verbose_name="Usuário"
+    )
+    impressao = models.CharField(max_length=64, db_index=True, verbose_name="Impressão")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
+    
+    class Meta:
+        verbose_name = "Impressão de Senha"
+        verbose_name_plural = "Impressões de Senhas"
+    
+    def __str__(self):
+        return self.user.username
+
+class BaldePedidos(models.Model):
+    """Estado de um balde de fichas do limite de pedidos, partilhado entre processos (core.limites)"""
+    chave = models.CharField(max_length=120, primary_key=True, verbose_name="Chave")
+    fichas = models.FloatField(verbose_name="Fichas")
+    atualizado = models.FloatField(db_index=True, verbose_name="Atualizado (timestamp)")
+    
+    class Meta:
+        verbose_name = "Balde de Pedidos"
+        verbose_name_plural = "Baldes de Pedidos"
+    
+    def __str__(self):
+        return f"{self.chave}: {self.fichas:.1f}"
+
 class RecuperacaoSenha(models.Model):
     """Modelo para gerenciar recuperação de senha via email ou telefone"""
     TIPO_CHOICES = [
@@ -677,14 +1024,16 @@ class RecuperacaoSenha(models.Model):
     )
     token = models.CharField(
         max_length=100,
+        null=True,
         blank=True,
+        unique=True,
         verbose_name="Token de Recuperação"
     )
     email_enviado = models.EmailField(blank=True, verbose_name="Email Enviado Para")
     telefone_enviado = models.CharField(max_length=20, blank=True, verbose_name="Telefone Enviado Para")
     usado = models.BooleanField(default=False, verbose_name="Usado")
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
-    data_expiracao = models.DateTimeField(verbose_name="Data de Expiração")
+    data_expiracao = models.DateTimeField(db_index=True, verbose_name="Data de Expiração")
     
     class Meta:
         verbose_name = "Recuperação de Senha"
@@ -699,8 +1048,11 @@ class RecuperacaoSenha(models.Model):
         return timezone.now() > self.data_expiracao
     
     def marcar_como_usado(self):
+        # Expira no mesmo momento, para o comando limpar_recuperacoes_senha a apagar pelo índice de data_expiracao
+        from django.utils import timezone
         self.usado = True
-        self.save()
+        self.data_expiracao = min(self.data_expiracao, timezone.now())
+        self.save(update_fields=['usado', 'data_expiracao'])
 
 class Documento(models.Model):
     """Modelo para gerenciar templates de documentos com variáveis dinâmicas"""
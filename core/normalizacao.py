@@ -0,0 +1,22 @@
+import re
+
+INDICATIVO_ANGOLA = '244'
+
+
+def normalizar_bilhete(valor):
+    """BI sem espaços/hífens e em maiúsculas"""
+    return re.sub(r'[\s\-.]', '', valor or '').upper()
+
+
+def normalizar_email(valor):
+    return (valor or '').strip().lower()
+
+
+def normalizar_telefone(valor):
+    """Só dígitos, sem o indicativo +244/00244 (ex.: '+244 923 000 000' -> '923000000')"""
+    digitos = re.sub(r'\D', '', valor or '')
+    if digitos.startswith('00'):
+        digitos = digitos[2:]
+    if digitos.startswith(INDICATIVO_ANGOLA) and len(digitos) > 9:
+        digitos = digitos[len(INDICATIVO_ANGOLA):]
+    return digitos
@@ -0,0 +1,126 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .aprovacoes import processar_aprovacoes
+from .contadores import invalidar_contadores
+from .importacao import iterar_linhas
+from .models import Inscricao
+
+NOTA_MINIMA = Decimal('0')
+NOTA_MAXIMA = Decimal('20')
+
+# "INS-000001<TAB>14,5", "INS-000001;14.5", "INS-000001 14"
+LINHA_GRELHA = re.compile(r'^\s*(\S+?)[\s;,]+(\d+(?:[.,]\d+)?)\s*$')
+
+
+class RelatorioNotas:
+    """Resultado de um lançamento de notas: linhas lidas, notas lançadas e alteradas, aprovações e erros"""
+
+    def __init__(self):
+        self.total = 0
+        # Notas válidas de inscrições existentes (iguais às gravadas ou não)
+        self.lancadas = 0
+        # Notas que mudaram e foram gravadas
+        self.alteradas = 0
+        self.aprovacoes = {'aprovados': 0, 'retirados': 0}
+        self.erros = []
+
+    def adicionar_erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+    @property
+    def rejeitadas(self):
+        return len(self.erros)
+
+
+def _cabecalho(linha):
+    """Uma primeira linha só é cabeçalho se a coluna da nota for texto (ex.: "Número  Nota")"""
+    partes = re.split(r'[\s;,]+', linha.strip())
+    return len(partes) > 1 and not any(caracter.isdigit() for caracter in partes[-1])
+
+
+def ler_grelha(texto):
+    """Lê uma grelha colada (número de inscrição + nota por linha).
+
+    As linhas sem nota válida seguem com nota None, para serem reportadas
+    como erro; só uma primeira linha com texto na coluna da nota é ignorada.
+    """
+    primeira = True
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        if not linha.strip():
+            continue
+        correspondencia = LINHA_GRELHA.match(linha)
+        if correspondencia:
+            yield numero, correspondencia.group(1), correspondencia.group(2)
+        elif not (primeira and _cabecalho(linha)):
+            yield numero, re.split(r'[\s;,]+', linha.strip())[0], None
+        primeira = False
+
+
+def ler_ficheiro_notas(ficheiro, nome):
+    """Lê um CSV/XLSX com as colunas numero_inscricao e nota_teste (ou nota)"""
+    for numero, dados in iterar_linhas(ficheiro, nome):
+        nota = dados.get('nota_teste', dados.get('nota'))
+        yield numero, str(dados.get('numero_inscricao') or '').strip(), None if nota is None else str(nota)
+
+
+def _converter_nota(texto):
+    try:
+        nota = Decimal(str(texto).strip().replace(',', '.')).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    if nota < NOTA_MINIMA or nota > NOTA_MAXIMA:
+        return None
+    return nota
+
+
+def lancar_notas(linhas, tamanho_lote=500):
+    """Aplica as notas do teste em massa e reclassifica os cursos afetados.
+
+    `linhas` são tuplos (linha, numero_inscricao, nota). Tudo é gravado numa
+    única transação com bulk_update; só as inscrições cuja nota muda são
+    escritas e só os respetivos cursos voltam a ser classificados.
+    """
+    relatorio = RelatorioNotas()
+    notas = {}
+    for linha, numero, texto in linhas:
+        relatorio.total += 1
+        nota = _converter_nota(texto) if texto is not None else None
+        if not numero:
+            relatorio.adicionar_erro(linha, 'Número de inscrição em falta.')
+        elif nota is None:
+            relatorio.adicionar_erro(linha, f'Nota inválida para {numero}: deve estar entre 0 e 20.')
+        elif numero in notas:
+            relatorio.adicionar_erro(linha, f'{numero} repetido na grelha.')
+        else:
+            notas[numero] = (linha, nota)
+
+    alteradas = []
+    numeros = list(notas)
+    for inicio in range(0, len(numeros), tamanho_lote):
+        bloco = numeros[inicio:inicio + tamanho_lote]
+        encontrados = Inscricao.objects.filter(numero_inscricao__in=bloco).only(
+            'id', 'curso_id', 'numero_inscricao', 'nota_teste'
+        ).order_by()
+        for inscricao in encontrados:
+            _, nota = notas.pop(inscricao.numero_inscricao)
+            relatorio.lancadas += 1
+            if inscricao.nota_teste != nota:
+                inscricao.nota_teste = nota
+                alteradas.append(inscricao)
+    for numero, (linha, _) in notas.items():
+        relatorio.adicionar_erro(linha, f'Inscrição {numero} não encontrada.')
+
+    cursos = {inscricao.curso_id for inscricao in alteradas}
+    with transaction.atomic():
+        Inscricao.objects.bulk_update(alteradas, ['nota_teste'], batch_size=tamanho_lote)
+        if alteradas:
+            # bulk_update não envia sinais: os contadores (a aguardar nota, reprovados) mudam mesmo sem aprovações novas
+            invalidar_contadores()
+        if cursos:
+            relatorio.aprovacoes = processar_aprovacoes(list(cursos))
+    relatorio.alteradas = len(alteradas)
+    relatorio.erros.sort()
+    return relatorio
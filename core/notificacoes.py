@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import eventos
+from .models import ContadorNotificacoes, EntregaNotificacao, Notificacao, PerfilUsuario
+
+TAMANHO_LOTE = 500
+TAMANHO_PAGINA = 20
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+
+def caixa_de_entrada(usuario):
+    """Entregas não arquivadas do utilizador, das mais recentes para as mais antigas (índice entrega_caixa_idx)"""
+    return EntregaNotificacao.objects.filter(user=usuario, arquivada=False).select_related('notificacao')
+
+
+def _cursor(entrega):
+    return f'{(entrega.data_criacao - _EPOCA) // _MICROSSEGUNDO}-{entrega.pk}'
+
+
+def _ler_cursor(cursor):
+    """'<microssegundos desde 1970>-<id>' → (data_criacao, id), ou None se for inválido"""
+    try:
+        micros, pk = (int(parte) for parte in cursor.split('-'))
+        return _EPOCA + micros * _MICROSSEGUNDO, pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def pagina_caixa(usuario, cursor=None, tamanho=TAMANHO_PAGINA):
+    """Página da caixa de entrada anterior ao `cursor` (paginação por chave, não por OFFSET).
+
+    Continua a partir da última entrega da página anterior em
+    (data_criacao, id), por isso cada página custa o mesmo no índice
+    entrega_caixa_idx, seja qual for o histórico do utilizador. Devolve
+    (entregas, cursor da página seguinte ou None).
+    """
+    entregas = caixa_de_entrada(usuario)
+    posicao = _ler_cursor(cursor) if cursor else None
+    if posicao:
+        data, pk = posicao
+        entregas = entregas.filter(Q(data_criacao__lt=data) | Q(data_criacao=data, pk__lt=pk))
+    entregas = list(entregas[:tamanho + 1])
+    if len(entregas) > tamanho:
+        entregas = entregas[:tamanho]
+        return entregas, _cursor(entregas[-1])
+    return entregas, None
+
+
+def ajustar(usuarios, delta):
+    """Soma `delta` aos contadores dos utilizadores indicados (ids).
+
+    Só são escritos os contadores que já existem; os que faltam são
+    calculados de raiz na primeira leitura (contador_nao_lidas).
+    """
+    usuarios = list(usuarios)
+    if not usuarios or not delta:
+        return
+    for inicio in range(0, len(usuarios), TAMANHO_LOTE):
+        ContadorNotificacoes.objects.filter(user__in=usuarios[inicio:inicio + TAMANHO_LOTE]).update(
+            nao_lidas=Greatest(F('nao_lidas') + delta, 0))
+    _publicar_contadores(usuarios)
+
+
+def _publicar_contadores(usuarios):
+    """Envia as novas contagens aos utilizadores afetados que estão ligados (core.eventos)"""
+    ligados = eventos.ligados()
+    if ligados is not None:
+        usuarios = [usuario for usuario in usuarios if usuario in ligados]
+        if not usuarios:
+            return
+
+    def publicar():
+        contadores = ContadorNotificacoes.objects.filter(user__in=usuarios).values_list('user', 'nao_lidas')
+        for usuario, nao_lidas in contadores:
+            eventos.broker().publicar('notificacoes', {'count': nao_lidas}, usuarios=[usuario])
+    transaction.on_commit(publicar)
+
+
+def limite_retencao():
+    """Entregas criadas antes deste instante saem da caixa de entrada (NOTIFICACOES_RETENCAO_DIAS)"""
+    return timezone.now() - timedelta(days=settings.NOTIFICACOES_RETENCAO_DIAS)
+
+
+def entregar(notificacao, usuarios=None):
+    """Cria em massa as entregas em falta para o público da notificação (ou só para `usuarios`).
+
+    Os contadores só sobem para os utilizadores que ainda não tinham a
+    entrega, lidos na mesma transação do INSERT. Devolve o número de
+    entregas criadas.
+    """
+    publico = User.objects.all() if notificacao.global_notificacao else notificacao.destinatarios.all()
+    if usuarios is not None:
+        publico = publico.filter(pk__in=usuarios)
+    with transaction.atomic():
+        existentes = set(notificacao.entregas.values_list('user', flat=True))
+        novos = [pk for pk in publico.values_list('pk', flat=True) if pk not in existentes]
+        EntregaNotificacao.objects.bulk_create(
+            [EntregaNotificacao(notificacao=notificacao, user_id=pk, data_criacao=notificacao.data_criacao) for pk in novos],
+            batch_size=TAMANHO_LOTE, ignore_conflicts=True,
+        )
+        ajustar(novos, 1)
+    if novos:
+        anunciar(notificacao, novos)
+    return len(novos)
+
+
+def entregar_globais(usuario):
+    """Entrega a um utilizador novo as notificações globais ativas ainda dentro do prazo de retenção"""
+    globais = Notificacao.objects.filter(ativa=True, global_notificacao=True, data_criacao__gte=limite_retencao())
+    EntregaNotificacao.objects.bulk_create(
+        [EntregaNotificacao(notificacao_id=pk, user=usuario, data_criacao=data)
+         for pk, data in globais.values_list('pk', 'data_criacao')],
+        batch_size=TAMANHO_LOTE, ignore_conflicts=True,
+    )
+
+
+def retirar(entregas):
+    """Apaga as entregas indicadas (ex.: destinatário removido) e desconta as que estavam por ler"""
+    por_ler = list(entregas.filter(lida=False, arquivada=False).values_list('user', flat=True))
+    entregas.delete()
+    ajustar(por_ler, -1)
+
+
+def arquivar(entregas, arquivada=True):
+    """Arquiva (ou repõe na caixa de entrada) as entregas, acertando os contadores"""
+    entregas = entregas.exclude(arquivada=arquivada)
+    contagens = entregas.filter(lida=False).values('user').annotate(total=Count('pk')).values_list('user', 'total')
+    por_total = {}
+    for usuario, total in contagens:
+        por_total.setdefault(total, []).append(usuario)
+    alteradas = entregas.update(arquivada=arquivada)
+    for total, usuarios in por_total.items():
+        ajustar(usuarios, -total if arquivada else total)
+    return alteradas
+
+
+def marcar_lidas(usuario, entregas):
+    """Marca como lidas as entregas do utilizador (uma, várias ou todas). Devolve quantas mudaram"""
+    entregas = entregas.filter(user=usuario, lida=False)
+    visiveis = entregas.filter(arquivada=False).update(lida=True)
+    arquivadas = entregas.update(lida=True)
+    ajustar([usuario.pk], -visiveis)
+    return visiveis + arquivadas
+
+
+def anunciar(notificacao, usuarios=None):
+    """Envia a notificação acabada de publicar aos utilizadores ligados (todos, se usuarios=None)"""
+    eventos.publicar('notificacao', {
+        'id': notificacao.pk,
+        'titulo': notificacao.titulo,
+        'mensagem': notificacao.mensagem,
+        'tipo': notificacao.tipo,
+        'data_criacao': notificacao.data_criacao.isoformat(),
+    }, usuarios=usuarios)
+
+
+def anunciar_perfis_pendentes():
+    """Envia a contagem de perfis pendentes à staff ligada"""
+    if eventos.ligados(staff=True) == set():
+        return
+    transaction.on_commit(lambda: eventos.broker().publicar(
+        'perfis_pendentes', {'count': PerfilUsuario.objects.filter(nivel_acesso='pendente').count()}, staff=True))
+
+
+def recalcular_contadores(usuarios=None):
+    """Recalcula de raiz os contadores (de todos os utilizadores ou dos ids indicados).
+
+    Uma agregação sobre as entregas por ler, gravada com bulk_create/upsert.
+    Devolve o número de contadores gravados.
+    """
+    ids = User.objects.values_list('pk', flat=True)
+    if usuarios is not None:
+        ids = ids.filter(pk__in=usuarios)
+    ids = list(ids)
+
+    entregas = EntregaNotificacao.objects.filter(lida=False, arquivada=False)
+    if usuarios is not None:
+        entregas = entregas.filter(user__in=ids)
+    por_ler = dict(entregas.values('user').annotate(total=Count('pk')).values_list('user', 'total'))
+
+    ContadorNotificacoes.objects.bulk_create(
+        [ContadorNotificacoes(user_id=pk, nao_lidas=por_ler.get(pk, 0)) for pk in ids],
+        batch_size=TAMANHO_LOTE, update_conflicts=True, unique_fields=['user'], update_fields=['nao_lidas'],
+    )
+    return len(ids)
+
+
+def contador_nao_lidas(usuario):
+    """Notificações por ler do utilizador: uma leitura pela chave primária"""
+    valor = ContadorNotificacoes.objects.filter(pk=usuario.pk).values_list('nao_lidas', flat=True).first()
+    if valor is None:
+        recalcular_contadores([usuario.pk])
+        valor = ContadorNotificacoes.objects.filter(pk=usuario.pk).values_list('nao_lidas', flat=True).first() or 0
+    return valor
+
+
+def arquivar_antigas(dias=None, tamanho_lote=TAMANHO_LOTE):
+    """Política de retenção: arquiva as entregas com mais de `dias` (NOTIFICACOES_RETENCAO_DIAS).
+
+    Trabalha em lotes pela chave primária, cada um na sua transação, para não
+    bloquear a base de dados. Devolve o número de entregas arquivadas.
+    """
+    dias = settings.NOTIFICACOES_RETENCAO_DIAS if dias is None else dias
+    antigas = EntregaNotificacao.objects.filter(
+        arquivada=False, data_criacao__lt=timezone.now() - timedelta(days=dias)).order_by('pk')
+    total = 0
+    while True:
+        with transaction.atomic():
+            lote = list(antigas.values_list('pk', flat=True)[:tamanho_lote])
+            if not lote:
+                return total
+            total += arquivar(EntregaNotificacao.objects.filter(pk__in=lote))
+
+
+def apagar_arquivadas(dias, tamanho_lote=TAMANHO_LOTE):
+    """Apaga de vez as entregas arquivadas com mais de `dias`. Devolve quantas foram apagadas"""
+    antigas = EntregaNotificacao.objects.filter(
+        arquivada=True, data_criacao__lt=timezone.now() - timedelta(days=dias)).order_by('pk')
+    total = 0
+    while True:
+        lote = list(antigas.values_list('pk', flat=True)[:tamanho_lote])
+        if not lote:
+            return total
+        total += EntregaNotificacao.objects.filter(pk__in=lote).delete()[0]
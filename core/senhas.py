@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core import checks
+from django.core.exceptions import ValidationError
+from django.utils.crypto import salted_hmac
+
+from .models import ImpressaoSenha
+
+MENSAGEM_REUTILIZADA = 'Esta senha já está sendo usada por outro usuário. Por favor, escolha uma senha diferente.'
+
+# SENHAS_REUTILIZACAO: 'bloquear' (guarda as impressões e recusa senhas repetidas),
+# 'registar' (só guarda as impressões) ou 'desativado'
+
+
+def impressao(senha):
+    """HMAC-SHA256 da senha com a pimenta SENHAS_PIMENTA.
+
+    Não tem sal, de propósito: a mesma senha dá sempre a mesma impressão, o
+    que permite procurá-la pelo índice. Sem a pimenta (que não está na base
+    de dados) as impressões não servem para atacar as senhas.
+    """
+    return salted_hmac('core.senhas.impressao', senha, secret=settings.SENHAS_PIMENTA, algorithm='sha256').hexdigest()
+
+
+def pimenta_definida():
+    """A pimenta tem de vir do ambiente: a SECRET_KEY está no repositório e não serve"""
+    return bool(settings.SENHAS_PIMENTA) and settings.SENHAS_PIMENTA != settings.SECRET_KEY
+
+
+def politica():
+    """SENHAS_REUTILIZACAO efetiva: 'desativado' enquanto não houver pimenta própria"""
+    return settings.SENHAS_REUTILIZACAO if pimenta_definida() else 'desativado'
+
+
+def registo_ativo():
+    return politica() in ('bloquear', 'registar')
+
+
+def senha_reutilizada(senha, usuario=None):
+    """Indica se outro utilizador já usa esta senha: uma consulta pelo índice das impressões.
+
+    As contas ainda sem impressão (anteriores ao índice e que não voltaram a
+    entrar) não são detetadas; ver o comando impressoes_senhas.
+    """
+    if politica() != 'bloquear':
+        return False
+    existentes = ImpressaoSenha.objects.filter(impressao=impressao(senha))
+    if usuario is not None and usuario.pk:
+        existentes = existentes.exclude(user=usuario)
+    return existentes.exists()
+
+
+def registar_impressao(usuario, senha):
+    if registo_ativo():
+        ImpressaoSenha.objects.update_or_create(user=usuario, defaults={'impressao': impressao(senha)})
+
+
+class SenhaUnicaValidator:
+    """Recusa uma senha já usada por outro utilizador e guarda a impressão quando a senha muda.
+
+    Como está em AUTH_PASSWORD_VALIDATORS, o Django chama password_changed()
+    sempre que um utilizador é gravado depois de set_password(). O
+    create_user() não passa por aí: quem o usa chama registar_impressao().
+    """
+
+    def validate(self, password, user=None):
+        if senha_reutilizada(password, user):
+            raise ValidationError(MENSAGEM_REUTILIZADA, code='senha_reutilizada')
+
+    def password_changed(self, password, user):
+        registar_impressao(user, password)
+
+    def get_help_text(self):
+        return 'A sua senha não pode ser igual à de outro utilizador.'
+
+
+class ImpressaoSenhaBackend(ModelBackend):
+    """ModelBackend que guarda a impressão das contas que ainda não a têm quando entram com sucesso"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is not None and password and registo_ativo() and not ImpressaoSenha.objects.filter(user=user).exists():
+            registar_impressao(user, password)
+        return user
+
+
+@checks.register(checks.Tags.security)
+def verificar_pimenta(app_configs, **kwargs):
+    if settings.SENHAS_REUTILIZACAO == 'desativado' or pimenta_definida():
+        return []
+    return [checks.Warning(
+        'SENHAS_PIMENTA não está definida (ou é igual à SECRET_KEY): a deteção de senhas reutilizadas '
+        'está desativada e não são guardadas impressões.',
+        hint='Defina SENHAS_PIMENTA no ambiente e corra `manage.py impressoes_senhas --repor` '
+             'para apagar as impressões calculadas com a chave antiga.',
+        id='core.W001',
+    )]
@@ -0,0 +1,83 @@
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+
+from .models import Sequencia
+
+# Campo de onde cada prefixo herda o último número já emitido quando a
+# sequência é criada numa base de dados que ainda não tinha contadores
+ORIGENS = {
+    'INS': ('core.Inscricao', 'numero_inscricao'),
+    'ALU': ('core.Aluno', 'numero_estudante'),
+}
+
+_blocos = {}
+_blocos_lock = threading.Lock()
+
+
+def formatar_numero(prefixo, valor):
+    return f"{prefixo}-{valor:06d}"
+
+
+def _valor_inicial(prefixo):
+    """Maior número já atribuído para o prefixo (consulta feita uma única vez)"""
+    if prefixo not in ORIGENS:
+        return 0
+    modelo, campo = ORIGENS[prefixo]
+    ultimo = apps.get_model(modelo).objects.filter(
+        **{f'{campo}__startswith': f'{prefixo}-'}
+    ).order_by(Length(campo).desc(), f'-{campo}').values_list(campo, flat=True).first()
+    if not ultimo:
+        return 0
+    try:
+        return int(ultimo.split('-')[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _reservar(prefixo, quantidade):
+    """Incrementa o contador de forma atómica e devolve o primeiro valor reservado"""
+    with transaction.atomic():
+        if not Sequencia.objects.filter(prefixo=prefixo).update(ultimo_valor=F('ultimo_valor') + quantidade):
+            try:
+                with transaction.atomic():
+                    Sequencia.objects.create(prefixo=prefixo, ultimo_valor=_valor_inicial(prefixo))
+            except IntegrityError:
+                # Outro processo criou a sequência entretanto
+                pass
+            Sequencia.objects.filter(prefixo=prefixo).update(ultimo_valor=F('ultimo_valor') + quantidade)
+        ultimo = Sequencia.objects.filter(prefixo=prefixo).values_list('ultimo_valor', flat=True).get()
+    return ultimo - quantidade + 1
+
+
+def reservar_numeros(prefixo, quantidade):
+    """Reserva `quantidade` números consecutivos e devolve-os já formatados"""
+    if quantidade <= 0:
+        return []
+    primeiro = _reservar(prefixo, quantidade)
+    return [formatar_numero(prefixo, valor) for valor in range(primeiro, primeiro + quantidade)]
+
+
+def proximo_numero(prefixo):
+    """Devolve o próximo número formatado para o prefixo.
+
+    Com SEQUENCIA_TAMANHO_BLOCO > 1 cada processo reserva um bloco de números
+    e vai-os consumindo em memória, evitando uma escrita por inscrição. Dentro
+    de uma transação o bloco não é guardado, porque um rollback devolveria os
+    números ao contador enquanto o processo continuaria a usá-los.
+    """
+    tamanho = getattr(settings, 'SEQUENCIA_TAMANHO_BLOCO', 1)
+    if tamanho <= 1 or connection.in_atomic_block:
+        return formatar_numero(prefixo, _reservar(prefixo, 1))
+
+    with _blocos_lock:
+        proximo, limite = _blocos.get(prefixo, (1, 0))
+        if proximo > limite:
+            proximo = _reservar(prefixo, tamanho)
+            limite = proximo + tamanho - 1
+        _blocos[prefixo] = (proximo + 1, limite)
+    return formatar_numero(prefixo, proximo)
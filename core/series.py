@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Curso, Inscricao, InscricoesPorDia
+
+
+def data_local(momento):
+    """Dia (no fuso local) a que pertence uma data/hora de inscrição"""
+    return timezone.localdate(momento) if timezone.is_aware(momento) else momento.date()
+
+
+def somar(contagens):
+    """Soma `contagens` {(data, curso_id, turno): n} às linhas diárias (n pode ser negativo)"""
+    for (data, curso_id, turno), quantidade in contagens.items():
+        if not quantidade:
+            continue
+        filtro = {'data': data, 'curso_id': curso_id, 'turno': turno}
+        if InscricoesPorDia.objects.filter(**filtro).update(total=F('total') + quantidade):
+            continue
+        try:
+            with transaction.atomic():
+                InscricoesPorDia.objects.create(total=quantidade, **filtro)
+        except IntegrityError:
+            # Outro processo criou a linha entretanto
+            InscricoesPorDia.objects.filter(**filtro).update(total=F('total') + quantidade)
+
+
+def contar(inscricoes):
+    """Contagens diárias de uma lista de inscrições já gravadas"""
+    return Counter(
+        (data_local(i.data_inscricao), i.curso_id, i.turno_preferencial) for i in inscricoes
+    )
+
+
+def reconstruir_series():
+    """Reconstrói as linhas diárias a partir de todas as inscrições; devolve o número de linhas"""
+    linhas = Inscricao.objects.order_by().annotate(
+        dia=TruncDate('data_inscricao', tzinfo=timezone.get_current_timezone()),
+    ).values('dia', 'curso_id', 'turno_preferencial').annotate(total=Count('id'))
+    with transaction.atomic():
+        InscricoesPorDia.objects.all().delete()
+        criadas = InscricoesPorDia.objects.bulk_create([
+            InscricoesPorDia(data=linha['dia'], curso_id=linha['curso_id'],
+                             turno=linha['turno_preferencial'], total=linha['total'])
+            for linha in linhas.iterator()
+        ], batch_size=1000)
+    return len(criadas)
+
+
+MAXIMO_DIAS = 3 * 366
+
+
+def serie_diaria(inicio, fim, cursos=None):
+    """Inscrições por dia entre `inicio` e `fim` (inclusive), com totais por curso e por turno.
+
+    Lê só as linhas diárias do intervalo; os dias sem inscrições aparecem com zero.
+    """
+    linhas = InscricoesPorDia.objects.filter(data__range=(inicio, fim))
+    if cursos:
+        linhas = linhas.filter(curso__in=cursos)
+
+    dias = {}
+    # Sem passar de `fim`: o dia seguinte a date.max não existe
+    for n in range((fim - inicio).days + 1):
+        dia = inicio + timedelta(days=n)
+        dias[dia] = {'data': dia.isoformat(), 'total': 0, 'por_curso': {}, 'por_turno': {}}
+    totais_curso = Counter()
+    for data, curso_id, turno, total in linhas.values_list('data', 'curso_id', 'turno', 'total'):
+        ponto = dias[data]
+        ponto['total'] += total
+        ponto['por_curso'][curso_id] = ponto['por_curso'].get(curso_id, 0) + total
+        ponto['por_turno'][turno] = ponto['por_turno'].get(turno, 0) + total
+        totais_curso[curso_id] += total
+
+    return {
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'total': sum(totais_curso.values()),
+        'cursos': {c.pk: c.nome for c in Curso.objects.filter(pk__in=list(totais_curso))},
+        'turnos': dict(Inscricao.TURNO_CHOICES),
+        'dias': list(dias.values()),
+    }
@@ -1,7 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import PerfilUsuario
+from .models import PerfilUsuario, AnoAcademico, Curso, Inscricao, Notificacao, Semestre, Subscricao
 
 @receiver(post_save, sender=User)
 def criar_perfil_usuario(sender, instance, created, **kwargs):
@@ -12,3 +12,172 @@ def criar_perfil_usuario(sender, instance, created, **kwargs):
 def salvar_perfil_usuario(sender, instance, **kwargs):
     if hasattr(instance, 'perfil'):
         instance.perfil.save()
+
+def _apagada_com_o_curso(kwargs):
+    """A inscrição sai em cascata de um curso apagado (curso.delete() ou um queryset de cursos)"""
+    origem = kwargs.get('origin')
+    return isinstance(origem, Curso) or getattr(origem, 'model', None) is Curso
+
+@receiver(post_save, sender=Inscricao)
+def reclassificar_apos_nota(sender, instance, created, **kwargs):
+    """Mantém a classificação do curso em dia quando uma nota é lançada ou alterada"""
+    from .aprovacoes import atualizar_classificacao
+    if not instance.classificacao_alterada():
+        return
+    curso_original, _ = getattr(instance, '_classificacao_original', (None, None))
+    if curso_original and curso_original != instance.curso_id:
+        atualizar_classificacao(Curso.objects.get(pk=curso_original))
+    atualizar_classificacao(instance.curso)
+    instance._classificacao_original = (instance.curso_id, instance.nota_teste)
+
+@receiver(post_delete, sender=Inscricao)
+def reclassificar_apos_remocao(sender, instance, **kwargs):
+    from .aprovacoes import atualizar_classificacao
+    # Só a saída de um aprovado liberta uma vaga; ao apagar o curso não há nada a refazer
+    if instance.aprovado and not _apagada_com_o_curso(kwargs):
+        curso = Curso.objects.filter(pk=instance.curso_id).first()
+        if curso:
+            atualizar_classificacao(curso)
+
+@receiver(post_save, sender=Curso)
+def reclassificar_apos_criterios(sender, instance, created, **kwargs):
+    """Vagas ou nota mínima alteradas: a posição de corte muda"""
+    from .aprovacoes import atualizar_classificacao
+    if instance.criterios_alterados():
+        atualizar_classificacao(instance)
+        instance._criterios_originais = (instance.vagas, instance.nota_minima)
+
+@receiver(post_delete, sender=Inscricao)
+def invalidar_contadores_inscricoes(sender, instance, **kwargs):
+    """Os contadores do dashboard/painel em cache deixam de valer"""
+    from .contadores import invalidar_contadores
+    invalidar_contadores()
+
+@receiver(post_save, sender=Inscricao)
+def marcar_estatisticas_apos_gravar(sender, instance, **kwargs):
+    """Os contadores em cache deixam de valer e as estatísticas do ano/curso (e do anterior, se mudou)
+    são marcadas como desatualizadas, para o comando atualizar_estatisticas as recalcular.
+
+    Gravações que só mudam campos fora dos totais (contactos, morada,
+    encarregado...) não tocam em nada.
+    """
+    from .contadores import invalidar_contadores
+    from .estatisticas import marcar_desatualizadas
+    original = getattr(instance, '_estatistica_original', None)
+    atual = instance.campos_estatistica()
+    if original == atual:
+        return
+    invalidar_contadores()
+    marcar_desatualizadas({atual[:2], (original or (None, None))[:2]})
+    instance._estatistica_original = atual
+
+@receiver(post_delete, sender=Inscricao)
+def marcar_estatisticas_apos_remocao(sender, instance, **kwargs):
+    from .estatisticas import marcar_desatualizadas
+    # Ao apagar o curso, as estatísticas dele também são apagadas
+    if not _apagada_com_o_curso(kwargs):
+        marcar_desatualizadas([(instance.ano_academico_id, instance.curso_id)])
+
+@receiver(post_save, sender=AnoAcademico)
+def congelar_estatisticas_ano(sender, instance, **kwargs):
+    """Ao encerrar um ano, as estatísticas são recalculadas uma última vez e ficam congeladas"""
+    from .estatisticas import atualizar_estatisticas
+    if instance.status == 'encerrado':
+        atualizar_estatisticas(ano=instance)
+
+@receiver(post_save, sender=Inscricao)
+def contar_inscricao_diaria(sender, instance, created, **kwargs):
+    """Mantém as contagens diárias por curso/turno (core.series)"""
+    from .series import contar, data_local, somar
+    original = getattr(instance, '_serie_original', None)
+    atual = (instance.curso_id, instance.turno_preferencial)
+    if created:
+        somar(contar([instance]))
+    elif original and original != atual:
+        data = data_local(instance.data_inscricao)
+        somar({(data, *original): -1, (data, *atual): 1})
+    instance._serie_original = atual
+
+@receiver(post_delete, sender=Inscricao)
+def descontar_inscricao_diaria(sender, instance, **kwargs):
+    from .series import contar, somar
+    if not _apagada_com_o_curso(kwargs):
+        somar({chave: -total for chave, total in contar([instance]).items()})
+
+@receiver(post_save, sender=AnoAcademico)
+@receiver(post_delete, sender=AnoAcademico)
+@receiver(post_save, sender=Semestre)
+@receiver(post_delete, sender=Semestre)
+def invalidar_contexto_academico(sender, instance, **kwargs):
+    """Ano/semestre ativos em cache (core.academico) deixam de valer"""
+    from .academico import invalidar_academico
+    invalidar_academico()
+
+@receiver(post_save, sender=Subscricao)
+@receiver(post_delete, sender=Subscricao)
+def invalidar_contexto_subscricao(sender, instance, **kwargs):
+    from .academico import invalidar_subscricao
+    invalidar_subscricao()
+
+# Entregas de notificações e contadores de não lidas (core.notificacoes)
+
+@receiver(post_save, sender=Notificacao)
+def entregar_notificacao_publicada(sender, instance, created, **kwargs):
+    """Publicar, desativar ou tornar global uma notificação cria, arquiva ou retira entregas"""
+    from .notificacoes import arquivar, entregar, limite_retencao, retirar
+    ativa_original, global_original = (None, False) if created else getattr(
+        instance, '_publicacao_original', (instance.ativa, instance.global_notificacao))
+    if global_original and not instance.global_notificacao:
+        retirar(instance.entregas.exclude(user__in=instance.destinatarios.all()))
+    if ativa_original is not None and ativa_original != instance.ativa:
+        entregas = instance.entregas.all()
+        if instance.ativa:
+            # As arquivadas pela política de retenção (arquivar_notificacoes) não voltam à caixa de entrada
+            entregas = entregas.filter(data_criacao__gte=limite_retencao())
+        arquivar(entregas, arquivada=not instance.ativa)
+    if instance.ativa and (not ativa_original or instance.global_notificacao and not global_original):
+        entregar(instance)
+    instance._publicacao_original = (instance.ativa, instance.global_notificacao)
+
+@receiver(pre_delete, sender=Notificacao)
+def descontar_notificacao_apagada(sender, instance, **kwargs):
+    from .notificacoes import retirar
+    retirar(instance.entregas.all())
+
+def _alteracoes_destinatarios(instance, action, reverse, model, pk_set):
+    """Pares (notificação, ids de utilizadores) afetados por uma alteração de destinatarios"""
+    if action == 'pre_clear':
+        if reverse:
+            return [(n, [instance.pk]) for n in instance.notificacoes.all()]
+        return [(instance, list(instance.destinatarios.values_list('pk', flat=True)))]
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return []
+    if reverse:
+        return [(n, [instance.pk]) for n in model.objects.filter(pk__in=pk_set)]
+    return [(instance, list(pk_set))]
+
+@receiver(m2m_changed, sender=Notificacao.destinatarios.through)
+def entregar_destinatarios(sender, instance, action, reverse, model, pk_set, **kwargs):
+    from .notificacoes import entregar, retirar
+    for notificacao, usuarios in _alteracoes_destinatarios(instance, action, reverse, model, pk_set):
+        # Numa notificação global os destinatários não mudam o público
+        if notificacao.global_notificacao:
+            continue
+        if action == 'post_add':
+            if notificacao.ativa:
+                entregar(notificacao, usuarios)
+        else:
+            retirar(notificacao.entregas.filter(user__in=usuarios))
+
+@receiver(post_save, sender=User)
+def entregar_globais_utilizador_novo(sender, instance, created, **kwargs):
+    from .notificacoes import entregar_globais
+    if created:
+        entregar_globais(instance)
+
+@receiver(post_save, sender=PerfilUsuario)
+@receiver(post_delete, sender=PerfilUsuario)
+def avisar_staff_perfis_pendentes(sender, instance, **kwargs):
+    """A staff ligada recebe a nova contagem de perfis pendentes (core.eventos)"""
+    from .notificacoes import anunciar_perfis_pendentes
+    anunciar_perfis_pendentes()
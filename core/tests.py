@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import asyncio
+import json
+import random
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Q
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .academico import ano_atual, estado_licenca
+from .aprovacoes import inscricoes_aprovadas, processar_aprovacoes
+from .cache import invalidar, versao
+from .contadores import contadores_inscricoes
+from .elegibilidade import avaliar_curso
+from .executor import ExecutorLimitado, Sobrecarregado
+from .inscricoes import criar_inscricao, enfileirar_inscricao, processar_fila, validar_inscricao
+from .limites import _consumir, armazem
+from .models import AnoAcademico, BaldePedidos, ClassificacaoCurso, ContadorNotificacoes, Curso, Disciplina, HistoricoAcademico, EstatisticaAnoCurso, Inscricao, ImpressaoSenha, InscricaoPendente, InscricoesPorDia, NotaDisciplina, Notificacao, PrerequisitoDisciplina, RecuperacaoSenha, Semestre, Sequencia, Subscricao
+from .normalizacao import normalizar_telefone
+from .notas import lancar_notas, ler_grelha
+from .notificacoes import caixa_de_entrada, contador_nao_lidas, entregar, pagina_caixa, recalcular_contadores
+from . import sequencias
+from .series import reconstruir_series, serie_diaria
+from .senhas import senha_reutilizada, verificar_pimenta
+from .views import login_view
+
+TABELAS_CONTEXTO = ('core_anoacademico', 'core_semestre', 'core_subscricao')
+
+# Caches em memória: a cache em ficheiros do projeto (BASE_DIR/cache, com as
+# sessões em cache/sessoes) é a do servidor e não pode ser apagada pelos testes
+CACHES_TESTE = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'testes-{alias}'}
+    for alias in settings.CACHES
+}
+
+
+def novo_curso(codigo='C1', vagas=2, nota_minima='10.00', **campos):
+    return Curso.objects.create(codigo=codigo, nome=f'Curso {codigo}', vagas=vagas,
+                                nota_minima=Decimal(nota_minima), **campos)
+
+
+def nova_inscricao(curso, i, nota=None, **campos):
+    return Inscricao.objects.create(**{
+        'curso': curso, 'nome_completo': f'Candidato {i}', 'data_nascimento': date(2005, 1, 1),
+        'bilhete_identidade': f'{i:09d}LA001', 'sexo': 'F', 'endereco': 'Luanda', 'telefone': f'9{i:08d}',
+        'email': f'candidato{i}@escola.ao', 'nota_teste': None if nota is None else Decimal(str(nota)), **campos})
+
+
+def dados_inscricao(i, **campos):
+    """Dados do formulário público de inscrição (como em dados_formulario())"""
+    return {'nome_completo': f'Candidato {i}', 'data_nascimento': '2005-01-01', 'local_nascimento': 'Luanda',
+            'nacionalidade': 'Angolana', 'bilhete_identidade': f'{i:09d}LA001', 'sexo': 'M', 'endereco': 'Luanda',
+            'telefone': f'9{i:08d}', 'email': f'candidato{i}@escola.ao', 'ano_conclusao': '2023', **campos}
+
+
+def aprovados_esperados(curso):
+    """Classificação por força bruta: as melhores notas elegíveis (empates pelo id), até às vagas"""
+    curso.refresh_from_db()
+    elegiveis = sorted(
+        (i for i in Inscricao.objects.filter(curso=curso)
+         if i.nota_teste is not None and i.nota_teste >= curso.nota_minima and i.habilitado is not False),
+        key=lambda i: (-i.nota_teste, i.pk),
+    )
+    return {i.pk for i in elegiveis[:curso.vagas]}
+
+
+class CacheIsolada:
+    def setUp(self):
+        for alias in CACHES_TESTE:
+            caches[alias].clear()
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class CacheIsoladaTestCase(CacheIsolada, TestCase):
+    """Base dos testes: caches em memória, vazias no início de cada teste"""
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class CacheIsoladaTransactionTestCase(CacheIsolada, TransactionTestCase):
+    """O mesmo, para os testes que precisam de commits reais"""
+
+
+@override_settings(LICENCA_VERIFICACAO_SEGUNDOS=0)
+class ContextoPreguicosoTests(CacheIsoladaTestCase):
+    """Os context processors só consultam ano/semestre/subscrição quando o template os usa"""
+
+    def setUp(self):
+        super().setUp()
+        ano = AnoAcademico.objects.create(ano_inicio=2024, ano_fim=2025, ativo=True)
+        Semestre.objects.create(ano_academico=ano, nome='1', data_inicio=date(2024, 9, 1),
+                                data_fim=date(2025, 1, 31), ativo=True)
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        self.user = User.objects.create_superuser('admin', 'admin@escola.ao', 'senha')
+        self.client.force_login(self.user)
+        cache.clear()
+        # O middleware de licença lê o estado do dia em todos os pedidos
+        estado_licenca()
+
+    def consultas_contexto(self, url, **extra):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url, **extra)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, [q['sql'] for q in consultas if any(t in q['sql'] for t in TABELAS_CONTEXTO)]
+
+    def test_partial_nao_consulta_contexto(self):
+        _, consultas = self.consultas_contexto('/anos-academicos/novo/', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(consultas, [])
+
+    def test_pagina_completa_resolve_contexto(self):
+        resposta, consultas = self.consultas_contexto('/anos-academicos/novo/')
+        self.assertTrue(consultas)
+        self.assertContains(resposta, '2024/2025')
+        self.assertEqual(str(resposta.context['semestre_atual']), '1º Semestre - 2024/2025')
+
+    def test_contexto_em_cache_nao_repete_consultas(self):
+        self.consultas_contexto('/anos-academicos/novo/')
+        _, consultas = self.consultas_contexto('/anos-academicos/novo/')
+        self.assertEqual(consultas, [])
+
+    def test_rodape_usa_o_estado_da_licenca_em_cache(self):
+        with mock.patch.object(Subscricao, 'esta_ativo') as esta_ativo, \
+                mock.patch.object(Subscricao, 'dias_restantes') as dias_restantes:
+            resposta, consultas = self.consultas_contexto('/anos-academicos/novo/')
+        self.assertContains(resposta, f"{estado_licenca()['dias_restantes']} dias")
+        self.assertContains(resposta, 'Ativa')
+        self.assertEqual([sql for sql in consultas if 'core_subscricao' in sql], [])
+        esta_ativo.assert_not_called()
+        dias_restantes.assert_not_called()
+
+    def test_valor_local_nao_e_partilhado(self):
+        ano = ano_atual()
+        ano.ano_inicio = 1900
+        self.assertEqual(ano_atual().ano_inicio, 2024)
+        estado_licenca()['ativo'] = False
+        self.assertTrue(estado_licenca()['ativo'])
+
+    def test_invalidacoes_geram_versoes_novas(self):
+        versoes = {versao('academico')}
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidar('academico')
+            versoes.add(versao('academico'))
+        self.assertEqual(len(versoes), 4)
+
+
+@override_settings(LICENCA_VERIFICACAO_SEGUNDOS=0)
+class LicencaTests(CacheIsoladaTestCase):
+    """A licença é aplicada a partir do estado em cache e a renovação encontra subscrições expiradas"""
+
+    def setUp(self):
+        super().setUp()
+        self.subscricao = Subscricao.objects.create(
+            nome_escola='Escola Teste', estado='ativo', data_inicio=date.today() - timedelta(days=30),
+            data_expiracao=date.today() - timedelta(days=1),
+        )
+        self.user = User.objects.create_superuser('admin', 'admin@escola.ao', 'senha')
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def test_licenca_expirada_redireciona_para_renovacao(self):
+        resposta = self.client.get('/painel/')
+        self.assertRedirects(resposta, '/renovar-subscricao/')
+        resposta = self.client.get('/renovar-subscricao/')
+        self.assertContains(resposta, 'Escola Teste')
+
+    def test_estado_em_cache_nao_consulta_base_de_dados(self):
+        estado_licenca()
+        with self.assertNumQueries(0):
+            self.assertFalse(estado_licenca()['ativo'])
+
+    def test_verificar_subscricoes_expira_e_renova(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('verificar_subscricoes', stdout=StringIO())
+        self.subscricao.refresh_from_db()
+        self.assertEqual(self.subscricao.estado, 'expirado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscricao.objects.filter(pk=self.subscricao.pk).update(data_expiracao=date.today() + timedelta(days=30))
+            call_command('verificar_subscricoes', stdout=StringIO())
+        self.subscricao.refresh_from_db()
+        self.assertEqual(self.subscricao.estado, 'ativo')
+        self.assertTrue(estado_licenca()['ativo'])
+        self.assertEqual(self.client.get('/anos-academicos/novo/').status_code, 200)
+
+
+class EntregasNotificacoesTests(CacheIsoladaTestCase):
+    """As entregas e o contador por utilizador acompanham publicação, destinatários, leituras e arquivo"""
+
+    def setUp(self):
+        super().setUp()
+        self.ana = User.objects.create_user('ana', password='senha')
+        self.rui = User.objects.create_user('rui', password='senha')
+        # Cria os contadores (a partir daqui só são ajustados)
+        contador_nao_lidas(self.ana)
+        contador_nao_lidas(self.rui)
+
+    def assertEntregasCorretas(self):
+        for usuario in (self.ana, self.rui):
+            visiveis = Notificacao.objects.filter(
+                Q(global_notificacao=True) | Q(destinatarios=usuario), ativa=True).distinct()
+            caixa = caixa_de_entrada(usuario)
+            self.assertEqual({e.notificacao_id for e in caixa}, set(visiveis.values_list('pk', flat=True)))
+            self.assertEqual(contador_nao_lidas(usuario), caixa.filter(lida=False).count(), usuario.username)
+
+    def test_entregas_acompanham_alteracoes(self):
+        global_ = Notificacao.objects.create(titulo='Geral', mensagem='...', global_notificacao=True)
+        dirigida = Notificacao.objects.create(titulo='Para a Ana', mensagem='...')
+        dirigida.destinatarios.add(self.ana, self.rui)
+        self.assertEqual(contador_nao_lidas(self.ana), 2)
+
+        global_.marcar_como_lida(self.ana)
+        global_.marcar_como_lida(self.ana)
+        self.assertTrue(global_.esta_lida(self.ana))
+        dirigida.destinatarios.remove(self.rui)
+        self.assertEntregasCorretas()
+
+        dirigida.global_notificacao = True
+        dirigida.save()
+        self.assertEntregasCorretas()
+        global_.ativa = False
+        global_.save()
+        self.assertEntregasCorretas()
+        global_.ativa = True
+        global_.save()
+        self.assertEntregasCorretas()
+        self.assertTrue(global_.esta_lida(self.ana))
+        dirigida.global_notificacao = False
+        dirigida.save()
+        self.assertEntregasCorretas()
+        self.rui.notificacoes.add(dirigida)
+        dirigida.delete()
+        self.assertEntregasCorretas()
+
+    def test_utilizador_novo_recebe_globais(self):
+        Notificacao.objects.create(titulo='Geral', mensagem='...', global_notificacao=True)
+        novo = User.objects.create_user('eva', password='senha')
+        self.assertEqual(contador_nao_lidas(novo), 1)
+
+    def test_retencao_arquiva_entregas_antigas(self):
+        antiga = Notificacao.objects.create(titulo='Antiga', mensagem='...', global_notificacao=True)
+        Notificacao.objects.filter(pk=antiga.pk).update(data_criacao=timezone.now() - timedelta(days=200))
+        antiga.entregas.update(data_criacao=timezone.now() - timedelta(days=200))
+        Notificacao.objects.create(titulo='Recente', mensagem='...', global_notificacao=True)
+        call_command('arquivar_notificacoes', '--dias', '90', stdout=StringIO())
+        self.assertEqual([e.notificacao.titulo for e in caixa_de_entrada(self.ana)], ['Recente'])
+        self.assertEqual(contador_nao_lidas(self.ana), 1)
+        # Desativar e reativar não traz de volta as arquivadas pela retenção
+        antiga.refresh_from_db()
+        antiga.ativa = False
+        antiga.save()
+        antiga.ativa = True
+        antiga.save()
+        self.assertEqual([e.notificacao.titulo for e in caixa_de_entrada(self.ana)], ['Recente'])
+        self.assertEqual(contador_nao_lidas(self.ana), 1)
+
+    def test_entregas_repetidas_nao_contam_duas_vezes(self):
+        dirigida = Notificacao.objects.create(titulo='Para a Ana', mensagem='...')
+        dirigida.destinatarios.add(self.ana)
+        self.assertEqual(entregar(dirigida), 0)
+        self.assertEqual(entregar(dirigida, [self.ana.pk, self.rui.pk]), 0)
+        dirigida.destinatarios.add(self.ana, self.rui)
+        self.assertEqual((contador_nao_lidas(self.ana), contador_nao_lidas(self.rui)), (1, 1))
+        self.assertEntregasCorretas()
+
+    def test_paginacao_por_chave_e_marcar_em_massa(self):
+        for i in range(25):
+            Notificacao.objects.create(titulo=f'Aviso {i}', mensagem='...', global_notificacao=True)
+        primeira, cursor = pagina_caixa(self.ana, tamanho=10)
+        segunda, cursor = pagina_caixa(self.ana, cursor, tamanho=10)
+        terceira, cursor = pagina_caixa(self.ana, cursor, tamanho=10)
+        self.assertIsNone(cursor)
+        titulos = [e.notificacao.titulo for e in primeira + segunda + terceira]
+        self.assertEqual(titulos, [f'Aviso {i}' for i in reversed(range(25))])
+
+        self.client.force_login(self.ana)
+        resposta = self.client.get('/notificacoes/', {'antes': pagina_caixa(self.ana, tamanho=20)[1]})
+        self.assertContains(resposta, 'Aviso 0')
+        self.assertNotContains(resposta, 'Aviso 24')
+        self.assertEqual(self.client.get('/avisos/', {'antes': 'invalido'}).status_code, 200)
+        ids = [str(e.notificacao_id) for e in primeira[:3]]
+        resposta = self.client.post('/notificacoes/marcar-lidas/', {'ids': ids})
+        self.assertEqual(resposta.json()['count'], 22)
+        resposta = self.client.post('/notificacoes/marcar-lidas/', {'todas': '1'})
+        self.assertEqual((resposta.json()['marcadas'], resposta.json()['count']), (22, 0))
+        self.assertEntregasCorretas()
+
+    def test_leitura_pela_chave_primaria_e_recalculo(self):
+        Notificacao.objects.create(titulo='Geral', mensagem='...', global_notificacao=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(contador_nao_lidas(self.rui), 1)
+        ContadorNotificacoes.objects.update(nao_lidas=7)
+        self.assertEqual(recalcular_contadores(), 2)
+        self.assertEqual(contador_nao_lidas(self.rui), 1)
+
+
+class EventosStreamTests(CacheIsoladaTestCase):
+    """O stream de eventos envia as contagens iniciais e as notificações publicadas"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('ana', password='senha')
+        self.cliente = AsyncClient()
+        self.cliente.force_login(self.user)
+
+    async def proximo_evento(self, conteudo):
+        while True:
+            bloco = (await asyncio.wait_for(anext(conteudo), 5)).decode()
+            if bloco.startswith('event: '):
+                tipo, dados = bloco.strip().split('\n')
+                return tipo[len('event: '):], json.loads(dados[len('data: '):])
+
+    def publicar_global(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacao.objects.create(titulo='Geral', mensagem='Reunião', global_notificacao=True)
+
+    async def test_stream_envia_contagem_e_notificacao(self):
+        resposta = await self.cliente.get('/api/notificacoes/eventos/')
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        conteudo = aiter(resposta.streaming_content)
+        self.assertEqual(await self.proximo_evento(conteudo), ('notificacoes', {'count': 0}))
+
+        await sync_to_async(self.publicar_global)()
+        recebidos = dict([await self.proximo_evento(conteudo), await self.proximo_evento(conteudo)])
+        self.assertEqual(recebidos['notificacoes'], {'count': 1})
+        self.assertEqual(recebidos['notificacao']['titulo'], 'Geral')
+        await conteudo.aclose()
+
+    def test_wsgi_devolve_204(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/notificacoes/eventos/').status_code, 204)
+
+
+@override_settings(SENHAS_EXECUTOR_TRABALHADORES=0, SENHAS_PIMENTA='pimenta-de-teste')
+class ReutilizacaoSenhaTests(CacheIsoladaTestCase):
+    """A reutilização de senhas é detetada pelo índice de impressões, sem check_password por conta"""
+
+    def registar(self, username, senha):
+        return self.client.post('/registro/', {
+            'username': username, 'first_name': 'Teste', 'last_name': 'Teste', 'email': f'{username}@escola.ao',
+            'telefone': '', 'password1': senha, 'password2': senha,
+        })
+
+    def test_registo_recusa_senha_de_outro_utilizador(self):
+        self.registar('ana', 'Senha-Partilhada-1')
+        self.assertTrue(ImpressaoSenha.objects.filter(user__username='ana').exists())
+        with self.assertNumQueries(1):
+            self.assertTrue(senha_reutilizada('Senha-Partilhada-1'))
+        self.registar('rui', 'Senha-Partilhada-1')
+        self.assertFalse(User.objects.filter(username='rui').exists())
+        self.registar('rui', 'Outra-Senha-2')
+        self.assertTrue(User.objects.filter(username='rui').exists())
+
+    @override_settings(SENHAS_REUTILIZACAO='desativado')
+    def test_politica_desativada(self):
+        self.registar('ana', 'Senha-Partilhada-1')
+        self.registar('rui', 'Senha-Partilhada-1')
+        self.assertTrue(User.objects.filter(username='rui').exists())
+
+    @override_settings(SENHAS_PIMENTA='')
+    def test_sem_pimenta_nao_guarda_impressoes(self):
+        self.registar('ana', 'Senha-Partilhada-1')
+        self.registar('rui', 'Senha-Partilhada-1')
+        self.assertTrue(User.objects.filter(username='rui').exists())
+        self.assertFalse(ImpressaoSenha.objects.exists())
+
+    def test_pimenta_igual_a_secret_key_nao_conta(self):
+        with override_settings(SENHAS_PIMENTA=settings.SECRET_KEY):
+            self.registar('ana', 'Senha-Partilhada-1')
+            self.assertFalse(ImpressaoSenha.objects.exists())
+            self.assertIn('core.W001', [aviso.id for aviso in verificar_pimenta(None)])
+        self.assertEqual(verificar_pimenta(None), [])
+
+    def test_login_preenche_impressao_de_conta_antiga(self):
+        ana = User.objects.create_user('ana', password='Senha-Antiga-1')
+        self.assertFalse(ImpressaoSenha.objects.filter(user=ana).exists())
+        self.assertTrue(self.client.login(username='ana', password='Senha-Antiga-1'))
+        self.assertTrue(ImpressaoSenha.objects.filter(user=ana).exists())
+
+
+class ExecutorSenhasTests(CacheIsoladaTestCase):
+    """O PBKDF2 das views de autenticação corre num executor limitado, com 503 quando a fila enche"""
+
+    def test_fila_cheia_recusa_tarefas(self):
+        executor = ExecutorLimitado(1, 1)
+        libertar = threading.Event()
+        try:
+            a_correr = executor.submeter(libertar.wait)
+            em_espera = executor.submeter(lambda: 'feito')
+            while executor.metricas()['em_execucao'] < 1:
+                pass
+            with self.assertRaises(Sobrecarregado):
+                executor.submeter(lambda: 'recusada')
+            metricas = executor.metricas()
+            self.assertEqual((metricas['em_espera'], metricas['recusadas']), (1, 1))
+        finally:
+            libertar.set()
+        self.assertTrue(a_correr.result())
+        self.assertEqual(em_espera.result(), 'feito')
+        self.assertEqual(executor.metricas()['concluidas'], 2)
+        executor.encerrar()
+
+    @override_settings(SENHAS_EXECUTOR_TRABALHADORES=1, SENHAS_EXECUTOR_FILA=0)
+    def test_login_com_fila_cheia_devolve_503(self):
+        resposta = self.client.post('/login/', {'username': 'ana', 'password': 'Senha-1234'})
+        self.assertEqual(resposta.status_code, 503)
+        self.assertIn('Retry-After', resposta)
+        # O formulário (GET) não passa pelo executor
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+
+    @override_settings(SENHAS_EXECUTOR_TRABALHADORES=0)
+    def test_login_sem_executor(self):
+        ana = User.objects.create_user('ana', password='Senha-1234')
+        ana.perfil.nivel_acesso = 'admin'
+        ana.perfil.save()
+        resposta = self.client.post('/login/', {'username': 'ana', 'password': 'Senha-1234'})
+        self.assertRedirects(resposta, '/painel/', fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), ana.pk)
+
+    @override_settings(SENHAS_EXECUTOR_TRABALHADORES=2, SENHAS_EXECUTOR_FILA=10)
+    def test_metricas_so_para_staff(self):
+        user = User.objects.create_user('ana', password='Senha-1234')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/api/metricas/executor-senhas/').status_code, 403)
+        user.is_staff = True
+        user.save()
+        dados = self.client.get('/api/metricas/executor-senhas/').json()
+        self.assertEqual((dados['trabalhadores'], dados['fila_maxima'], dados['em_espera']), (2, 10, 0))
+
+
+@override_settings(SENHAS_EXECUTOR_TRABALHADORES=2, SENHAS_EXECUTOR_FILA=10)
+class ExecutorSenhasThreadsTests(CacheIsoladaTransactionTestCase):
+    """Registo e login pelo executor: as threads usam as suas próprias ligações à base de dados"""
+
+    def registar(self, username):
+        return self.client.post('/registro/', {
+            'username': username, 'first_name': username.title(), 'last_name': 'Teste', 'email': f'{username}@escola.ao',
+            'telefone': '923000000', 'password1': 'Senha-Forte-1234', 'password2': 'Senha-Forte-1234',
+        })
+
+    def test_registo_e_login_nas_threads_do_executor(self):
+        threads = []
+        criar = User.objects.create_user
+
+        def registar_thread(funcao):
+            def envolvida(*args, **kwargs):
+                threads.append(threading.current_thread().name)
+                return funcao(*args, **kwargs)
+            return envolvida
+
+        with mock.patch('core.views.authenticate', registar_thread(authenticate)), \
+                mock.patch.object(User.objects, 'create_user', registar_thread(criar)):
+            self.assertRedirects(self.registar('ana'), '/login/', fetch_redirect_response=False)
+            ana = User.objects.get(username='ana')
+            self.assertEqual(ana.perfil.nivel_acesso, 'pendente')
+            ana.perfil.nivel_acesso = 'admin'
+            ana.perfil.save()
+            resposta = self.client.post('/login/', {'username': 'ana', 'password': 'Senha-Forte-1234'})
+        self.assertRedirects(resposta, '/painel/', fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), ana.pk)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(nome.startswith('senhas') for nome in threads), threads)
+        # O last_login gravado pela thread do executor está na base de dados
+        ana.refresh_from_db()
+        self.assertIsNotNone(ana.last_login)
+
+    def test_logins_simultaneos(self):
+        for username in ('ana', 'rui', 'eva'):
+            perfil = User.objects.create_user(username, password='Senha-Forte-1234').perfil
+            perfil.nivel_acesso = 'admin'
+            perfil.save()
+
+        async def entrar(username):
+            cliente = AsyncClient()
+            return await cliente.post('/login/', {'username': username, 'password': 'Senha-Forte-1234'})
+
+        async def todos():
+            return await asyncio.gather(*(entrar(username) for username in ('ana', 'rui', 'eva')))
+
+        respostas = asyncio.run(todos())
+        self.assertEqual([r.status_code for r in respostas], [302] * 3)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 3)
+
+
+@override_settings(SENHAS_EXECUTOR_TRABALHADORES=0)
+class LimitePedidosTests(CacheIsoladaTestCase):
+    """Limites de pedidos por IP e por identificador, declarados nas views com @limitar"""
+
+    def setUp(self):
+        super().setUp()
+        armazem().limpar()
+
+    def entrar(self, username):
+        return self.client.post('/login/', {'username': username, 'password': 'errada'})
+
+    def test_balde_repoe_fichas_com_o_tempo(self):
+        estado, espera = _consumir(None, 2, 1.0, 100.0)
+        estado, espera = _consumir(estado, 2, 1.0, 100.0)
+        self.assertEqual(espera, 0)
+        estado, espera = _consumir(estado, 2, 1.0, 100.5)
+        self.assertAlmostEqual(espera, 0.5)
+        self.assertEqual(_consumir(estado, 2, 1.0, 101.0)[1], 0)
+
+    def test_login_limitado_por_utilizador(self):
+        for _ in range(5):
+            self.assertEqual(self.entrar('ana').status_code, 200)
+        resposta = self.entrar('ana')
+        self.assertEqual(resposta.status_code, 429)
+        self.assertGreaterEqual(int(resposta['Retry-After']), 1)
+        self.assertEqual(self.entrar('rui').status_code, 200)
+        # Os GET do formulário não gastam fichas
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+
+    @override_settings(LIMITES_PEDIDOS_ARMAZEM='core.limites.ArmazemBaseDados')
+    def test_armazem_base_dados(self):
+        armazem().limpar()
+        for _ in range(5):
+            self.entrar('ana')
+        self.assertEqual(self.entrar('ana').status_code, 429)
+        self.assertEqual(BaldePedidos.objects.count(), 2)
+        # Gastar uma ficha é um único UPDATE condicional; recusar só lê o balde
+        armazem().consumir('teste', 2, 2 / 60)
+        with self.assertNumQueries(1):
+            self.assertEqual(armazem().consumir('teste', 2, 2 / 60), 0)
+        with self.assertNumQueries(2):
+            self.assertGreater(armazem().consumir('teste', 2, 2 / 60), 0)
+
+    def test_login_limitado_sobretudo_por_utilizador(self):
+        limites = {limite.chave: limite for limite in login_view.limites_pedidos}
+        por_utilizador, por_ip = limites['POST:username'], limites['ip']
+        self.assertGreaterEqual(por_ip.capacidade, 100 * por_utilizador.capacidade)
+
+    @override_settings(LIMITES_PEDIDOS_ATIVOS=False)
+    def test_limites_desativados(self):
+        for _ in range(6):
+            self.assertEqual(self.entrar('ana').status_code, 200)
+
+
+class RecuperacaoSenhaTests(CacheIsoladaTestCase):
+    """Tokens únicos e indexados, limite de pedidos pendentes e limpeza dos expirados"""
+
+    def setUp(self):
+        super().setUp()
+        armazem().limpar()
+        self.user = User.objects.create_user('ana', email='ana@escola.ao', password='Senha-1234')
+
+    def recuperacao(self, minutos, **campos):
+        return RecuperacaoSenha.objects.create(
+            user=self.user, tipo='telefone', codigo_otp='123456',
+            data_expiracao=timezone.now() + timedelta(minutes=minutos), **campos)
+
+    def test_limite_de_pedidos_pendentes(self):
+        self.client.post('/esqueci-senha/', {'identificador': 'ana', 'metodo': 'email'})
+        recuperacao = RecuperacaoSenha.objects.get()
+        self.assertTrue(recuperacao.token)
+        self.assertEqual(RecuperacaoSenha.objects.get(token=recuperacao.token), recuperacao)
+        # Os pedidos por telefone não têm token (NULL não conta para o UNIQUE)
+        self.recuperacao(10)
+        self.recuperacao(10)
+        self.client.post('/esqueci-senha/', {'identificador': 'ana', 'metodo': 'telefone'})
+        self.assertEqual(RecuperacaoSenha.objects.count(), 3)
+        # Um expirado já não conta
+        self.recuperacao(10).marcar_como_usado()
+        RecuperacaoSenha.objects.filter(tipo='email').update(data_expiracao=timezone.now() - timedelta(minutes=1))
+        self.client.post('/esqueci-senha/', {'identificador': 'ana@escola.ao', 'metodo': 'email'})
+        self.assertEqual(RecuperacaoSenha.objects.count(), 5)
+
+    def test_limpeza_apaga_expirados_e_usados(self):
+        valida = self.recuperacao(10)
+        self.recuperacao(-5)
+        self.recuperacao(10).marcar_como_usado()
+        saida = StringIO()
+        call_command('limpar_recuperacoes_senha', lote=1, stdout=saida)
+        self.assertIn('2 pedido(s)', saida.getvalue())
+        self.assertEqual(list(RecuperacaoSenha.objects.all()), [valida])
+
+
+class SessoesTests(CacheIsoladaTestCase):
+    """Sessões lidas da cache (cached_db) ou em cookies assinados, e limpeza das expiradas"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('ana', password='Senha-1234')
+
+    def test_pedido_autenticado_nao_le_sessao_da_base_de_dados(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get('/api/notificacoes/count/').status_code, 200)
+        self.assertFalse([q for q in consultas.captured_queries if 'django_session' in q['sql']])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+                       MESSAGE_STORAGE='django.contrib.messages.storage.cookie.CookieStorage')
+    def test_sessao_em_cookie_assinado(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/notificacoes/count/').status_code, 200)
+        self.assertFalse(Session.objects.exists())
+
+    def test_limpar_sessoes_expiradas(self):
+        agora = timezone.now()
+        Session.objects.create(session_key='a' * 32, session_data='', expire_date=agora - timedelta(days=1))
+        Session.objects.create(session_key='b' * 32, session_data='', expire_date=agora - timedelta(hours=1))
+        Session.objects.create(session_key='c' * 32, session_data='', expire_date=agora + timedelta(days=1))
+        saida = StringIO()
+        call_command('limpar_sessoes', lote=1, stdout=saida)
+        self.assertIn('2 sessão(ões)', saida.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['c' * 32])
+
+
+class BenchmarkAdmissoesTests(CacheIsoladaTestCase):
+    """O benchmark das admissões corre do princípio ao fim, sem limites de pedidos nem caches partilhadas"""
+
+    def test_benchmark_com_poucos_dados(self):
+        # Mais pedidos do que o limite de inscricao_buscar (30/m); o PDF fica de fora por ser lento
+        cenarios = ['inscricao_create', 'inscricao_create_pico', 'inscricao_buscar', 'inscricao_consulta']
+        saida = StringIO()
+        call_command('benchmark_admissoes', inscricoes=40, cursos=2, escolas=3, pedidos=35,
+                     cenarios=cenarios, stdout=saida)
+        for cenario in cenarios:
+            self.assertIn(cenario, saida.getvalue())
+
+    def test_nao_escreve_nas_caches_do_projeto(self):
+        cache.set('sentinela', 1)
+        call_command('benchmark_admissoes', inscricoes=10, cursos=1, escolas=1, pedidos=3,
+                     cenarios=['inscricao_create', 'inscricao_consulta'], stdout=StringIO())
+        self.assertEqual(cache.get('sentinela'), 1)
+        self.assertIsNone(cache.get('versao:academico'))
+        self.assertEqual(len(caches['sessoes']._cache), 0)
+
+
+class DuplicadosTests(CacheIsoladaTestCase):
+    """Deteção de BI/email/telefone repetidos pelas colunas normalizadas, numa só consulta"""
+
+    def setUp(self):
+        super().setUp()
+        self.inscricao = nova_inscricao(novo_curso(), 1, bilhete_identidade='000123456 la-042',
+                                        email=' Ana.Silva@Escola.AO ', telefone='+244 923 000 000')
+
+    def test_normalizacao(self):
+        self.assertEqual((self.inscricao.bilhete_identidade_normalizado, self.inscricao.email_normalizado,
+                          self.inscricao.telefone_normalizado), ('000123456LA042', 'ana.silva@escola.ao', '923000000'))
+        for telefone in ('923000000', '+244923000000', '00244 923 000 000', '244-923-000-000'):
+            self.assertEqual(normalizar_telefone(telefone), '923000000', telefone)
+        # Nove dígitos começados por 244 são um número local, não o indicativo
+        self.assertEqual(normalizar_telefone('244000000'), '244000000')
+
+    def test_variantes_de_escrita_sao_duplicados(self):
+        self.assertEqual(Inscricao.campos_duplicados(bilhete_identidade='000123456LA042'), ['bilhete_identidade'])
+        self.assertEqual(Inscricao.campos_duplicados(email='ana.silva@escola.ao'), ['email'])
+        self.assertEqual(Inscricao.campos_duplicados(telefone='00244923000000'), ['telefone'])
+        self.assertEqual(Inscricao.campos_duplicados(bilhete_identidade='000123456LA042',
+                                                     excluir_pk=self.inscricao.pk), [])
+
+    def test_uma_consulta_para_todos_os_campos(self):
+        nova_inscricao(self.inscricao.curso, 2)
+        with self.assertNumQueries(1):
+            duplicados = Inscricao.campos_duplicados(bilhete_identidade='000123456-LA042', email='ANA.SILVA@escola.ao',
+                                                     telefone='+244 900 000 002')
+        self.assertEqual(duplicados, ['bilhete_identidade', 'email', 'telefone'])
+
+    def test_validacao_indica_todos_os_campos_repetidos(self):
+        erro = validar_inscricao(dados_inscricao(9, bilhete_identidade='000123456LA042', email='ana.silva@escola.ao'))
+        self.assertIn('Bilhete de Identidade', erro)
+        self.assertIn('email', erro)
+        self.assertNotIn('telefone', erro)
+
+
+class ImportacaoInscricoesTests(CacheIsoladaTestCase):
+    """Importação em massa de CSV/XLSX: relatório por linha, sem erros 500"""
+
+    CABECALHO = 'nome_completo;data_nascimento;bilhete_identidade;sexo;endereco;telefone;email;ano_conclusao;curso\n'
+
+    def setUp(self):
+        super().setUp()
+        self.curso = novo_curso()
+
+    def linha(self, i, **campos):
+        dados = {**dados_inscricao(i, data_nascimento='01/01/2005'), 'curso': 'C1', **campos}
+        return ';'.join(dados[c] for c in self.CABECALHO.strip().split(';')) + '\n'
+
+    def importar(self, conteudo, nome='inscricoes.csv'):
+        from .importacao import importar_inscricoes
+        with self.captureOnCommitCallbacks(execute=True):
+            return importar_inscricoes(BytesIO(conteudo), nome)
+
+    def test_importa_e_reporta_repetidas_e_existentes(self):
+        nova_inscricao(self.curso, 9)
+        conteudo = (self.CABECALHO + self.linha(1) + self.linha(2, email='Candidato1@escola.ao')
+                    + self.linha(3, bilhete_identidade='000000009la001') + self.linha(4, curso='X9'))
+        relatorio = self.importar(conteudo.encode('utf-8-sig'))
+        self.assertEqual((relatorio.total, relatorio.importadas, relatorio.rejeitadas), (4, 1, 3))
+        self.assertEqual([linha for linha, _ in relatorio.erros], [3, 4, 5])
+        self.assertIn('repetido no ficheiro', relatorio.erros[0][1])
+        self.assertIn('Bilhete de Identidade', relatorio.erros[1][1])
+        inscricao = Inscricao.objects.get(email='candidato1@escola.ao')
+        self.assertEqual((inscricao.curso, inscricao.data_nascimento), (self.curso, date(2005, 1, 1)))
+
+    def test_codificacao_invalida_para_na_linha_e_grava_as_anteriores(self):
+        conteudo = (self.CABECALHO + self.linha(1) + self.linha(2)).encode() + self.linha(3, endereco='Lu\xe1nda').encode('latin-1') + self.linha(4).encode()
+        relatorio = self.importar(conteudo)
+        self.assertEqual((relatorio.total, relatorio.importadas), (3, 2))
+        self.assertEqual(relatorio.erros[0][0], 4)
+        self.assertIn('UTF-8', relatorio.erros[0][1])
+        self.assertEqual(Inscricao.objects.count(), 2)
+
+    def test_campos_acima_do_tamanho_maximo_sao_rejeitados(self):
+        relatorio = self.importar((self.CABECALHO + self.linha(1, telefone='9' * 21) + self.linha(2)).encode())
+        self.assertEqual(relatorio.importadas, 1)
+        self.assertEqual(relatorio.erros, [(2, '"telefone" tem 21 caracteres (máximo 20).')])
+        self.assertFalse(Inscricao.objects.filter(email='candidato1@escola.ao').exists())
+
+    def test_xlsx_sem_openpyxl_indica_que_esta_indisponivel(self):
+        with mock.patch.dict('sys.modules', {'openpyxl': None}):
+            with self.assertRaisesMessage(ValueError, 'XLSX indisponível'):
+                self.importar(b'', 'inscricoes.xlsx')
+
+    def test_pagina_de_importacao_mostra_o_relatorio(self):
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.ao', 'senha'))
+        ficheiro = SimpleUploadedFile('inscricoes.csv', self.CABECALHO.encode() + b'\xff\xfe;\n')
+        resposta = self.client.post('/admin/core/inscricao/importar/', {'ficheiro': ficheiro})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['relatorio'].erros[0][0], 2)
+        ficheiro = SimpleUploadedFile('inscricoes.xlsx', b'')
+        with mock.patch.dict('sys.modules', {'openpyxl': None}):
+            resposta = self.client.post('/admin/core/inscricao/importar/', {'ficheiro': ficheiro})
+        self.assertContains(resposta, 'XLSX indisponível')
+
+
+class LancamentoNotasTests(CacheIsoladaTestCase):
+    """Lançamento de notas em massa (bulk_update, sem sinais) e contadores do painel"""
+
+    def setUp(self):
+        super().setUp()
+        self.curso = novo_curso(vagas=1)
+        self.inscricoes = [nova_inscricao(self.curso, i) for i in range(3)]
+
+    def test_contadores_mudam_sem_novas_aprovacoes(self):
+        self.assertEqual(contadores_inscricoes()['aguardando_nota'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio = lancar_notas([(1, self.inscricoes[0].numero_inscricao, '5'),
+                                      (2, self.inscricoes[1].numero_inscricao, '7,5')])
+        self.assertEqual(relatorio.aprovacoes, {'aprovados': 0, 'retirados': 0})
+        contadores = contadores_inscricoes()
+        self.assertEqual((contadores['aguardando_nota'], contadores['total_reprovados']), (1, 2))
+
+    def test_grelha_colada(self):
+        texto = 'Inscrição\tNota\nINS-000001\t14,5\n\nINS-000002; 12\nINS-000003 9.25\nINS-000004 sem nota\n'
+        self.assertEqual(list(ler_grelha(texto)), [
+            (2, 'INS-000001', '14,5'), (4, 'INS-000002', '12'), (5, 'INS-000003', '9.25'), (6, 'INS-000004', None),
+        ])
+
+    def test_primeira_linha_so_e_cabecalho_com_texto_na_nota(self):
+        self.assertEqual(list(ler_grelha('numero;nota\nINS-000001;10')), [(2, 'INS-000001', '10')])
+        self.assertEqual(list(ler_grelha('123,-4\nINS-000001;10')), [(1, '123', None), (2, 'INS-000001', '10')])
+        self.assertEqual(list(ler_grelha('INS-000001\nINS-000002 12')), [(1, 'INS-000001', None), (2, 'INS-000002', '12')])
+        relatorio = lancar_notas(ler_grelha(f'{self.inscricoes[0].numero_inscricao} -4'))
+        self.assertEqual((relatorio.total, relatorio.lancadas, relatorio.rejeitadas), (1, 0, 1))
+
+    def test_erros_por_linha_e_so_grava_notas_alteradas(self):
+        numeros = [i.numero_inscricao for i in self.inscricoes]
+        Inscricao.objects.filter(pk=self.inscricoes[2].pk).update(nota_teste=Decimal('9.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            relatorio = lancar_notas([
+                (1, numeros[0], '15'), (2, numeros[1], '25'), (3, numeros[0], '11'), (4, 'INS-999999', '10'),
+                (5, '', '10'), (6, numeros[2], '9'), (7, numeros[1], '12,5'),
+            ], tamanho_lote=1)
+        self.assertEqual((relatorio.total, relatorio.lancadas, relatorio.alteradas), (7, 3, 2))
+        self.assertEqual([linha for linha, _ in relatorio.erros], [2, 3, 4, 5])
+        self.assertEqual(relatorio.aprovacoes, {'aprovados': 1, 'retirados': 0})
+        notas = dict(Inscricao.objects.values_list('numero_inscricao', 'nota_teste'))
+        self.assertEqual([notas[n] for n in numeros], [Decimal('15'), Decimal('12.5'), Decimal('9')])
+        self.assertEqual(set(Inscricao.objects.filter(aprovado=True).values_list('id', flat=True)),
+                         aprovados_esperados(self.curso))
+
+    def test_grelha_repetida_nao_escreve(self):
+        linhas = [(1, self.inscricoes[0].numero_inscricao, '15')]
+        lancar_notas(linhas)
+        with CaptureQueriesContext(connection) as consultas:
+            relatorio = lancar_notas(linhas)
+        self.assertEqual(relatorio.alteradas, 0)
+        self.assertFalse([q for q in consultas if q['sql'].startswith('UPDATE')])
+
+
+class ListagemCursosTests(CacheIsoladaTestCase):
+    """A listagem de cursos e o changelist do admin não fazem consultas por curso"""
+
+    def setUp(self):
+        super().setUp()
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.ao', 'senha'))
+
+    def novos_cursos(self, inicio, fim):
+        for i in range(inicio, fim):
+            curso = novo_curso(f'C{i}', vagas=1)
+            nova_inscricao(curso, 2 * i, 15)
+            nova_inscricao(curso, 2 * i + 1, 9)
+
+    def consultas(self, url):
+        # O primeiro pedido aquece as caches (licença, contexto académico)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(consultas)
+
+    def assert_consultas_constantes(self, url):
+        self.novos_cursos(0, 2)
+        poucos = self.consultas(url)
+        self.novos_cursos(2, 8)
+        self.client.get(url)
+        with self.assertNumQueries(poucos):
+            resposta = self.client.get(url)
+        self.assertContains(resposta, 'Curso C7')
+
+    def test_listagem_de_cursos(self):
+        self.assert_consultas_constantes('/cursos/')
+
+    def test_changelist_do_admin(self):
+        self.assert_consultas_constantes('/admin/core/curso/')
+
+    def test_totais_vem_das_anotacoes(self):
+        self.novos_cursos(0, 3)
+        curso = Curso.objects.com_estatisticas().get(codigo='C1')
+        with self.assertNumQueries(0):
+            self.assertEqual((curso.total_inscricoes(), curso.total_aprovados(), curso.vagas_disponiveis()), (2, 1, 0))
+        resposta = self.client.get('/admin/core/curso/')
+        self.assertEqual([c.num_inscricoes for c in resposta.context['cl'].result_list], [2, 2, 2])
+
+
+class ClassificacaoIncrementalTests(CacheIsoladaTestCase):
+    """A posição de corte de cada curso é mantida a cada nota gravada"""
+
+    def test_total_aprovados_vem_da_consulta_do_corte(self):
+        curso = novo_curso(vagas=3)
+        for i, nota in enumerate([15, 12, 8]):
+            nova_inscricao(curso, i, nota)
+        classificacao = ClassificacaoCurso.objects.get(curso=curso)
+        self.assertEqual((classificacao.total_aprovados, classificacao.nota_corte), (2, Decimal('12')))
+        for i, nota in enumerate([18, 11], start=3):
+            nova_inscricao(curso, i, nota)
+        classificacao.refresh_from_db()
+        self.assertEqual((classificacao.total_aprovados, classificacao.nota_corte), (3, Decimal('12')))
+        self.assertEqual(Inscricao.objects.filter(curso=curso, aprovado=True).count(), 3)
+
+    def test_apagar_cursos_em_massa_nao_recria_agregados(self):
+        ano = AnoAcademico.objects.create(ano_inicio=2024, ano_fim=2025, ativo=True)
+        cursos = [novo_curso('A', vagas=1), novo_curso('B', vagas=1)]
+        for i, curso in enumerate(cursos):
+            nova_inscricao(curso, i, 15, ano_academico=ano)
+        Curso.objects.filter(pk__in=[c.pk for c in cursos]).delete()
+        self.assertFalse(ClassificacaoCurso.objects.exists())
+        self.assertFalse(EstatisticaAnoCurso.objects.exists())
+        self.assertFalse(InscricoesPorDia.objects.exists())
+        connection.check_constraints()
+
+    def test_posicao_segue_as_regras_da_classificacao(self):
+        curso = novo_curso(vagas=2, nota_minima='10.00')
+        inscricoes = [nova_inscricao(curso, i, nota) for i, nota in enumerate([16, 9, 14, 14, None, 18])]
+        Inscricao.objects.filter(pk=inscricoes[5].pk).update(habilitado=False)
+        posicoes = [Inscricao.objects.get(pk=i.pk).posicao_classificacao() for i in inscricoes]
+        self.assertEqual(posicoes, [1, None, 2, 3, None, None])
+        aprovados = {i.pk for i, posicao in zip(inscricoes, posicoes) if posicao and posicao <= curso.vagas}
+        self.assertEqual(aprovados, aprovados_esperados(curso))
+
+    def test_alteracoes_aleatorias_coincidem_com_a_forca_bruta(self):
+        aleatorio = random.Random(2024)
+        cursos = [novo_curso('A', vagas=3), novo_curso('B', vagas=2, nota_minima='12.00')]
+
+        def nota():
+            return None if aleatorio.random() < 0.15 else Decimal(aleatorio.randint(0, 40)) / 2
+
+        for passo in range(300):
+            inscricoes = list(Inscricao.objects.all())
+            operacao = aleatorio.choice(['nova', 'nova', 'nota', 'nota', 'curso', 'apagar', 'criterios'])
+            if operacao == 'nova' or not inscricoes:
+                nova_inscricao(aleatorio.choice(cursos), passo, nota())
+            elif operacao == 'nota':
+                inscricao = aleatorio.choice(inscricoes)
+                inscricao.nota_teste = nota()
+                inscricao.save()
+            elif operacao == 'curso':
+                inscricao = aleatorio.choice(inscricoes)
+                inscricao.curso = aleatorio.choice(cursos)
+                inscricao.save()
+            elif operacao == 'apagar':
+                aleatorio.choice(inscricoes).delete()
+            else:
+                curso = Curso.objects.get(pk=aleatorio.choice(cursos).pk)
+                curso.vagas = aleatorio.randint(0, 5)
+                curso.nota_minima = Decimal(aleatorio.randint(16, 28)) / 2
+                curso.save()
+            for curso in cursos:
+                esperados = aprovados_esperados(curso)
+                with self.subTest(passo=passo, operacao=operacao, curso=curso.codigo):
+                    self.assertEqual(set(Inscricao.objects.filter(curso=curso, aprovado=True).values_list('id', flat=True)), esperados)
+                    classificacao = ClassificacaoCurso.objects.filter(curso=curso).first()
+                    self.assertEqual(classificacao.total_aprovados if classificacao else 0, len(esperados))
+
+
+class EstatisticasTests(CacheIsoladaTestCase):
+    """Estatísticas pré-agregadas: marcadas só quando os totais mudam, recalculadas pelo comando, lidas pelo dashboard"""
+
+    def setUp(self):
+        super().setUp()
+        self.ano = AnoAcademico.objects.create(ano_inicio=2024, ano_fim=2025, ativo=True)
+        self.curso = novo_curso()
+
+    def test_dashboard_nao_recalcula(self):
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.ao', 'senha'))
+        nova_inscricao(self.curso, 1, 12)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get('/dashboard/')
+        self.assertContains(resposta, 'Em atualização')
+        escritas = [q['sql'] for q in consultas if 'estatistica' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(escritas, [])
+        call_command('atualizar_estatisticas', stdout=StringIO())
+        estatistica = EstatisticaAnoCurso.objects.get(ano_academico=self.ano, curso=self.curso)
+        self.assertEqual((estatistica.desatualizado, estatistica.total_inscricoes, estatistica.total_aprovados), (False, 1, 1))
+        self.assertNotContains(self.client.get('/dashboard/'), 'Em atualização')
+
+    def test_migracao_preenche_ano_pela_data_de_inscricao(self):
+        preencher = import_module('core.migrations.0032_preencher_inscricao_ano_academico').preencher_ano_academico
+        seguinte = AnoAcademico.objects.create(ano_inicio=2025, ano_fim=2026)
+        Semestre.objects.create(ano_academico=self.ano, nome='1', data_inicio=date(2024, 9, 1), data_fim=date(2025, 1, 31))
+        datas = [datetime(2024, 10, 1, 12), datetime(2025, 1, 20, 12), datetime(2025, 6, 1, 12), datetime(2023, 6, 1, 12)]
+        inscricoes = [nova_inscricao(self.curso, i) for i in range(len(datas))]
+        for inscricao, data in zip(inscricoes, datas):
+            Inscricao.objects.filter(pk=inscricao.pk).update(ano_academico=None, data_inscricao=timezone.make_aware(data))
+        preencher(django_apps, None)
+        self.assertEqual(
+            [i.ano_academico_id for i in Inscricao.objects.filter(pk__in=[i.pk for i in inscricoes]).order_by('pk')],
+            [self.ano.pk, self.ano.pk, seguinte.pk, None],
+        )
+
+    def test_gravar_campos_fora_dos_totais_nao_marca(self):
+        inscricao = nova_inscricao(self.curso, 1)
+        call_command('atualizar_estatisticas', stdout=StringIO())
+        inscricao = Inscricao.objects.get(pk=inscricao.pk)
+        versao_antes = versao('inscricoes')
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            inscricao.endereco = 'Benguela'
+            inscricao.save()
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(versao('inscricoes'), versao_antes)
+        with self.captureOnCommitCallbacks(execute=True):
+            inscricao.nota_teste = Decimal('14')
+            inscricao.save()
+        self.assertNotEqual(versao('inscricoes'), versao_antes)
+        self.assertTrue(EstatisticaAnoCurso.objects.get(ano_academico=self.ano, curso=self.curso).desatualizado)
+
+    def test_criar_inscricao_desfaz_agregados_com_a_inscricao(self):
+        with mock.patch('core.inscricoes.HistoricoAcademico.objects.get_or_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                criar_inscricao(novo_curso('C2', requer_prerequisitos=True), dados_inscricao(1))
+        self.assertFalse(Inscricao.objects.exists())
+        self.assertFalse(InscricoesPorDia.objects.exists())
+        self.assertFalse(EstatisticaAnoCurso.objects.exists())
+
+
+class AprovacoesTests(CacheIsoladaTestCase):
+    """inscricoes_aprovadas() classifica todos os cursos de uma vez (ROW_NUMBER por curso)"""
+
+    def setUp(self):
+        super().setUp()
+        self.a = novo_curso('A', vagas=2)
+        self.b = novo_curso('B', vagas=3, nota_minima='12.00')
+        notas_a = [15, 18, 15, 9, None, 19]
+        self.inscricoes_a = [nova_inscricao(self.a, i, nota) for i, nota in enumerate(notas_a)]
+        Inscricao.objects.filter(pk=self.inscricoes_a[-1].pk).update(habilitado=False)
+        notas_b = [12, '11.99', 20, 13]
+        self.inscricoes_b = [nova_inscricao(self.b, 10 + i, nota) for i, nota in enumerate(notas_b)]
+
+    def test_vagas_empates_minimo_e_habilitacao(self):
+        with self.assertNumQueries(1):
+            aprovados = set(inscricoes_aprovadas([self.a, self.b]).values_list('id', flat=True))
+        # A: 18 e o primeiro dos 15 (empate pelo id); o 19 não está habilitado
+        self.assertEqual(aprovados & {i.pk for i in self.inscricoes_a},
+                         {self.inscricoes_a[1].pk, self.inscricoes_a[0].pk})
+        # B: menos elegíveis (>= 12) do que vagas, todos entram
+        self.assertEqual(aprovados & {i.pk for i in self.inscricoes_b},
+                         {self.inscricoes_b[0].pk, self.inscricoes_b[2].pk, self.inscricoes_b[3].pk})
+        self.assertEqual(aprovados, aprovados_esperados(self.a) | aprovados_esperados(self.b))
+
+    def test_processar_aprovacoes_so_escreve_mudancas(self):
+        Inscricao.objects.update(aprovado=True)
+        resultado = processar_aprovacoes([self.a.pk, self.b.pk])
+        self.assertEqual(resultado, {'aprovados': 0, 'retirados': 5})
+        aprovados = set(Inscricao.objects.filter(aprovado=True).values_list('id', flat=True))
+        self.assertEqual(aprovados, aprovados_esperados(self.a) | aprovados_esperados(self.b))
+        self.assertEqual(processar_aprovacoes([self.a.pk, self.b.pk]), {'aprovados': 0, 'retirados': 0})
+        self.assertEqual(ClassificacaoCurso.objects.get(curso=self.a).total_aprovados, 2)
+
+
+class SequenciasTests(CacheIsoladaTestCase):
+    """Números sequenciais: reservados de forma atómica, sem repetições"""
+
+    def test_reservar_numeros_consecutivos(self):
+        self.assertEqual(sequencias.reservar_numeros('INS', 3), ['INS-000001', 'INS-000002', 'INS-000003'])
+        self.assertEqual(sequencias.reservar_numeros('INS', 2), ['INS-000004', 'INS-000005'])
+        self.assertEqual(sequencias.reservar_numeros('INS', 0), [])
+
+    def test_continua_a_partir_dos_numeros_existentes(self):
+        nova_inscricao(novo_curso(), 1, numero_inscricao='INS-000041')
+        Sequencia.objects.all().delete()
+        self.assertEqual(sequencias.reservar_numeros('INS', 1), ['INS-000042'])
+
+    @override_settings(SEQUENCIA_TAMANHO_BLOCO=10)
+    def test_sem_bloco_dentro_de_transacoes(self):
+        # Um rollback devolveria o bloco ao contador: dentro de uma transação reserva-se um número de cada vez
+        self.assertEqual([sequencias.proximo_numero('INS') for _ in range(3)], ['INS-000001', 'INS-000002', 'INS-000003'])
+        self.assertEqual(sequencias._blocos, {})
+
+
+@override_settings(SEQUENCIA_TAMANHO_BLOCO=10)
+class SequenciasBlocosTests(CacheIsoladaTransactionTestCase):
+    """Fora de transações cada processo consome um bloco de números reservado com uma só escrita"""
+
+    def setUp(self):
+        super().setUp()
+        sequencias._blocos.clear()
+        self.addCleanup(sequencias._blocos.clear)
+
+    def test_uma_escrita_por_bloco(self):
+        Sequencia.objects.create(prefixo='INS')
+        with CaptureQueriesContext(connection) as consultas:
+            numeros = [sequencias.proximo_numero('INS') for _ in range(25)]
+        self.assertEqual(numeros, [sequencias.formatar_numero('INS', n) for n in range(1, 26)])
+        self.assertEqual(len([q for q in consultas if q['sql'].startswith('UPDATE')]), 3)
+        # Os números que sobram do bloco ficam por usar (lacunas), nunca são repetidos
+        self.assertEqual(Sequencia.objects.get(prefixo='INS').ultimo_valor, 30)
+
+    def test_processos_recebem_blocos_disjuntos(self):
+        numeros = []
+        for _ in range(3):
+            numeros += [sequencias.proximo_numero('INS') for _ in range(4)]
+            # Outro processo: começa sem bloco e reserva o seguinte no contador partilhado
+            sequencias._blocos.clear()
+        self.assertEqual(len(set(numeros)), 12)
+        self.assertEqual(numeros[4], 'INS-000011')
+
+    def test_threads_partilham_o_bloco_sem_repetir(self):
+        with override_settings(SEQUENCIA_TAMANHO_BLOCO=1000):
+            sequencias.proximo_numero('INS')
+            numeros = []
+
+            def consumir():
+                numeros.extend(sequencias.proximo_numero('INS') for _ in range(100))
+
+            threads = [threading.Thread(target=consumir) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(numeros), [sequencias.formatar_numero('INS', n) for n in range(2, 802)])
+
+    def test_criar_inscricao_usa_o_bloco(self):
+        curso = novo_curso()
+        criar_inscricao(curso, dados_inscricao(1))
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = criar_inscricao(curso, dados_inscricao(2))
+        self.assertEqual(segunda.numero_inscricao, 'INS-000002')
+        self.assertFalse([q for q in consultas if 'core_sequencia' in q['sql']])
+
+
+class FilaInscricoesTests(CacheIsoladaTestCase):
+    """Modo de pico: as submissões ficam em fila e são gravadas em lotes por processar_fila()"""
+
+    def setUp(self):
+        super().setUp()
+        self.curso = novo_curso()
+
+    def test_mesmo_bi_pendente_devolve_o_mesmo_recibo(self):
+        primeira = enfileirar_inscricao(self.curso, dados_inscricao(1))
+        segunda = enfileirar_inscricao(self.curso, dados_inscricao(1, bilhete_identidade=' 000000001la001 '))
+        self.assertEqual(segunda.recibo, primeira.recibo)
+        self.assertEqual(InscricaoPendente.objects.count(), 1)
+        self.assertNotEqual(enfileirar_inscricao(novo_curso('C2'), dados_inscricao(1)).recibo, primeira.recibo)
+
+    def test_processa_em_lotes_e_rejeita_so_as_invalidas(self):
+        nova_inscricao(self.curso, 3)
+        pendentes = [enfileirar_inscricao(self.curso, dados_inscricao(i)) for i in range(1, 6)]
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = processar_fila(tamanho_lote=2)
+        self.assertEqual(resultado, {'processadas': 4, 'rejeitadas': 1})
+        rejeitada = InscricaoPendente.objects.get(pk=pendentes[2].pk)
+        self.assertEqual((rejeitada.estado, rejeitada.inscricao), ('rejeitada', None))
+        self.assertIn('Bilhete de Identidade', rejeitada.motivo_rejeicao)
+        processadas = InscricaoPendente.objects.filter(estado='processada').select_related('inscricao')
+        self.assertEqual(sorted(p.inscricao.bilhete_identidade for p in processadas),
+                         [dados_inscricao(i)['bilhete_identidade'] for i in (1, 2, 4, 5)])
+        self.assertEqual(contadores_inscricoes()['total_inscricoes'], 5)
+        self.assertEqual(processar_fila(), {'processadas': 0, 'rejeitadas': 0})
+
+    def test_segundo_processador_nao_reclama_o_lote_em_curso(self):
+        pendentes = [enfileirar_inscricao(self.curso, dados_inscricao(i)) for i in range(1, 5)]
+        criar = criar_inscricao
+        segundo = []
+
+        def criar_e_arrancar_outro(curso, dados):
+            # A meio do primeiro lote arranca outro processador (ex.: o cron durante um processamento manual)
+            if not segundo:
+                segundo.append(None)
+                segundo[0] = processar_fila(tamanho_lote=2)
+            return criar(curso, dados)
+
+        with mock.patch('core.inscricoes.criar_inscricao', side_effect=criar_e_arrancar_outro):
+            primeiro = processar_fila(tamanho_lote=2)
+        self.assertEqual((primeiro, segundo[0]), ({'processadas': 2, 'rejeitadas': 0}, {'processadas': 2, 'rejeitadas': 0}))
+        self.assertEqual(set(InscricaoPendente.objects.values_list('estado', flat=True)), {'processada'})
+        self.assertEqual(Inscricao.objects.count(), 4)
+        self.assertEqual(InscricaoPendente.objects.get(pk=pendentes[0].pk).inscricao.bilhete_identidade,
+                         dados_inscricao(1)['bilhete_identidade'])
+
+    def test_curso_desativado_rejeita(self):
+        enfileirar_inscricao(self.curso, dados_inscricao(1))
+        Curso.objects.filter(pk=self.curso.pk).update(ativo=False)
+        self.assertEqual(processar_fila(), {'processadas': 0, 'rejeitadas': 1})
+        self.assertFalse(Inscricao.objects.exists())
+
+
+class SerieDiariaTests(CacheIsoladaTestCase):
+    """Contagens diárias por curso/turno mantidas pelos sinais e lidas por serie_diaria()"""
+
+    def setUp(self):
+        super().setUp()
+        self.a = novo_curso('A')
+        self.b = novo_curso('B')
+
+    def linhas(self):
+        return {(l.data, l.curso_id, l.turno): l.total for l in InscricoesPorDia.objects.exclude(total=0)}
+
+    def test_sinais_coincidem_com_a_reconstrucao(self):
+        inscricoes = [nova_inscricao(self.a, 1), nova_inscricao(self.a, 2), nova_inscricao(self.b, 3, turno_preferencial='T')]
+        # 23:30 UTC já é o dia seguinte em Luanda
+        Inscricao.objects.filter(pk=inscricoes[1].pk).update(
+            data_inscricao=datetime(2025, 3, 1, 23, 30, tzinfo=dt_timezone.utc))
+        Inscricao.objects.filter(pk=inscricoes[2].pk).update(
+            data_inscricao=datetime(2025, 3, 1, 12, 0, tzinfo=dt_timezone.utc))
+        reconstruir_series()
+        self.assertEqual(self.linhas()[(date(2025, 3, 2), self.a.pk, 'M')], 1)
+
+        segunda = Inscricao.objects.get(pk=inscricoes[1].pk)
+        segunda.curso = self.b
+        segunda.save()
+        segunda.turno_preferencial = 'N'
+        segunda.save()
+        with CaptureQueriesContext(connection) as consultas:
+            segunda.endereco = 'Huambo'
+            segunda.save()
+        self.assertFalse([q for q in consultas if 'inscricoespordia' in q['sql']])
+        Inscricao.objects.get(pk=inscricoes[2].pk).delete()
+        nova_inscricao(self.a, 4)
+
+        incrementais = self.linhas()
+        reconstruir_series()
+        self.assertEqual(incrementais, self.linhas())
+        self.assertEqual(incrementais[(date(2025, 3, 2), self.b.pk, 'N')], 1)
+        self.assertNotIn((date(2025, 3, 1), self.b.pk, 'T'), incrementais)
+
+    def test_dias_sem_inscricoes_e_filtro_por_curso(self):
+        InscricoesPorDia.objects.bulk_create([
+            InscricoesPorDia(data=date(2025, 3, 1), curso=self.a, turno='M', total=4),
+            InscricoesPorDia(data=date(2025, 3, 1), curso=self.a, turno='T', total=1),
+            InscricoesPorDia(data=date(2025, 3, 3), curso=self.b, turno='M', total=2),
+            InscricoesPorDia(data=date(2025, 3, 9), curso=self.a, turno='M', total=7),
+        ])
+        with self.assertNumQueries(2):
+            serie = serie_diaria(date(2025, 3, 1), date(2025, 3, 4))
+        self.assertEqual([dia['total'] for dia in serie['dias']], [5, 0, 2, 0])
+        self.assertEqual(serie['dias'][0]['por_turno'], {'M': 4, 'T': 1})
+        self.assertEqual((serie['total'], set(serie['cursos'])), (7, {self.a.pk, self.b.pk}))
+        apenas_a = serie_diaria(date(2025, 3, 1), date(2025, 3, 4), [self.a.pk])
+        self.assertEqual([dia['total'] for dia in apenas_a['dias']], [5, 0, 0, 0])
+
+    def test_api(self):
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        url = '/admissao/estatisticas/diarias/'
+        self.client.force_login(User.objects.create_user('secretaria', 'secretaria@escola.ao', 'senha'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.ao', 'senha'))
+        resposta = self.client.get(url, {'inicio': '2025-03-01', 'fim': '2025-03-07', 'curso': self.a.pk})
+        self.assertEqual(len(resposta.json()['dias']), 7)
+        self.assertEqual(self.client.get(url, {'inicio': '2025-03-08', 'fim': '2025-03-07'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'inicio': '2020-01-01', 'fim': '2025-03-07'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'curso': 'x'}).status_code, 400)
+        # Nos limites do calendário o intervalo é cortado, sem OverflowError
+        resposta = self.client.get(url, {'fim': '0001-01-03'})
+        self.assertEqual([dia['data'] for dia in resposta.json()['dias']], ['0001-01-01', '0001-01-02', '0001-01-03'])
+        resposta = self.client.get(url, {'inicio': '9999-12-30', 'fim': '9999-12-31'})
+        self.assertEqual(len(resposta.json()['dias']), 2)
+
+
+class ElegibilidadeTests(CacheIsoladaTestCase):
+    """Veredictos dos pré-requisitos (Inscricao.habilitado) calculados por coorte e mantidos pelo admin"""
+
+    def setUp(self):
+        super().setUp()
+        self.curso = novo_curso(vagas=5, requer_prerequisitos=True)
+        self.disciplinas = [Disciplina.objects.create(curso=self.curso, nome=f'Disciplina {j}') for j in range(3)]
+        self.prerequisitos = [
+            PrerequisitoDisciplina.objects.create(curso=self.curso, disciplina_prerequisito=disciplina,
+                                                  nota_minima_prerequisito=Decimal(minima), obrigatorio=obrigatorio)
+            for disciplina, minima, obrigatorio in zip(self.disciplinas, ['10', '12', '10'], [True, True, False])
+        ]
+
+    def candidato(self, i, *notas, nota_teste=15):
+        """Inscrição com as notas dadas nas disciplinas (None = sem nota; sem notas = sem histórico)"""
+        inscricao = nova_inscricao(self.curso, i, nota_teste)
+        if notas:
+            historico = HistoricoAcademico.objects.create(inscricao=inscricao)
+            for disciplina, nota in zip(self.disciplinas, notas):
+                if nota is not None:
+                    NotaDisciplina.objects.create(historico=historico, disciplina=disciplina,
+                                                  nota=Decimal(str(nota)), ano_conclusao=2023)
+        return inscricao
+
+    def veredictos(self):
+        return dict(Inscricao.objects.values_list('id', 'habilitado'))
+
+    def test_veredictos_da_coorte(self):
+        candidatos = [
+            self.candidato(1, 14, 12, 8),     # tudo cumprido; o opcional abaixo do mínimo não conta
+            self.candidato(2, 9, 15, 18),     # obrigatório abaixo do mínimo
+            self.candidato(3, 15, None, 15),  # obrigatório sem nota
+            self.candidato(4, 10, 12),        # opcional sem nota
+            self.candidato(5),                # sem histórico
+            self.candidato(6, 0, 12),         # nota zero: inabilitado, mas entra na média
+        ]
+        self.assertEqual(avaliar_curso(self.curso), 6)
+        inscricoes = {i.pk: i for i in Inscricao.objects.all()}
+        self.assertEqual([inscricoes[c.pk].habilitado for c in candidatos], [True, False, False, True, False, False])
+        self.assertEqual([inscricoes[c.pk].media_prerequisitos for c in candidatos],
+                         [Decimal('11.33'), Decimal('14.00'), Decimal('15.00'), Decimal('11.00'), None, Decimal('6.00')])
+        # Só os habilitados entram na classificação, mesmo com todas as notas do teste iguais
+        self.assertEqual(set(Inscricao.objects.filter(aprovado=True).values_list('id', flat=True)),
+                         {candidatos[0].pk, candidatos[3].pk})
+        self.assertEqual(avaliar_curso(self.curso), 0)
+
+    def test_consultas_nao_dependem_da_coorte(self):
+        def consultas(quantidade, inicio):
+            for i in range(inicio, inicio + quantidade):
+                self.candidato(i, 14, 14, 14, nota_teste=None)
+            avaliar_curso(self.curso)
+            Inscricao.objects.update(habilitado=None, media_prerequisitos=None)
+            with CaptureQueriesContext(connection) as alteracao:
+                avaliar_curso(self.curso)
+            with CaptureQueriesContext(connection) as sem_alteracao:
+                avaliar_curso(self.curso)
+            return len(alteracao), len(sem_alteracao)
+
+        poucos = consultas(3, 0)
+        Inscricao.objects.all().delete()
+        muitos = consultas(40, 100)
+        self.assertEqual(poucos, muitos)
+        # Pré-requisitos, notas e inscrições: três leituras e nenhuma escrita
+        self.assertEqual(muitos[1], 3)
+
+    def test_admin_reavalia_ao_alterar_prerequisitos_e_notas(self):
+        Subscricao.objects.create(nome_escola='Escola Teste', data_inicio=date(2024, 9, 1),
+                                  data_expiracao=date(2099, 1, 1))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.ao', 'senha'))
+        primeiro, segundo = self.candidato(1, 14, 12), self.candidato(2, 11, 12)
+        avaliar_curso(self.curso)
+        self.assertEqual(self.veredictos(), {primeiro.pk: True, segundo.pk: True})
+
+        prerequisito = self.prerequisitos[0]
+        resposta = self.client.post(f'/admin/core/prerequisitodisciplina/{prerequisito.pk}/change/', {
+            'curso': self.curso.pk, 'disciplina_prerequisito': self.disciplinas[0].pk,
+            'nota_minima_prerequisito': '12', 'obrigatorio': 'on', 'ordem': 0,
+        })
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.veredictos(), {primeiro.pk: True, segundo.pk: False})
+
+        nota = NotaDisciplina.objects.get(historico__inscricao=primeiro, disciplina=self.disciplinas[0])
+        resposta = self.client.post(f'/admin/core/notadisciplina/{nota.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.veredictos(), {primeiro.pk: False, segundo.pk: False})
+
+        resposta = self.client.post(f'/admin/core/prerequisitodisciplina/{prerequisito.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(self.veredictos(), {primeiro.pk: True, segundo.pk: True})
@@ -1,8 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+import asyncio
 from django.utils import timezone
-from .models import Curso, Inscricao, ConfiguracaoEscola, Escola, AnoAcademico, Notificacao, PerfilUsuario, Subscricao, PagamentoSubscricao, RecuperacaoSenha, Documento, Semestre
+from .models import Curso, Inscricao, InscricaoPendente, ConfiguracaoEscola, Escola, AnoAcademico, Notificacao, EntregaNotificacao, PerfilUsuario, Subscricao, PagamentoSubscricao, RecuperacaoSenha, Documento, Semestre
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
@@ -16,24 +19,19 @@ from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from io import BytesIO
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from django.conf import settings
 import os
-
-def processar_aprovacoes_curso(curso_id):
-    curso = Curso.objects.get(id=curso_id)
-    inscricoes_com_nota = curso.inscricoes.filter(nota_teste__isnull=False, nota_teste__gte=curso.nota_minima).order_by('-nota_teste')
-    
-    for inscricao in curso.inscricoes.all():
-        inscricao.aprovado = False
-        inscricao.save()
-    
-    vagas_disponiveis = curso.vagas
-    for i, inscricao in enumerate(inscricoes_com_nota):
-        if i < vagas_disponiveis:
-            inscricao.aprovado = True
-            inscricao.data_resultado = timezone.now()
-            inscricao.save()
+from . import academico, eventos
+from .aprovacoes import processar_aprovacoes_curso
+from .contadores import VAZIO as CONTADORES_VAZIOS, contadores_inscricoes, contadores_por_curso
+from .estatisticas import estatisticas_por_ano
+from .executor import executor_senhas, no_executor_senhas
+from .limites import limitar
+from .series import MAXIMO_DIAS, serie_diaria
+from .senhas import MENSAGEM_REUTILIZADA as MENSAGEM_SENHA_REUTILIZADA, registar_impressao, senha_reutilizada
+from .notificacoes import caixa_de_entrada, contador_nao_lidas, marcar_lidas, pagina_caixa
+from .inscricoes import criar_inscricao, dados_formulario, enfileirar_inscricao, validar_inscricao
 
 def index_redirect(request):
     """Redireciona para login se não autenticado, caso contrário para painel principal"""
@@ -43,11 +41,6 @@ def index_redirect(request):
 
 @login_required
 def index(request):
-    ano_atual = AnoAcademico.objects.filter(ativo=True).first()
-    semestre_atual = None
-    if ano_atual:
-        semestre_atual = ano_atual.semestres.filter(ativo=True).first()
-    
     cursos = Curso.objects.filter(ativo=True)
     config = ConfiguracaoEscola.objects.first()
     anos_academicos = AnoAcademico.objects.all()
@@ -56,8 +49,8 @@ def index(request):
         'cursos': cursos,
         'config': config,
         'anos_academicos': anos_academicos,
-        'ano_atual': ano_atual,
-        'semestre_atual': semestre_atual
+        'ano_atual': academico.ano_atual(),
+        'semestre_atual': academico.semestre_atual()
     })
 
 def inscricao_create(request, curso_id):
@@ -78,87 +71,20 @@ def inscricao_create(request, curso_id):
         context['prerequisitos'] = curso.prerequisitos.all()
     
     if request.method == 'POST':
-        # Validar BI único
-        bilhete_identidade = request.POST.get('bilhete_identidade')
-        if bilhete_identidade and Inscricao.objects.filter(bilhete_identidade=bilhete_identidade).exists():
-            messages.error(request, 'Este Bilhete de Identidade já está registrado no sistema!')
-            return render(request, 'core/inscricao_form.html', {'curso': curso})
+        # Campos obrigatórios e BI/email/telefone únicos (uma única consulta às colunas normalizadas)
+        dados = dados_formulario(request.POST)
+        erro = validar_inscricao(dados)
+        if erro:
+            messages.error(request, erro)
+            return render(request, 'core/inscricao_form.html', context)
         
-        # Validar email único em inscrições
-        email = request.POST.get('email')
-        if email and Inscricao.objects.filter(email=email).exists():
-            messages.error(request, 'Este email já está sendo usado em outra inscrição!')
-            return render(request, 'core/inscricao_form.html', {'curso': curso})
+        # Período de pico: só guarda a submissão na fila e devolve o recibo provisório
+        if settings.INSCRICOES_MODO_PICO:
+            pendente = enfileirar_inscricao(curso, dados)
+            messages.success(request, f'Inscrição recebida! Guarde o seu recibo provisório: {pendente.recibo}')
+            return redirect('inscricao_recibo', recibo=pendente.recibo)
         
-        # Validar telefone único em inscrições
-        telefone = request.POST.get('telefone')
-        if telefone and Inscricao.objects.filter(telefone=telefone).exists():
-            messages.error(request, 'Este telefone já está sendo usado em outra inscrição!')
-            return render(request, 'core/inscricao_form.html', {'curso': curso})
-        
-        # Obter escola
-        escola_id = request.POST.get('escola_id')
-        escola = None
-        if escola_id:
-            try:
-                escola = Escola.objects.get(id=escola_id)
-            except Escola.DoesNotExist:
-                pass
-        
-        inscricao = Inscricao(
-            curso=curso,
-            # 1. Informações Pessoais
-            nome_completo=request.POST['nome_completo'],
-            data_nascimento=request.POST['data_nascimento'],
-            local_nascimento=request.POST['local_nascimento'],
-            nacionalidade=request.POST['nacionalidade'],
-            bilhete_identidade=request.POST['bilhete_identidade'],
-            data_validade_bi=request.POST.get('data_validade_bi') or None,
-            sexo=request.POST['sexo'],
-            estado_civil=request.POST.get('estado_civil', 'S'),
-            endereco=request.POST['endereco'],
-            telefone=request.POST['telefone'],
-            email=request.POST['email'],
-            # 2. Informações Académicas
-            escola=escola,
-            ano_conclusao=request.POST['ano_conclusao'],
-            certificados_obtidos=request.POST.get('certificados_obtidos', ''),
-            historico_escolar=request.POST.get('historico_escolar', ''),
-            turno_preferencial=request.POST.get('turno_preferencial', 'M'),
-            # 3. Informações Financeiras
-            numero_comprovante=request.POST.get('numero_comprovante', ''),
-            responsavel_financeiro_nome=request.POST.get('responsavel_financeiro_nome', ''),
-            responsavel_financeiro_telefone=request.POST.get('responsavel_financeiro_telefone', ''),
-            responsavel_financeiro_relacao=request.POST.get('responsavel_financeiro_relacao', ''),
-            # 4. Encarregado de Educação
-            encarregado_nome=request.POST.get('encarregado_nome', ''),
-            encarregado_parentesco=request.POST.get('encarregado_parentesco', ''),
-            encarregado_telefone=request.POST.get('encarregado_telefone', ''),
-            encarregado_email=request.POST.get('encarregado_email', ''),
-            encarregado_profissao=request.POST.get('encarregado_profissao', ''),
-            encarregado_local_trabalho=request.POST.get('encarregado_local_trabalho', ''),
-        )
-        
-        inscricao.save()
-        
-        # Criar histórico académico e salvar notas se curso requer pré-requisitos
-        if curso.requer_prerequisitos:
-            from .models import HistoricoAcademico, NotaDisciplina
-            historico, created = HistoricoAcademico.objects.get_or_create(inscricao=inscricao)
-            
-            for prereq in curso.prerequisitos.all():
-                nota_str = request.POST.get(f'nota_{prereq.disciplina_prerequisito.id}')
-                if nota_str:
-                    try:
-                        nota = float(nota_str)
-                        ano = int(request.POST.get(f'ano_{prereq.disciplina_prerequisito.id}', 2024))
-                        NotaDisciplina.objects.update_or_create(
-                            historico=historico,
-                            disciplina=prereq.disciplina_prerequisito,
-                            defaults={'nota': nota, 'ano_conclusao': ano}
-                        )
-                    except (ValueError, TypeError):
-                        pass
+        inscricao = criar_inscricao(curso, dados)
         
         messages.success(request, f'Inscrição realizada com sucesso! Seu número de inscrição é: {inscricao.numero_inscricao}')
         return redirect('inscricao_consulta', numero=inscricao.numero_inscricao)
@@ -166,9 +92,14 @@ def inscricao_create(request, curso_id):
     return render(request, 'core/inscricao_form.html', context)
 
 def inscricao_consulta(request, numero):
-    inscricao = get_object_or_404(Inscricao, numero_inscricao=numero)
-    return render(request, 'core/inscricao_consulta.html', {'inscricao': inscricao})
+    inscricao = get_object_or_404(Inscricao.objects.select_related('curso__classificacao'), numero_inscricao=numero)
+    return render(request, 'core/inscricao_consulta.html', {
+        'inscricao': inscricao,
+        'posicao': inscricao.posicao_classificacao(),
+        'classificacao': getattr(inscricao.curso, 'classificacao', None),
+    })
 
+@limitar('30/m')
 def inscricao_buscar(request):
     if request.method == 'POST':
         numero = request.POST.get('numero_inscricao', '').strip()
@@ -177,10 +108,23 @@ def inscricao_buscar(request):
                 inscricao = Inscricao.objects.get(numero_inscricao=numero)
                 return redirect('inscricao_consulta', numero=numero)
             except Inscricao.DoesNotExist:
+                # Também aceita o recibo provisório emitido no modo de pico
+                if InscricaoPendente.objects.filter(recibo=numero.upper()).exists():
+                    return redirect('inscricao_recibo', recibo=numero.upper())
                 messages.error(request, 'Número de inscrição não encontrado!')
     
     return render(request, 'core/inscricao_buscar.html')
 
+def inscricao_recibo(request, recibo):
+    """Estado de uma inscrição submetida no modo de pico"""
+    pendente = get_object_or_404(InscricaoPendente.objects.select_related('curso', 'inscricao'), recibo=recibo)
+    if pendente.inscricao:
+        return redirect('inscricao_consulta', numero=pendente.inscricao.numero_inscricao)
+    return render(request, 'core/inscricao_recibo.html', {
+        'pendente': pendente,
+        'na_frente': InscricaoPendente.objects.filter(estado='pendente', id__lt=pendente.id).count() if pendente.estado == 'pendente' else 0,
+    })
+
 def gerar_pdf_confirmacao(request, numero):
     inscricao = get_object_or_404(Inscricao, numero_inscricao=numero)
     config = ConfiguracaoEscola.objects.first()
@@ -270,7 +214,7 @@ def gerar_pdf_confirmacao(request, numero):
 
 @login_required
 def admissao_estudantes(request):
-    cursos = Curso.objects.filter(ativo=True)
+    cursos = Curso.objects.filter(ativo=True).com_estatisticas()
     config = ConfiguracaoEscola.objects.first()
     return render(request, 'core/admissao.html', {
         'cursos': cursos,
@@ -279,7 +223,7 @@ def admissao_estudantes(request):
 
 @login_required
 def admissao_inscricao(request):
-    cursos = Curso.objects.filter(ativo=True)
+    cursos = Curso.objects.filter(ativo=True).com_estatisticas()
     config = ConfiguracaoEscola.objects.first()
     
     if request.method == 'POST':
@@ -294,7 +238,7 @@ def admissao_inscricao(request):
 
 @login_required
 def cursos_lista(request):
-    cursos = Curso.objects.all().order_by('-ativo', 'nome')
+    cursos = Curso.objects.com_estatisticas().order_by('-ativo', 'nome')
     return render(request, 'core/cursos_lista.html', {'cursos': cursos})
 
 @login_required
@@ -376,21 +320,85 @@ def disciplina_create(request):
 
 @login_required
 def dashboard(request):
-    cursos = Curso.objects.all()
-    total_inscricoes = Inscricao.objects.count()
-    total_aprovados = Inscricao.objects.filter(aprovado=True).count()
-    total_reprovados = Inscricao.objects.filter(aprovado=False, nota_teste__isnull=False).count()
-    aguardando_nota = Inscricao.objects.filter(nota_teste__isnull=True).count()
+    cursos = list(Curso.objects.select_related('classificacao'))
+    por_curso = contadores_por_curso()
+    for curso in cursos:
+        curso.contadores = por_curso.get(curso.pk, CONTADORES_VAZIOS)
+        # Usado por vagas_disponiveis(), tal como a anotação de com_estatisticas()
+        curso.vagas_livres = max(0, curso.vagas - curso.contadores['total_aprovados'])
     
     return render(request, 'core/dashboard.html', {
         'cursos': cursos,
-        'total_inscricoes': total_inscricoes,
-        'total_aprovados': total_aprovados,
-        'total_reprovados': total_reprovados,
-        'aguardando_nota': aguardando_nota
+        'anos': estatisticas_por_ano(),
+        **contadores_inscricoes(),
+    })
+
+@login_required
+def lancar_notas_view(request):
+    """Lançamento em massa das notas do teste (grelha colada ou ficheiro CSV/XLSX)"""
+    from .notas import lancar_notas, ler_ficheiro_notas, ler_grelha
+    
+    perfil = getattr(request.user, 'perfil', None)
+    if not request.user.is_staff and not (perfil and perfil.nivel_acesso in ['admin', 'super_admin', 'secretaria', 'secretario_academico', 'daac']):
+        messages.error(request, 'Acesso negado.')
+        return redirect('painel_principal')
+    
+    relatorio = None
+    if request.method == 'POST':
+        ficheiro = request.FILES.get('ficheiro')
+        grelha = request.POST.get('grelha', '')
+        try:
+            if ficheiro:
+                linhas = ler_ficheiro_notas(ficheiro.file, ficheiro.name)
+            else:
+                linhas = ler_grelha(grelha)
+            relatorio = lancar_notas(linhas)
+        except ValueError as e:
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+            messages.error(request, str(e))
+        else:
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': True,
+                    'total': relatorio.total,
+                    'lancadas': relatorio.lancadas,
+                    'alteradas': relatorio.alteradas,
+                    'aprovacoes': relatorio.aprovacoes,
+                    'erros': [{'linha': linha, 'erro': erro} for linha, erro in relatorio.erros],
+                })
+            messages.success(request, f'{relatorio.alteradas} nota(s) atualizada(s) de {relatorio.total} linha(s) lidas.')
+    
+    return render(request, 'core/lancar_notas.html', {
+        'relatorio': relatorio,
+        'erros': relatorio.erros[:500] if relatorio else [],
     })
 
+@login_required
+@require_http_methods(["GET"])
+def estatisticas_diarias_api(request):
+    """Série diária de inscrições (JSON) para os gráficos da administração"""
+    perfil = getattr(request.user, 'perfil', None)
+    if not request.user.is_staff and not (perfil and perfil.nivel_acesso in ['admin', 'super_admin']):
+        return JsonResponse({'erro': 'Acesso negado.'}, status=403)
+    
+    hoje = timezone.localdate()
+    try:
+        fim = date.fromisoformat(request.GET['fim']) if request.GET.get('fim') else hoje
+        # Por omissão, os 30 dias até ao fim (ou menos, se o fim estiver junto de date.min)
+        inicio = date.fromisoformat(request.GET['inicio']) if request.GET.get('inicio') else fim - timedelta(days=min(29, (fim - date.min).days))
+        cursos = [int(curso) for curso in request.GET.getlist('curso') if curso]
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros inválidos: use datas AAAA-MM-DD e ids de curso numéricos.'}, status=400)
+    if inicio > fim:
+        return JsonResponse({'erro': 'A data de início é posterior à data de fim.'}, status=400)
+    if (fim - inicio).days >= MAXIMO_DIAS:
+        return JsonResponse({'erro': f'O intervalo máximo é de {MAXIMO_DIAS} dias.'}, status=400)
+    
+    return JsonResponse(serie_diaria(inicio, fim, cursos))
+
 @require_http_methods(["GET"])
+@limitar('120/m', metodos=None)
 def escolas_autocomplete(request):
     """Retorna escolas para autocomplete"""
     query = request.GET.get('q', '')
@@ -457,6 +465,7 @@ def trocar_ano_academico(request):
         # Ativar o ano selecionado
         ano.ativo = True
         ano.save()
+        academico.invalidar_academico()
         
         return JsonResponse({
             'success': True,
@@ -561,6 +570,10 @@ def semestre_edit(request, pk):
         return render(request, 'core/partials/semestre_form_inner.html', {'semestre': semestre, 'ano': semestre.ano_academico})
     return render(request, 'core/semestre_form.html', {'semestre': semestre, 'ano': semestre.ano_academico})
 
+# O limite principal é por utilizador; o de IP só trava abusos (uma escola inteira pode sair pelo mesmo NAT)
+@limitar('5/m', chave='POST:username')
+@limitar('600/m')
+@no_executor_senhas
 def login_view(request):
     """View de login personalizada"""
     from .models import Subscricao
@@ -591,6 +604,7 @@ def login_view(request):
     
     return render(request, 'core/login.html')
 
+@no_executor_senhas
 def registro_view(request):
     """View de registro de usuário"""
     if request.user.is_authenticated:
@@ -621,10 +635,9 @@ def registro_view(request):
             messages.error(request, 'Este telefone já está sendo usado por outro usuário!')
             return render(request, 'core/registro.html')
         
-        for user in User.objects.all():
-            if user.check_password(password1):
-                messages.error(request, 'Esta senha já está sendo usada por outro usuário. Por favor, escolha uma senha diferente.')
-                return render(request, 'core/registro.html')
+        if senha_reutilizada(password1):
+            messages.error(request, MENSAGEM_SENHA_REUTILIZADA)
+            return render(request, 'core/registro.html')
         
         try:
             user = User.objects.create_user(
@@ -634,6 +647,7 @@ def registro_view(request):
                 first_name=first_name,
                 last_name=last_name
             )
+            registar_impressao(user, password1)
             
             if hasattr(user, 'perfil'):
                 user.perfil.telefone = telefone
@@ -663,16 +677,12 @@ def logout_view(request):
 @login_required
 def notificacoes_view(request):
     """View para listar notificações do usuário"""
-    notificacoes = Notificacao.objects.filter(
-        Q(global_notificacao=True) | Q(destinatarios=request.user),
-        ativa=True
-    ).distinct().order_by('-data_criacao')
-    
-    nao_lidas = notificacoes.exclude(lida_por=request.user)
-    
+    entregas, proximo = pagina_caixa(request.user, request.GET.get('antes'))
     context = {
-        'notificacoes': notificacoes,
-        'nao_lidas_count': nao_lidas.count()
+        'entregas': entregas,
+        'proximo_cursor': proximo,
+        'primeira_pagina': not request.GET.get('antes'),
+        'nao_lidas_count': contador_nao_lidas(request.user)
     }
     return render(request, 'core/notificacoes.html', context)
 
@@ -684,21 +694,66 @@ def marcar_notificacao_lida(request, notificacao_id):
     notificacao.marcar_como_lida(request.user)
     return JsonResponse({'success': True})
 
+@login_required
+@require_http_methods(["POST"])
+def marcar_notificacoes_lidas(request):
+    """Marcar como lidas as notificações selecionadas (ids) ou todas (todas=1) num único UPDATE"""
+    entregas = EntregaNotificacao.objects.all()
+    if request.POST.get('todas') != '1':
+        ids = [i for i in request.POST.getlist('ids') if i.isdigit()]
+        if not ids:
+            return JsonResponse({'success': False, 'erro': 'Nenhuma notificação selecionada.'}, status=400)
+        entregas = entregas.filter(notificacao_id__in=ids)
+    marcadas = marcar_lidas(request.user, entregas)
+    return JsonResponse({'success': True, 'marcadas': marcadas, 'count': contador_nao_lidas(request.user)})
+
 @login_required
 def get_notificacoes_count(request):
     """Retorna contagem de notificações não lidas"""
-    count = Notificacao.objects.filter(
-        Q(global_notificacao=True) | Q(destinatarios=request.user),
-        ativa=True
-    ).exclude(lida_por=request.user).distinct().count()
-    
-    return JsonResponse({'count': count})
+    return JsonResponse({'count': contador_nao_lidas(request.user)})
+
+@login_required
+async def eventos_stream(request):
+    """Server-sent events com as contagens e as notificações novas (só em ASGI).
+
+    Em WSGI a resposta não pode ficar aberta: devolve 204, o que faz o
+    EventSource desistir e o base.html voltar aos pedidos periódicos.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+
+    def formatar(tipo, dados):
+        return f'event: {tipo}\ndata: {json.dumps(dados)}\n\n'
+
+    async def gerar():
+        fila = eventos.broker().subscrever(user.pk, user.is_staff)
+        try:
+            yield 'retry: 5000\n\n'
+            yield formatar('notificacoes', {'count': await sync_to_async(contador_nao_lidas)(user)})
+            if user.is_staff:
+                total = await PerfilUsuario.objects.filter(nivel_acesso='pendente').acount()
+                yield formatar('perfis_pendentes', {'count': total})
+            while True:
+                try:
+                    tipo, dados = await asyncio.wait_for(fila.get(), settings.EVENTOS_KEEPALIVE_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                else:
+                    yield formatar(tipo, dados)
+        finally:
+            eventos.broker().cancelar(fila)
+
+    resposta = StreamingHttpResponse(gerar(), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
 
 def pagamento_subscricao_view(request):
     """View para efetuar pagamento de subscrição"""
     from datetime import datetime
     
-    subscricao = Subscricao.objects.filter(estado__in=['ativo', 'teste']).first()
+    subscricao = academico.subscricao_licenca()
     
     if not subscricao:
         messages.error(request, 'Nenhuma subscrição encontrada no sistema!')
@@ -736,7 +791,7 @@ def renovar_subscricao_view(request):
     """View pública para renovação de subscrição"""
     from datetime import datetime
     
-    subscricao = Subscricao.objects.filter(estado__in=['ativo', 'teste']).first()
+    subscricao = academico.subscricao_licenca()
     
     if not subscricao:
         messages.error(request, 'Nenhuma subscrição encontrada no sistema!')
@@ -770,6 +825,8 @@ def renovar_subscricao_view(request):
     
     return render(request, 'core/renovar_subscricao.html', {'subscricao': subscricao})
 
+@limitar('5/m')
+@limitar('3/h', chave='POST:identificador')
 def esqueci_senha_view(request):
     """View para escolher método de recuperação de senha"""
     if request.method == 'POST':
@@ -785,14 +842,17 @@ def esqueci_senha_view(request):
             
             perfil = PerfilUsuario.objects.filter(user=user).first()
             
+            pendentes = RecuperacaoSenha.objects.filter(user=user, usado=False, data_expiracao__gt=timezone.now()).count()
+            if pendentes >= settings.RECUPERACAO_SENHA_MAXIMO_PENDENTES:
+                messages.error(request, 'Já existem pedidos de recuperação pendentes para este usuário. Use o código ou link já enviado, ou aguarde que expire.')
+                return render(request, 'core/esqueci_senha.html')
+            
             if metodo == 'telefone':
                 if not perfil or not perfil.telefone:
                     messages.error(request, 'Este usuário não possui telefone cadastrado!')
                     return render(request, 'core/esqueci_senha.html')
                 
                 import random
-                from datetime import timedelta
-                from django.utils import timezone
                 
                 codigo_otp = str(random.randint(100000, 999999))
                 
@@ -814,8 +874,6 @@ def esqueci_senha_view(request):
                     return render(request, 'core/esqueci_senha.html')
                 
                 import secrets
-                from datetime import timedelta
-                from django.utils import timezone
                 
                 token = secrets.token_urlsafe(32)
                 
@@ -835,6 +893,9 @@ def esqueci_senha_view(request):
     
     return render(request, 'core/esqueci_senha.html')
 
+@limitar('10/m')
+@limitar('5/10m', chave='sessao:recuperacao_id')
+@no_executor_senhas
 def validar_otp_view(request):
     """View para validar código OTP e redefinir senha"""
     recuperacao_id = request.session.get('recuperacao_id')
@@ -867,10 +928,9 @@ def validar_otp_view(request):
                 messages.error(request, 'A senha deve ter no mínimo 6 caracteres!')
                 return render(request, 'core/validar_otp.html', {'recuperacao': recuperacao})
             
-            for user_check in User.objects.exclude(id=recuperacao.user.id):
-                if user_check.check_password(nova_senha):
-                    messages.error(request, 'Esta senha já está sendo usada por outro usuário. Por favor, escolha uma senha diferente.')
-                    return render(request, 'core/validar_otp.html', {'recuperacao': recuperacao})
+            if senha_reutilizada(nova_senha, recuperacao.user):
+                messages.error(request, MENSAGEM_SENHA_REUTILIZADA)
+                return render(request, 'core/validar_otp.html', {'recuperacao': recuperacao})
             
             user = recuperacao.user
             user.set_password(nova_senha)
@@ -888,6 +948,7 @@ def validar_otp_view(request):
         messages.error(request, 'Recuperação inválida!')
         return redirect('esqueci_senha')
 
+@no_executor_senhas
 def redefinir_senha_email_view(request, token):
     """View para redefinir senha via link de email"""
     try:
@@ -909,10 +970,9 @@ def redefinir_senha_email_view(request, token):
                 messages.error(request, 'A senha deve ter no mínimo 6 caracteres!')
                 return render(request, 'core/redefinir_senha_email.html', {'token': token})
             
-            for user_check in User.objects.exclude(id=recuperacao.user.id):
-                if user_check.check_password(nova_senha):
-                    messages.error(request, 'Esta senha já está sendo usada por outro usuário. Por favor, escolha uma senha diferente.')
-                    return render(request, 'core/redefinir_senha_email.html', {'token': token})
+            if senha_reutilizada(nova_senha, recuperacao.user):
+                messages.error(request, MENSAGEM_SENHA_REUTILIZADA)
+                return render(request, 'core/redefinir_senha_email.html', {'token': token})
             
             user = recuperacao.user
             user.set_password(nova_senha)
@@ -980,40 +1040,33 @@ def get_perfis_pendentes_count(request):
         return JsonResponse({'count': count})
     return JsonResponse({'count': 0})
 
+@login_required
+def metricas_executor_senhas(request):
+    """Estado da fila do executor de senhas (login, registo e redefinição), só para a staff"""
+    if not request.user.is_staff:
+        return JsonResponse({'erro': 'Acesso negado!'}, status=403)
+    executor = executor_senhas()
+    return JsonResponse({'ativo': executor is not None, **(executor.metricas() if executor else {})})
+
 @login_required
 def painel_principal(request):
     """View para o painel principal com menu lateral"""
     from datetime import date
-    total_inscricoes = Inscricao.objects.count()
-    total_aprovados = Inscricao.objects.filter(aprovado=True).count()
-    total_reprovados = Inscricao.objects.filter(aprovado=False, nota_teste__isnull=False).count()
-    aguardando_nota = Inscricao.objects.filter(nota_teste__isnull=True).count()
+    contadores = contadores_inscricoes()
     
     anos_academicos = AnoAcademico.objects.all()
-    ano_atual = AnoAcademico.objects.filter(ativo=True).first()
     
-    notificacoes_nao_lidas = Notificacao.objects.filter(
-        Q(global_notificacao=True) | Q(destinatarios=request.user),
-        ativa=True
-    ).exclude(lida_por=request.user).count()
+    notificacoes_nao_lidas = contador_nao_lidas(request.user)
     
-    notificacoes_recentes = Notificacao.objects.filter(
-        Q(global_notificacao=True) | Q(destinatarios=request.user),
-        ativa=True
-    ).distinct().order_by('-data_criacao')[:3]
-    
-    subscricao = Subscricao.objects.filter(estado__in=['ativo', 'teste']).first()
+    notificacoes_recentes = [entrega.notificacao for entrega in caixa_de_entrada(request.user)[:3]]
     
     context = {
-        'total_inscricoes': total_inscricoes,
-        'total_aprovados': total_aprovados,
-        'total_reprovados': total_reprovados,
-        'aguardando_nota': aguardando_nota,
+        **contadores,
         'anos_academicos': anos_academicos,
-        'ano_atual': ano_atual,
+        'ano_atual': academico.ano_atual(),
         'notificacoes_nao_lidas': notificacoes_nao_lidas,
         'notificacoes_recentes': notificacoes_recentes,
-        'subscricao': subscricao,
+        'subscricao': academico.subscricao_atual(),
         'now': date.today()
     }
     return render(request, 'core/painel_principal.html', context)
@@ -1022,11 +1075,10 @@ def painel_principal(request):
 def trocar_ano(request):
     """View para seleção de ano acadêmico"""
     anos_academicos = AnoAcademico.objects.all().order_by('-ano_inicio')
-    ano_atual = AnoAcademico.objects.filter(ativo=True).first()
     
     context = {
         'anos_academicos': anos_academicos,
-        'ano_atual': ano_atual
+        'ano_atual': academico.ano_atual()
     }
     return render(request, 'core/trocar_ano.html', context)
 
@@ -1041,13 +1093,12 @@ def perfil_usuario(request):
 @login_required
 def quadro_avisos(request):
     """View para exibir quadro de avisos"""
-    avisos = Notificacao.objects.filter(
-        Q(global_notificacao=True) | Q(destinatarios=request.user),
-        ativa=True
-    ).distinct().order_by('-data_criacao')
+    avisos, proximo = pagina_caixa(request.user, request.GET.get('antes'))
     
     context = {
-        'avisos': avisos
+        'avisos': avisos,
+        'proximo_cursor': proximo,
+        'primeira_pagina': not request.GET.get('antes'),
     }
     return render(request, 'core/quadro_avisos.html', context)
 
@@ -1578,10 +1629,10 @@ def listar_cursos(request):
     if not request.user.is_staff and not (perfil and perfil.nivel_acesso in ['admin', 'super_admin']):
         messages.error(request, 'Acesso negado.')
         return redirect('painel_principal')
-    cursos = Curso.objects.all()
+    cursos = list(Curso.objects.com_estatisticas())
     return render(request, 'core/cursos/listar_cursos.html', {
         'cursos': cursos,
-        'total_cursos': cursos.count(),
+        'total_cursos': len(cursos),
     })
 
 @login_required
@@ -1635,6 +1686,7 @@ def detalhe_curso(request, curso_id):
         'total_inscricoes': inscricoes.count(),
         'total_aprovados': inscricoes.filter(aprovado=True).count(),
         'vagas_disponiveis': curso.vagas_disponiveis(),
+        'classificacao': getattr(curso, 'classificacao', None),
     })
 
 @login_required
@@ -1759,6 +1811,7 @@ def criar_utilizador(request):
                 is_staff=(nivel_acesso in ['admin', 'super_admin']),
                 is_superuser=(nivel_acesso == 'super_admin')
             )
+            registar_impressao(user, password)
             
             # Criar/atualizar perfil
             perfil, _ = PerfilUsuario.objects.get_or_create(user=user)
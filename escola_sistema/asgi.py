@@ -3,6 +3,10 @@ ASGI config for escola_sistema project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Needed for the server-sent events in api/notificacoes/eventos/ (core.eventos):
+served by a WSGI server that endpoint answers 204 and the pages fall back to
+polling the count endpoints.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
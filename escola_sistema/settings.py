@@ -54,11 +54,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.LimitePedidosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.LicencaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -111,8 +113,43 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
+    {
+        'NAME': 'core.senhas.SenhaUnicaValidator',
+    },
 ]
 
+# Guarda a impressão da senha das contas antigas no próximo login (core.senhas)
+AUTHENTICATION_BACKENDS = ['core.senhas.ImpressaoSenhaBackend']
+
+# Deteção de senhas repetidas entre utilizadores (core.senhas): 'bloquear',
+# 'registar' (só mantém o índice) ou 'desativado'. A pimenta das impressões
+# deve ficar fora da base de dados e do repositório; sem ela (ou se for igual
+# à SECRET_KEY) a deteção fica desativada e nenhuma impressão é guardada.
+# Mudá-la obriga a `impressoes_senhas --repor`
+SENHAS_REUTILIZACAO = os.environ.get('SENHAS_REUTILIZACAO', 'bloquear')
+SENHAS_PIMENTA = os.environ.get('SENHAS_PIMENTA', '')
+
+# Login, registo e redefinição de senha calculam o PBKDF2 num executor próprio
+# com SENHAS_EXECUTOR_TRABALHADORES threads (0 = sem executor, no caminho normal
+# do pedido); com mais de SENHAS_EXECUTOR_FILA pedidos à espera respondem 503
+SENHAS_EXECUTOR_TRABALHADORES = int(os.environ.get('SENHAS_EXECUTOR_TRABALHADORES', 4))
+SENHAS_EXECUTOR_FILA = int(os.environ.get('SENHAS_EXECUTOR_FILA', 64))
+
+# Pedidos de recuperação de senha por utilizador ainda válidos (não usados nem
+# expirados); acima deste número esqueci_senha não cria novos. Os expirados e
+# usados são apagados pelo comando limpar_recuperacoes_senha
+RECUPERACAO_SENHA_MAXIMO_PENDENTES = int(os.environ.get('RECUPERACAO_SENHA_MAXIMO_PENDENTES', 3))
+
+# Limites de pedidos das páginas públicas (@limitar em core.views): onde ficam os
+# baldes ('core.limites.ArmazemMemoria' por processo, 'core.limites.ArmazemCache'
+# na cache LIMITES_PEDIDOS_CACHE ou 'core.limites.ArmazemBaseDados' na tabela
+# BaldePedidos) e, atrás de um proxy, o cabeçalho com o IP do cliente
+# (ex.: HTTP_X_FORWARDED_FOR)
+LIMITES_PEDIDOS_ATIVOS = os.environ.get('LIMITES_PEDIDOS_ATIVOS', '1').lower() in ('1', 'true', 'sim')
+LIMITES_PEDIDOS_ARMAZEM = os.environ.get('LIMITES_PEDIDOS_ARMAZEM', 'core.limites.ArmazemMemoria')
+LIMITES_PEDIDOS_CACHE = os.environ.get('LIMITES_PEDIDOS_CACHE', 'default')
+LIMITES_PEDIDOS_CABECALHO_IP = os.environ.get('LIMITES_PEDIDOS_CABECALHO_IP', '')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -143,3 +180,56 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Números de inscrição/estudante reservados de uma vez por processo
+# (1 = sem pré-reserva; use valores maiores com vários workers gunicorn)
+SEQUENCIA_TAMANHO_BLOCO = int(os.environ.get('SEQUENCIA_TAMANHO_BLOCO', 1))
+
+# Modo de pico das admissões: o formulário público de inscrição só grava a
+# submissão numa fila e devolve um recibo; o comando processar_fila_inscricoes
+# cria as inscrições em lotes
+INSCRICOES_MODO_PICO = os.environ.get('INSCRICOES_MODO_PICO', '').lower() in ('1', 'true', 'sim')
+
+# Licença: intervalo (em segundos) entre verificações da versão do estado da
+# subscrição em cache; entre verificações o estado é lido da memória do processo
+LICENCA_VERIFICACAO_SEGUNDOS = int(os.environ.get('LICENCA_VERIFICACAO_SEGUNDOS', 60))
+
+# Eventos em tempo real (api/notificacoes/eventos/, só com um servidor ASGI):
+# classe do broker e intervalo dos comentários keepalive da ligação
+EVENTOS_BROKER = os.environ.get('EVENTOS_BROKER', 'core.eventos.BrokerMemoria')
+EVENTOS_KEEPALIVE_SEGUNDOS = int(os.environ.get('EVENTOS_KEEPALIVE_SEGUNDOS', 25))
+
+# Entregas de notificações com mais de N dias são arquivadas pelo comando
+# arquivar_notificacoes e deixam de aparecer na caixa de entrada
+NOTIFICACOES_RETENCAO_DIAS = int(os.environ.get('NOTIFICACOES_RETENCAO_DIAS', 90))
+
+# Cache partilhada entre os processos (contadores do dashboard, etc.)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+        'TIMEOUT': 60 * 60,
+    },
+    # Sessões (SESSOES_MOTOR='cache_db'), à parte para não disputarem MAX_ENTRIES com o resto
+    'sessoes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.environ.get('CACHE_DIR', BASE_DIR / 'cache'), 'sessoes'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('SESSOES_MAXIMO_CACHE', 20000))},
+    },
+}
+
+# Sessões: 'cache_db' (padrão) lê da cache 'sessoes' e só escreve na base de
+# dados quando a sessão muda; 'cookies' guarda a sessão (e as mensagens) num
+# cookie assinado, sem E/S no servidor, mas não permite terminar sessões do
+# lado do servidor; 'db' é o motor padrão do Django. As sessões expiradas da
+# base de dados são apagadas pelo comando limpar_sessoes
+SESSOES_MOTOR = os.environ.get('SESSOES_MOTOR', 'cache_db')
+SESSION_ENGINE = {
+    'cache_db': 'django.contrib.sessions.backends.cached_db',
+    'cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSOES_MOTOR]
+SESSION_CACHE_ALIAS = 'sessoes'
+if SESSOES_MOTOR == 'cookies':
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
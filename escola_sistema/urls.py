@@ -14,9 +14,12 @@ urlpatterns = [
     path('cursos/<int:curso_id>/toggle/', views.curso_toggle, name='curso_toggle'),
     path('admissao/', views.admissao_estudantes, name='admissao_estudantes'),
     path('admissao/inscricao/', views.admissao_inscricao, name='admissao_inscricao'),
+    path('admissao/notas/', views.lancar_notas_view, name='lancar_notas'),
+    path('admissao/estatisticas/diarias/', views.estatisticas_diarias_api, name='estatisticas_diarias_api'),
     path('inscricao/<int:curso_id>/', views.inscricao_create, name='inscricao_create'),
     path('inscricao/consulta/<str:numero>/', views.inscricao_consulta, name='inscricao_consulta'),
     path('inscricao/buscar/', views.inscricao_buscar, name='inscricao_buscar'),
+    path('inscricao/recibo/<str:recibo>/', views.inscricao_recibo, name='inscricao_recibo'),
     path('inscricao/pdf/<str:numero>/', views.gerar_pdf_confirmacao, name='gerar_pdf'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('painel/', views.painel_principal, name='painel_principal'),
@@ -80,8 +83,11 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('notificacoes/', views.notificacoes_view, name='notificacoes'),
     path('notificacoes/<int:notificacao_id>/marcar-lida/', views.marcar_notificacao_lida, name='marcar_notificacao_lida'),
+    path('notificacoes/marcar-lidas/', views.marcar_notificacoes_lidas, name='marcar_notificacoes_lidas'),
     path('api/notificacoes/count/', views.get_notificacoes_count, name='notificacoes_count'),
+    path('api/notificacoes/eventos/', views.eventos_stream, name='notificacoes_eventos'),
     path('api/perfis-pendentes/count/', views.get_perfis_pendentes_count, name='perfis_pendentes_count'),
+    path('api/metricas/executor-senhas/', views.metricas_executor_senhas, name='metricas_executor_senhas'),
     path('pagamento-subscricao/', views.pagamento_subscricao_view, name='pagamento_subscricao'),
     path('renovar-subscricao/', views.renovar_subscricao_view, name='renovar_subscricao'),
     path('esqueci-senha/', views.esqueci_senha_view, name='esqueci_senha'),